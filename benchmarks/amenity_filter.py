@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+'''Measures the inverted index of FileStorage.containing().
+
+Usage: ./benchmarks/amenity_filter.py [number_of_places]
+
+Creates 50 Amenities and number_of_places Places (100000 by default),
+each with 5 of the amenities at random, and prints how long it takes to
+find the places having two given amenities (about 1% of them):
+
+    scan        every Place checked, as BaseStorage.containing() does
+    first       the first lookup, which builds the index
+    indexed     the average of the lookups after it, the smallest list of
+                places intersected with the other
+    update      the average cost of changing the amenities of a place and
+                looking them up again
+'''
+
+import os
+import sys
+import time
+import tempfile
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.amenity import Amenity  # noqa: E402
+from models.engine.base_storage import BaseStorage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+
+
+def timed(function, *args):
+    '''Return the seconds function(*args) takes.'''
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Start from an empty storage; nothing is saved to it.
+    tmp = tempfile.TemporaryDirectory()
+    models.storage = FileStorage(path=os.path.join(tmp.name, 'file.json'))
+    rand = random.Random(0)
+    amenity_ids = [Amenity().id for i in range(50)]
+    places = []
+    for i in range(count):
+        place = Place()
+        place.amenity_ids = rand.sample(amenity_ids, 5)
+        places.append(place)
+    storage = models.storage
+    query = (Place, 'amenity_ids', amenity_ids[:2])
+    print('{:>12}{:>12.6f}s'.format('scan', timed(
+            BaseStorage.containing, storage, *query)))
+    print('{:>12}{:>12.6f}s'.format('first', timed(storage.containing,
+                                                   *query)))
+    print('{:>12}{:>12.6f}s   ({} places found)'.format(
+            'indexed', timed(lambda: [storage.containing(*query)
+                                      for i in range(100)]) / 100,
+            len(storage.containing(*query))))
+    start = time.perf_counter()
+    for place in places[:1000]:
+        place.amenity_ids = rand.sample(amenity_ids, 5)
+        storage.containing(*query)
+    print('{:>12}{:>12.6f}s'.format(
+            'update', (time.perf_counter() - start) / 1000))
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+'''Compares the compression codecs of FileStorage snapshots.
+
+Usage: ./benchmarks/compression_codecs.py [number_of_objects]
+
+Creates number_of_objects Places and Reviews (100000 by default), then for
+each codec (none, gzip, bz2, lzma) prints the size of the snapshot and
+the wall clock and CPU time save() and reload() take. The difference
+between wall clock and CPU time is roughly the time spent waiting on
+I/O, which compression trades for CPU time.
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def timed(function):
+    '''Return the wall clock and CPU seconds function() takes.'''
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    function()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def run(tmp, codec, objects):
+    '''Return the size, save and reload times of one codec.'''
+    path = os.path.join(tmp, 'file.json')
+    FileStorage.compression = codec
+    models.storage = FileStorage(path=path)
+    for obj in objects:
+        models.storage.new(obj)
+    # Save once first; the serialized objects stay cached, so the timed
+    # save only measures the writing.
+    models.storage.save()
+    save = timed(models.storage.save)
+    models.storage = FileStorage(path=path)
+    reload = timed(models.storage.reload)
+    assert len(models.storage.all()) == len(objects)
+    return os.path.getsize(path), save, reload
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    saved = FileStorage.compression
+    print('{:>6}{:>10}{:>18}{:>18}'.format('', 'size', 'save wall/cpu',
+                                           'reload wall/cpu'))
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        create(count)
+        objects = list(models.storage.all().values())
+        for codec in ('', 'gzip', 'bz2', 'lzma'):
+            size, save, reload = run(tmp, codec, objects)
+            print('{:>6}{:>9.1f}M{:>9.3f}s/{:.3f}s{:>9.3f}s/{:.3f}s'.format(
+                    codec or 'none', size / 1e6, save[0], save[1],
+                    reload[0], reload[1]))
+    FileStorage.compression = saved
+
+
+if __name__ == '__main__':
+    main()
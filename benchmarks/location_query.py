@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+'''Measures the location grid of FileStorage.within_radius().
+
+Usage: ./benchmarks/location_query.py [number_of_places]
+
+Creates number_of_places Places (100000 by default) spread at random
+over 20 by 40 degrees, and prints how long it takes to find the places
+within 25 km of a point:
+
+    scan        the distance to every Place computed
+    first       the first lookup, which builds the grid
+    indexed     the average of the lookups after it, at random points
+    move        the average cost of moving a place and looking again
+'''
+
+import os
+import sys
+import time
+import tempfile
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.engine import geo  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+
+
+def point(rand):
+    '''Return a random (latitude, longitude) in the area.'''
+    return rand.uniform(35, 55), rand.uniform(-10, 30)
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Start from an empty storage; nothing is saved to it.
+    tmp = tempfile.TemporaryDirectory()
+    models.storage = FileStorage(path=os.path.join(tmp.name, 'file.json'))
+    rand = random.Random(0)
+    places = []
+    for i in range(count):
+        place = Place()
+        place.latitude, place.longitude = point(rand)
+        places.append(place)
+    storage = models.storage
+    points = [point(rand) for i in range(100)]
+
+    def scan(lat, lon, km):
+        '''Return the places within km of the point, by scanning.'''
+        return [place for place in places
+                if geo.distance(lat, lon, place.latitude,
+                                place.longitude) <= km]
+
+    for name, function in (('scan', scan), ('first', storage.within_radius)):
+        start = time.perf_counter()
+        function(*points[0], 25)
+        print('{:>12}{:>12.6f}s'.format(name, time.perf_counter() - start))
+    start = time.perf_counter()
+    found = sum(len(storage.within_radius(*p, 25)) for p in points)
+    print('{:>12}{:>12.6f}s   ({} places found on average)'.format(
+            'indexed', (time.perf_counter() - start) / len(points),
+            found // len(points)))
+    start = time.perf_counter()
+    for place, p in zip(places, points):
+        place.latitude, place.longitude = p
+        storage.within_radius(*p, 25)
+    print('{:>12}{:>12.6f}s'.format(
+            'move', (time.perf_counter() - start) / len(points)))
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+'''Measures the memory used per model instance, regular vs compact.
+
+Usage: ./benchmarks/model_memory.py [number_of_objects]
+
+Builds number_of_objects Place and Review instances (100000 by default)
+from records, the way FileStorage.reload() does, and prints the bytes
+allocated per instance with and without BaseModel.compact. The bytes of
+the parsed datetimes are included; the strings are shared with the
+records and are not.
+'''
+
+import os
+import sys
+import uuid
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.base_model import BaseModel  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+
+
+def records(cls, count):
+    '''Return count records of cls, as read from file.json.'''
+    now = datetime.now().isoformat()
+    result = []
+    for i in range(count):
+        record = {'id': str(uuid.uuid4()), 'created_at': now,
+                  'updated_at': now, '__class__': cls.__name__}
+        if cls is Place:
+            record.update({'city_id': str(uuid.uuid4()),
+                           'user_id': str(uuid.uuid4()),
+                           'name': 'Place {}'.format(i),
+                           'number_rooms': i % 7, 'max_guest': i % 11,
+                           'price_by_night': i, 'latitude': i / 1000,
+                           'longitude': -i / 1000})
+        else:
+            record.update({'place_id': str(uuid.uuid4()),
+                           'user_id': str(uuid.uuid4()),
+                           'text': 'Review {}'.format(i)})
+        result.append(record)
+    return result
+
+
+def measure(cls, count, compact):
+    '''Return the bytes allocated per instance of cls.'''
+    data = records(cls, count)
+    BaseModel.compact = compact
+    tracemalloc.start()
+    objects = [cls(**record) for record in data]
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Leave out storage's own bookkeeping (the dirty set).
+    snapshot = snapshot.filter_traces(
+        [tracemalloc.Filter(False, '*/models/engine/*')])
+    size = sum(stat.size for stat in snapshot.statistics('filename'))
+    BaseModel.compact = False
+    del objects
+    return size / count
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for cls in (Place, Review):
+        regular = measure(cls, count, False)
+        compact = measure(cls, count, True)
+        print('{:>6}: regular {:6.0f} B  compact {:6.0f} B  ({:+.1f}%)'.format(
+            cls.__name__, regular, compact,
+            100 * (compact - regular) / regular))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+'''Measures reload() with its records hydrated in a process pool.
+
+Usage: ./benchmarks/parallel_reload.py [number_of_objects]
+
+Saves number_of_objects Places and Reviews (100000 by default) and
+prints how long reload() takes in 'split' mode with each
+reload_workers setting, with the CPU seconds spent in this process and
+in the workers. The parent still builds every instance, so its CPU time
+bounds how far more workers can go.
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def run(workers):
+    '''Return the wall, parent CPU and workers CPU seconds of reload().'''
+    FileStorage.reload_workers = workers
+    models.storage = FileStorage(path=models.storage.path)
+    before = os.times()
+    start = time.perf_counter()
+    models.storage.reload()
+    wall = time.perf_counter() - start
+    after = os.times()
+    return (wall,
+            after.user + after.system - before.user - before.system,
+            after.children_user + after.children_system -
+            before.children_user - before.children_system)
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    saved = (FileStorage.reload_workers, FileStorage.reload_mode)
+    FileStorage.reload_mode = 'split'
+    print('{:>8}{:>10}{:>10}{:>10}'.format('workers', 'wall', 'parent',
+                                           'workers'))
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        create(count)
+        models.storage.save()
+        for workers in (0, 2, 4, os.cpu_count() or 1):
+            print('{:>8}{:>9.3f}s{:>9.3f}s{:>9.3f}s'.format(
+                    workers, *run(workers)))
+    FileStorage.reload_workers, FileStorage.reload_mode = saved
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+'''Measures the sorted indexes of FileStorage.between().
+
+Usage: ./benchmarks/range_query.py [number_of_objects]
+
+Creates number_of_objects Places and Reviews (100000 by default), with
+prices from 0 to 499, and prints how long it takes to find the places
+priced from 100 to 104 (about 1% of them):
+
+    scan        every Place compared, as BaseStorage.between() does
+    first       the first lookup, which builds the index
+    indexed     the average of the lookups after it
+    update      the average cost of changing the price of a place and
+                looking the range up again
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.engine.base_storage import BaseStorage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def timed(function, *args):
+    '''Return the seconds function(*args) takes.'''
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Start from an empty storage; nothing is saved to it.
+    tmp = tempfile.TemporaryDirectory()
+    models.storage = FileStorage(path=os.path.join(tmp.name, 'file.json'))
+    create(count)
+    storage = models.storage
+    query = (Place, 'price_by_night', 100, 104)
+    print('{:>12}{:>12.6f}s'.format('scan', timed(
+            BaseStorage.between, storage, *query)))
+    print('{:>12}{:>12.6f}s'.format('first', timed(storage.between,
+                                                   *query)))
+    print('{:>12}{:>12.6f}s'.format('indexed', timed(
+            lambda: [storage.between(*query) for i in range(100)]) / 100))
+    places = list(storage.all(Place).values())[:1000]
+    start = time.perf_counter()
+    for i, place in enumerate(places):
+        place.price_by_night = 1000 + i
+        storage.between(*query)
+    print('{:>12}{:>12.6f}s'.format(
+            'update', (time.perf_counter() - start) / len(places)))
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+'''Measures the reverse indexes of FileStorage.related().
+
+Usage: ./benchmarks/related_lookup.py [number_of_objects]
+
+Creates number_of_objects Places and Reviews (100000 by default), one
+review per place, and prints how long it takes to find the reviews of a
+place:
+
+    scan        every Review compared, as BaseStorage.related() does
+    first       the first lookup, which builds the index
+    indexed     the average of the lookups after it
+    setattr     the average cost of setting an attribute of a Review,
+                without and with the index to keep up to date
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.engine.base_storage import BaseStorage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def timed(function, *args):
+    '''Return the seconds function(*args) takes.'''
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def set_text(reviews):
+    '''Return the average seconds setting the text of a review takes.'''
+    start = time.perf_counter()
+    for review in reviews:
+        review.text = 'Changed'
+    return (time.perf_counter() - start) / len(reviews)
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Start from an empty storage; nothing is saved to it.
+    tmp = tempfile.TemporaryDirectory()
+    models.storage = FileStorage(path=os.path.join(tmp.name, 'file.json'))
+    create(count)
+    reviews = list(models.storage.all(Review).values())
+    place_ids = [review.place_id for review in reviews[:1000]]
+    storage = models.storage
+    print('{:>12}{:>12.6f}s'.format('scan', timed(
+            BaseStorage.related, storage, Review, 'place_id', place_ids[0])))
+    print('{:>12}{:>12.6f}s'.format('first', timed(
+            storage.related, Review, 'place_id', place_ids[0])))
+    start = time.perf_counter()
+    for place_id in place_ids:
+        storage.related(Review, 'place_id', place_id)
+    print('{:>12}{:>12.6f}s'.format(
+            'indexed', (time.perf_counter() - start) / len(place_ids)))
+    FileStorage._FileStorage__linked = None
+    FileStorage._FileStorage__moved = {}
+    without = set_text(reviews)
+    storage.related(Review, 'place_id', place_ids[0])
+    print('{:>12}{:>12.9f}s{:>12.9f}s'.format(
+            'setattr', without, set_text(reviews)))
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+'''Measures the reload() shortcuts of FileStorage.
+
+Usage: ./benchmarks/reload_cache.py [number_of_objects]
+
+Saves number_of_objects Places and Reviews (100000 by default) and
+prints how long reload() takes:
+
+    parse       reading the files, as a new process does without cache
+    write cache the same, writing the sidecar cache as well
+    cache       a new process starting from the sidecar cache
+    unchanged   reload() again in the same process with skip_unchanged
+                set, files unchanged (the snapshot was just written, so it
+                is checksummed)
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def fresh_reload():
+    '''Return the seconds reload() takes in a process that has not
+    loaded the files yet.'''
+    models.storage = FileStorage(path=models.storage.path)
+    start = time.perf_counter()
+    models.storage.reload()
+    return time.perf_counter() - start
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    saved = (FileStorage.reload_cache, FileStorage.skip_unchanged)
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        create(count)
+        models.storage.save()
+        print('{:>12}{:>9.3f}s'.format('parse', fresh_reload()))
+        FileStorage.reload_cache = True
+        print('{:>12}{:>9.3f}s'.format('write cache', fresh_reload()))
+        print('{:>12}{:>9.3f}s'.format('cache', fresh_reload()))
+        FileStorage.skip_unchanged = True
+        start = time.perf_counter()
+        models.storage.reload()
+        print('{:>12}{:>9.3f}s'.format('unchanged',
+                                       time.perf_counter() - start))
+    FileStorage.reload_cache, FileStorage.skip_unchanged = saved
+
+
+if __name__ == '__main__':
+    main()
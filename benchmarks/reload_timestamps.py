@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+'''Benchmarks FileStorage.reload() with strptime() and fromisoformat().
+
+Usage: ./benchmarks/reload_timestamps.py [number_of_objects]
+
+Writes a temporary file.json with number_of_objects Place records
+(1000000 by default) and prints the reload throughput of each parser.
+reload() parses the timestamps in normalize(), so the datetime of
+models/engine/file_storage.py is the one replaced.
+'''
+
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.engine import file_storage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+
+
+class StrptimeDatetime(datetime):
+    '''datetime whose fromisoformat() is the old strptime() call.'''
+
+    @classmethod
+    def fromisoformat(cls, value):
+        '''Parse value the way BaseModel used to.'''
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+
+
+def write_file(path, count):
+    '''Write count Place records to path.'''
+    now = datetime.now().isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i in range(count):
+            oid = str(uuid.uuid4())
+            record = {'id': oid, 'created_at': now, 'updated_at': now,
+                      'name': 'Place {}'.format(i), 'price_by_night': i,
+                      '__class__': 'Place'}
+            if i:
+                f.write(', ')
+            f.write(json.dumps('Place.' + oid) + ': ' + json.dumps(record))
+        f.write('}')
+
+
+def time_reload():
+    '''Return the seconds taken by one reload into an empty storage.'''
+    models.storage = FileStorage(path=models.storage.path)
+    start = time.perf_counter()
+    models.storage.reload()
+    return time.perf_counter() - start
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        write_file(models.storage.path, count)
+        results = {}
+        for name, cls in (('strptime', StrptimeDatetime),
+                          ('fromisoformat', datetime)):
+            file_storage.datetime = cls
+            results[name] = time_reload()
+            print('{:>13}: {:7.2f}s  {:>9.0f} objects/s'.format(
+                name, results[name], count / results[name]))
+        file_storage.datetime = datetime
+        print('      speedup: {:.2f}x'.format(
+            results['strptime'] / results['fromisoformat']))
+
+
+if __name__ == '__main__':
+    main()
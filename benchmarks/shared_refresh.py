@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+'''Measures what picking up another process's save costs.
+
+Usage: ./benchmarks/shared_refresh.py [number_of_objects]
+
+Saves number_of_objects Places and Reviews (100000 by default) with the
+shared option set, then prints how long refresh() takes when nothing
+changed and after another process saved one new object, in each layout,
+next to the time a full reload() takes.
+'''
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.state import State  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from storage_formats import create  # noqa: E402
+
+
+def timed(function):
+    '''Return the seconds function() takes.'''
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def other_process():
+    '''Save one new object from another process.'''
+    process = multiprocessing.get_context('fork').Process(
+            target=lambda: State().save())
+    process.start()
+    process.join()
+
+
+def run(tmp, journal, shards, objects):
+    '''Return the refresh() times, unchanged and changed, and the
+    reload() time of one layout.'''
+    path = os.path.join(tmp, '{}-{}'.format(journal, shards), 'file.json')
+    os.mkdir(os.path.dirname(path))
+    models.storage = FileStorage(path=path)
+    FileStorage.shards = shards
+    # Write every object to a snapshot of this layout.
+    FileStorage.journal = False
+    for obj in objects:
+        models.storage.new(obj)
+    models.storage.save()
+    FileStorage.journal = journal
+    unchanged = timed(models.storage.refresh)
+    other_process()
+    changed = timed(models.storage.refresh)
+    models.storage = FileStorage(path=path)
+    reload = timed(models.storage.reload)
+    return unchanged, changed, reload
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    saved = (FileStorage.shared, FileStorage.journal, FileStorage.shards)
+    FileStorage.shared = True
+    print('{:>10}{:>12}{:>12}{:>12}'.format('', 'unchanged', 'changed',
+                                            'reload'))
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        create(count)
+        objects = list(models.storage.all().values())
+        for name, journal, shards in (('file', False, 0),
+                                      ('journal', True, 0),
+                                      ('shards', False, 16)):
+            times = run(tmp, journal, shards, objects)
+            print('{:>10}{:>11.4f}s{:>11.4f}s{:>11.4f}s'.format(name, *times))
+        models.storage.close()
+    FileStorage.shared, FileStorage.journal, FileStorage.shards = saved
+
+
+if __name__ == '__main__':
+    main()
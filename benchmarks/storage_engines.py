@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+'''Runs the same workloads against every storage engine.
+
+Usage: ./benchmarks/storage_engines.py [number_of_objects]
+
+For each engine (memory, file, file with journal, file split into one
+file per class, SQLite), starting from
+an empty store in a temporary directory, times:
+    create  - create number_of_objects Places, calling save() on each
+    reopen  - close and reopen the store, then count the Places
+    get     - look every Place up by id
+    update  - set an attribute and save, for every Place
+    delete  - delete and save, for every Place
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.engine.memory_storage import MemoryStorage  # noqa: E402
+from models.engine.sqlite_storage import SQLiteStorage  # noqa: E402
+
+
+def open_memory(tmp):
+    '''Return the storage kept between reopens of the memory engine.'''
+    if not hasattr(open_memory, 'storage'):
+        open_memory.storage = MemoryStorage()
+    return open_memory.storage
+
+
+def open_file(tmp, journal=False, shards=0):
+    '''Return a FileStorage on tmp/file.json.'''
+    storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+    FileStorage.journal = journal
+    FileStorage.shards = shards
+    storage.reload()
+    return storage
+
+
+def open_journal(tmp):
+    '''Return a FileStorage in journal mode on tmp/file.json.'''
+    return open_file(tmp, journal=True)
+
+
+def open_shards(tmp):
+    '''Return a FileStorage with one file per class in tmp.'''
+    return open_file(tmp, shards=1)
+
+
+def open_sqlite(tmp):
+    '''Return an SQLiteStorage on tmp/hbnb.db.'''
+    storage = SQLiteStorage(os.path.join(tmp, 'hbnb.db'))
+    storage.reload()
+    return storage
+
+
+def run(open_storage, count):
+    '''Return the seconds taken by each workload on one engine.'''
+    times = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = open_storage(tmp)
+
+        start = time.perf_counter()
+        ids = []
+        for i in range(count):
+            place = Place()
+            place.price_by_night = i
+            place.save()
+            ids.append(place.id)
+        times['create'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        models.storage.close()
+        models.storage = open_storage(tmp)
+        assert models.storage.count(Place) == count
+        times['reopen'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        places = [models.storage.get(Place, oid) for oid in ids]
+        times['get'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for place in places:
+            place.name = 'updated'
+            models.storage.save()
+        times['update'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for place in places:
+            models.storage.delete(place)
+            models.storage.save()
+        times['delete'] = time.perf_counter() - start
+        models.storage.close()
+    return times
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    saved = models.storage
+    engines = (('memory', open_memory), ('file', open_file),
+               ('journal', open_journal), ('shards', open_shards),
+               ('sqlite', open_sqlite))
+    workloads = ('create', 'reopen', 'get', 'update', 'delete')
+    print('{:>8}'.format('') + ''.join('{:>9}'.format(w) for w in workloads))
+    for name, open_storage in engines:
+        times = run(open_storage, count)
+        print('{:>8}'.format(name) +
+              ''.join('{:8.3f}s'.format(times[w]) for w in workloads))
+    FileStorage(path='file.json')
+    FileStorage.journal = False
+    FileStorage.shards = 0
+    models.storage = saved
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+'''Compares the JSON and binary snapshot formats of FileStorage.
+
+Usage: ./benchmarks/storage_formats.py [number_of_objects]
+
+Creates number_of_objects Places and Reviews (100000 by default), then for
+each format prints the size of the snapshot, the time save() takes to
+write it from scratch and the time reload() takes to read it back.
+'''
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+
+
+def create(count):
+    '''Store count Places and Reviews with a few attributes set.'''
+    for i in range(count // 2):
+        place = Place()
+        place.name = 'Place {}'.format(i)
+        place.city_id = place.id
+        place.price_by_night = i % 500
+        place.latitude = 37.77 + i / 1e6
+        review = Review()
+        review.place_id = place.id
+        review.text = 'Lovely stay number {}'.format(i)
+
+
+def run(tmp, fmt, objects):
+    '''Return the size, save and reload times of one format.'''
+    path = os.path.join(tmp, 'file.' + fmt)
+    FileStorage.format = fmt
+    # A new storage has no serialized objects cached, so every one is
+    # serialized.
+    models.storage = FileStorage(path=path)
+    for obj in objects:
+        models.storage.new(obj)
+    start = time.perf_counter()
+    models.storage.save()
+    save = time.perf_counter() - start
+    models.storage = FileStorage(path=path)
+    start = time.perf_counter()
+    models.storage.reload()
+    reload = time.perf_counter() - start
+    assert len(models.storage.all()) == len(objects)
+    return os.path.getsize(path), save, reload
+
+
+def main():
+    '''Run the benchmark.'''
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    saved = FileStorage.format
+    print('{:>8}{:>12}{:>10}{:>10}'.format('', 'size', 'save', 'reload'))
+    with tempfile.TemporaryDirectory() as tmp:
+        models.storage = FileStorage(path=os.path.join(tmp, 'file.json'))
+        create(count)
+        objects = list(models.storage.all().values())
+        for fmt in ('json', 'binary'):
+            size, save, reload = run(tmp, fmt, objects)
+            print('{:>8}{:>11.1f}M{:>9.3f}s{:>9.3f}s'.format(
+                    fmt, size / 1e6, save, reload))
+    FileStorage.format = saved
+
+
+if __name__ == '__main__':
+    main()
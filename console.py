@@ -5,13 +5,7 @@ import cmd
 import re
 import models
 import json
-from models.base_model import BaseModel
-from models.user import User
-from models.state import State
-from models.city import City
-from models.amenity import Amenity
-from models.place import Place
-from models.review import Review
+from models.base_model import classes
 
 
 def parse(args):
@@ -20,23 +14,62 @@ def parse(args):
     return args_list
 
 
+def get_instance(args):
+    '''Return the stored instance named by the <class_name> <id> arguments.
+
+    Returns None if an argument is missing, the class does not exist or
+    there is no such instance.
+    '''
+    if len(args) < 2 or args[0] not in classes:
+        return None
+    return models.storage.get(args[0], args[1])
+
+
+def number(text):
+    '''Return the int or float text holds, or None if it is empty.
+
+    Raises:
+        ValueError: If text is not a number.
+    '''
+    if text == '':
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_numbers(args, names):
+    '''Return the numbers named by names in the arguments, or None after
+    printing what is wrong with them.'''
+    numbers = []
+    for i, name in enumerate(names):
+        if i >= len(args):
+            print('** {} missing **'.format(name))
+            return None
+        try:
+            numbers.append(float(args[i]))
+        except ValueError:
+            print('** invalid {}: {} **'.format(name, args[i]))
+            return None
+    return numbers
+
+
 class HBNBCommand(cmd.Cmd):
     '''The AirBnB command interpreter.
 
     Attributes:
         prompt(str): The command prompt.
+        __classes(dict): The model classes, by name.
     '''
 
     prompt = '(hbnb) '
-    __classes = [
-            'BaseModel',
-            'User',
-            'State',
-            'City',
-            'Amenity',
-            'Place',
-            'Review'
-            ]
+    __classes = classes
+
+    def precmd(self, line):
+        '''Pick up the changes other processes saved before each command.'''
+        models.storage.refresh()
+        return line
 
     def emptyline(self):
         '''Do nothing upon receiving an empty line.'''
@@ -49,7 +82,9 @@ class HBNBCommand(cmd.Cmd):
             'show': self.do_show,
             'destroy': self.do_destroy,
             'update': self.do_update,
-            'count': self.do_count
+            'count': self.do_count,
+            'search': self.do_search,
+            'containing': self.do_containing
         }
         pattern = r'\.'
         match = re.search(pattern, line)
@@ -80,8 +115,11 @@ class HBNBCommand(cmd.Cmd):
             print('** class name missing **')
         elif args[0] not in HBNBCommand.__classes:
             print('** class doesn\'t exist **')
+        elif models.storage.read_only:
+            print('** storage is read-only **')
         else:
-            m = eval(args[0])()
+            m = HBNBCommand.__classes[args[0]]()
+            m.save()
             print(m.id)
 
     def do_show(self, line):
@@ -89,24 +127,24 @@ class HBNBCommand(cmd.Cmd):
         Prints the string representation of an instance of a class.
         '''
         args = parse(line)
-        objects = models.storage.all()
+        obj = get_instance(args)
         if len(args) == 0:
             print('** class name missing **')
         elif args[0] not in HBNBCommand.__classes:
             print('** class doesn\'t exist **')
         elif len(args) == 1:
             print('** instance id missing **')
-        elif '{}.{}'.format(args[0], args[1]) not in objects:
+        elif obj is None:
             print('** no instance found **')
         else:
-            print(objects["{}.{}".format(args[0], args[1])])
+            print(obj)
 
     def do_destroy(self, line):
         '''Usage: (hbnb) destroy <class_name> <id>
         Deletes an instance of the given class.
         '''
         args = parse(line)
-        objects = models.storage.all()
+        obj = get_instance(args)
 
         if len(args) == 0:
             print('** class name missing **')
@@ -114,10 +152,12 @@ class HBNBCommand(cmd.Cmd):
             print('** class doesn\'t exist **')
         elif len(args) == 1:
             print('** instance id missing **')
-        elif '{}.{}'.format(args[0], args[1]) not in objects:
+        elif obj is None:
             print('** no instance found **')
+        elif models.storage.read_only:
+            print('** storage is read-only **')
         else:
-            del(objects['{}.{}'.format(args[0], args[1])])
+            models.storage.delete(obj)
             models.storage.save()
 
     def do_all(self, line):
@@ -129,52 +169,152 @@ class HBNBCommand(cmd.Cmd):
         if len(args) > 0 and args[0] not in HBNBCommand.__classes:
             print('** class doesn\'t exist **')
         else:
-            objects = models.storage.all()
+            if len(args) > 0:
+                objects = models.storage.all(args[0])
+            else:
+                objects = models.storage.all()
             output = []
             for obj in objects.values():
-                if len(args) > 0 and obj.__class__.__name__ == args[0]:
-                    output.append(obj.__str__())
-                elif len(args) == 0:
-                    output.append(obj.__str__())
+                output.append(obj.__str__())
             print(output)
 
     def do_update(self, line):
         '''Usage: update <class name> <id> <attribute name> "<attribute value>"
         Adds/updates an attribute to an instance of a given class.
+        A list attribute (e.g. Place.amenity_ids) takes a JSON list or
+        comma-separated values.
         '''
         args = parse(line)
-        objects = models.storage.all()
+        obj = get_instance(args)
         if len(args) == 0:
             print('** class name missing **')
         elif args[0] not in HBNBCommand.__classes:
             print('** class doesn\'t exist **')
         elif len(args) == 1:
             print('** instance id missing **')
-        elif '{}.{}'.format(args[0], args[1]) not in objects:
+        elif obj is None:
             print('** no instance found **')
         elif len(args) == 2:
             print('** attribute name missing **')
         elif len(args) == 3:
             print('** value missing **')
-        elif len(args) > 3:
-            obj = objects['{}.{}'.format(args[0], args[1])]
-            if args[2] in obj.__class__.__dict__.keys():
-                v_type = type(obj.__class__.__dict__[args[2]])
-                obj.__dict__[args[2]] = v_type(args[3])
-            else:
-                obj.__dict__[args[2]] = args[3]
-        models.storage.save()
+        elif models.storage.read_only:
+            print('** storage is read-only **')
+        elif isinstance(HBNBCommand.__classes[args[0]].__dict__.get(args[2]),
+                        property):
+            # e.g. State.cities, computed from the other objects.
+            print('** attribute can\'t be set **')
+        else:
+            v_type = type(getattr(HBNBCommand.__classes[args[0]], args[2],
+                                  None))
+            value = args[3].strip('"')
+            if v_type is list:
+                # Assigned as a whole, so storage re-indexes it.
+                try:
+                    value = json.loads(value) if value.startswith('[') \
+                        else [item for item in value.split(',') if item]
+                except ValueError:
+                    value = None
+                if type(value) is not list:
+                    print('** {} must be list **'.format(args[2]))
+                    return
+            elif v_type in (str, int, float):
+                # Keeps numbers numbers, which storage.between() sorts.
+                try:
+                    value = v_type(value)
+                except ValueError:
+                    print('** {} must be {} **'.format(args[2],
+                                                       v_type.__name__))
+                    return
+            setattr(obj, args[2], value)
+            models.storage.save()
 
     def do_count(self, line):
         '''Usage: count <class_name> or <class_name>.count()
         Print the number of instances of a given class.
         '''
         args = parse(line)
-        count = 0
-        for obj in models.storage.all().values():
-            if args[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        if len(args) > 0:
+            print(models.storage.count(args[0]))
+        else:
+            print(models.storage.count())
+
+    def do_search(self, line):
+        '''Usage: search <class_name> <attribute>=<low>..<high> ...
+        or <class_name>.search(<attribute>=<low>..<high>, ...)
+        Prints the instances whose numeric attributes are all in range,
+        in increasing order of the first one. Either bound may be left
+        out (e.g. max_guest=4..), and <attribute>=<value> matches one
+        value.
+        '''
+        args = [arg for arg in re.split(r'[\s,]+', line) if arg]
+        if len(args) == 0:
+            print('** class name missing **')
+        elif args[0] not in HBNBCommand.__classes:
+            print('** class doesn\'t exist **')
+        elif len(args) == 1:
+            print('** range missing **')
+        else:
+            ranges = []
+            for arg in args[1:]:
+                attribute, equals, bounds = arg.partition('=')
+                low, dots, high = bounds.partition('..')
+                try:
+                    if not (attribute.isidentifier() and equals and
+                            (low or dots)):
+                        raise ValueError(arg)
+                    low = number(low)
+                    high = number(high) if dots else low
+                except ValueError:
+                    print('** invalid range: {} **'.format(arg))
+                    return
+                ranges.append((attribute, low, high))
+            objects = None
+            for attribute, low, high in ranges:
+                found = models.storage.between(args[0], attribute, low, high)
+                if objects is not None:
+                    found = {key: obj for key, obj in objects.items()
+                             if key in found}
+                objects = found
+            print([str(obj) for obj in objects.values()])
+
+    def do_containing(self, line):
+        '''Usage: containing <class_name> <attribute> <value> ...
+        or <class_name>.containing(<attribute>, <value>, ...)
+        Prints the instances whose list attribute holds every value,
+        e.g. containing Place amenity_ids <amenity id> <amenity id>.
+        '''
+        args = [arg for arg in re.split(r'[\s,]+', line) if arg]
+        if len(args) == 0:
+            print('** class name missing **')
+        elif args[0] not in HBNBCommand.__classes:
+            print('** class doesn\'t exist **')
+        elif len(args) == 1:
+            print('** attribute name missing **')
+        else:
+            objects = models.storage.containing(
+                    args[0], args[1], [arg.strip('"') for arg in args[2:]])
+            print([str(obj) for obj in objects.values()])
+
+    def do_nearby(self, line):
+        '''Usage: nearby <latitude> <longitude> <km>
+        Prints the places within km of a point, nearest first.
+        '''
+        numbers = parse_numbers(parse(line), ('latitude', 'longitude', 'km'))
+        if numbers is not None:
+            objects = models.storage.within_radius(*numbers)
+            print([str(obj) for obj in objects.values()])
+
+    def do_bbox(self, line):
+        '''Usage: bbox <south> <west> <north> <east>
+        Prints the places located in a box of latitudes and longitudes
+        (it crosses the antimeridian if west is greater than east).
+        '''
+        numbers = parse_numbers(parse(line),
+                                ('south', 'west', 'north', 'east'))
+        if numbers is not None:
+            objects = models.storage.in_bbox(*numbers)
+            print([str(obj) for obj in objects.values()])
 
 
 if __name__ == '__main__':
@@ -1,7 +1,22 @@
 #!/usr/bin/python3
-'''Create a unique FileStorage instance.'''
+'''Create a unique storage instance.
+
+The engine is picked by the HBNB_TYPE_STORAGE environment variable:
+'sqlite' for SQLiteStorage, 'mmap' for the read-only MappedStorage over
+file.json, anything else for FileStorage.
+'''
+from os import getenv
 from models.engine.file_storage import FileStorage
+from models.engine.sqlite_storage import SQLiteStorage
+from models.engine.mapped_storage import MappedStorage
+# Importing the models registers them in models.base_model.classes.
+from models import user, state, city, amenity, place, review
 
 
-storage = FileStorage()
+if getenv('HBNB_TYPE_STORAGE') == 'sqlite':
+    storage = SQLiteStorage()
+elif getenv('HBNB_TYPE_STORAGE') == 'mmap':
+    storage = MappedStorage()
+else:
+    storage = FileStorage()
 storage.reload()
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 '''Defines the child class - Amenity.'''
 
+import models
 from models.base_model import BaseModel
 
 
@@ -9,6 +10,14 @@ class Amenity(BaseModel):
 
     Attributes:
         name (str) - The name of the amenity.
+        places (list) - The Place instances whose amenity_ids hold the
+            amenity's id (read-only).
     '''
 
     name = ''
+
+    @property
+    def places(self):
+        '''list: The Place instances whose amenity_ids hold the id.'''
+        return list(models.storage.containing('Place', 'amenity_ids',
+                                              [self.id]).values())
@@ -3,11 +3,46 @@
 
 import uuid
 import models
+from os import getenv
 from datetime import datetime
 
 
+classes = {}
+'''dict: Maps the name of every model class to the class itself.'''
+
+datetimes = ('created_at', 'updated_at')
+'''tuple: The attributes to_dict() writes as ISO format strings.'''
+
+_compact_classes = {}
+
+
 class BaseModel:
-    '''Forms the base class from which other classes will inherit.'''
+    '''Forms the base class from which other classes will inherit.
+
+    Every subclass is added to ``classes`` when it is defined.
+
+    Attributes:
+        compact (bool): If True, new instances use the compact layout of
+            their class (see compact_class()). Defaults to the
+            HBNB_COMPACT_MODELS environment variable.
+    '''
+
+    compact = getenv('HBNB_COMPACT_MODELS', '0') == '1'
+
+    def __init_subclass__(cls, **kwargs):
+        '''Register a new model class in ``classes``.'''
+        super().__init_subclass__(**kwargs)
+        classes[cls.__name__] = cls
+
+    def __new__(cls, *args, **kwargs):
+        '''Create the instance, with the compact layout in compact mode.'''
+        if not cls.compact:
+            return super().__new__(cls)
+        # type() only runs __init__ on real instances of cls, so the
+        # compact instance has to be initialized here.
+        obj = object.__new__(compact_class(cls))
+        obj.__init__(*args, **kwargs)
+        return obj
 
     def __init__(self, *args, **kwargs):
         '''Create an instance of the BaseModel class.
@@ -17,14 +52,16 @@ class BaseModel:
             **kwargs (dict): Key/value pair of attributes.
         '''
 
-        time_format = '%Y-%m-%dT%H:%M:%S.%f'
         if kwargs:
+            # fromisoformat() reads what isoformat() writes, including
+            # timestamps without microseconds, and is much faster than
+            # strptime().
             if 'created_at' in kwargs:
-                kwargs['created_at'] = datetime.strptime(
-                        kwargs['created_at'], time_format)
+                kwargs['created_at'] = datetime.fromisoformat(
+                        kwargs['created_at'])
             if 'updated_at' in kwargs:
-                kwargs['updated_at'] = datetime.strptime(
-                        kwargs['updated_at'], time_format)
+                kwargs['updated_at'] = datetime.fromisoformat(
+                        kwargs['updated_at'])
             for key, value in kwargs.items():
                 if key != '__class__':
                     setattr(self, key, value)
@@ -35,6 +72,17 @@ class BaseModel:
             self.updated_at = datetime.now()
             models.storage.new(self)
 
+    def __setattr__(self, name, value):
+        '''Set an attribute and flag the instance as changed in storage.'''
+        lock = models.storage.lock
+        if lock is None:
+            models.storage.touch(self)
+            object.__setattr__(self, name, value)
+            return
+        with lock:
+            models.storage.touch(self)
+            object.__setattr__(self, name, value)
+
     def save(self):
         '''Updates updated_at with the current datetime.'''
         self.updated_at = datetime.now()
@@ -47,13 +95,221 @@ class BaseModel:
         - It also contains a key/value pair: __class__/te name of the class
         - The created_at and updated_at values will be in the iso format.'''
 
-        dict_rep = self.__dict__.copy()
+        dict_rep = self._attributes()
         dict_rep['__class__'] = self.__class__.__name__
         dict_rep['created_at'] = self.created_at.isoformat()
         dict_rep['updated_at'] = self.updated_at.isoformat()
 
         return dict_rep
 
+    def _attributes(self):
+        '''Return a new dict of the attributes set on the instance.'''
+        return self.__dict__.copy()
+
+    def _restore(self, attributes):
+        '''Replace all the attributes of the instance, without telling
+        storage (used to roll changes back).'''
+        self.__dict__.clear()
+        self.__dict__.update(attributes)
+
+    @classmethod
+    def _from_attributes(cls, attributes):
+        '''Return a new instance with these attributes, without running
+        __init__() or telling storage (the inverse of _attributes()).'''
+        if cls.compact:
+            return compact_class(cls)._from_attributes(attributes)
+        obj = object.__new__(cls)
+        obj.__dict__.update(attributes)
+        return obj
+
     def __str__(self):
         ''' Return the str/print rep of an instance of BaseModel class.'''
         return f'[{self.__class__.__name__}] ({(self.id)}) {self.__dict__}'
+
+
+classes['BaseModel'] = BaseModel
+
+
+class ListAttribute:
+    '''A model attribute whose default is an empty list of each
+    instance's own.
+
+    A plain list class attribute is shared: appending to it through one
+    instance changes it for all of them. Read on an instance that has not
+    set it, this stores a new empty list on the instance (without telling
+    storage, as it is still the default), like functools.cached_property;
+    read on the class, it is a new empty list.
+    '''
+
+    def __set_name__(self, owner, name):
+        '''Remember the name of the attribute.'''
+        self.name = name
+
+    def __get__(self, obj, cls=None):
+        '''Return the list of obj, storing an empty one if unset.'''
+        if obj is None:
+            return []
+        return self.__holder(obj, True).setdefault(self.name, [])
+
+    def peek(self, obj):
+        '''Return the list of obj, or an empty tuple if it is unset,
+        without storing one (an index reading it must not change what
+        obj saves).'''
+        return self.__holder(obj, False).get(self.name, ())
+
+    @staticmethod
+    def __holder(obj, create):
+        '''Return the dict the attributes of obj are set in.'''
+        try:
+            return object.__getattribute__(obj, '__dict__')
+        except AttributeError:
+            # The compact layout keeps it with the ad-hoc attributes.
+            if create:
+                return obj._extra_dict()
+            try:
+                return object.__getattribute__(obj, '_extra')
+            except AttributeError:
+                return {}
+
+
+class CompactModel:
+    '''Base of the compact classes built by compact_class().
+
+    id, created_at, updated_at and the attributes declared on the model
+    are kept in slots. Any other attribute goes to the _extra dict, which
+    only exists once such an attribute has been set.
+    '''
+
+    __slots__ = ('_extra', '__weakref__')
+
+    @property
+    def __class__(self):
+        '''The model class, so isinstance() and __class__ still work.'''
+        return self._model
+
+    def __getattr__(self, name):
+        '''Return an ad-hoc attribute, or the class default of a declared
+        attribute that is not set yet.'''
+        try:
+            return object.__getattribute__(self, '_extra')[name]
+        except (AttributeError, KeyError):
+            pass
+        try:
+            return self._defaults[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        '''Set an attribute and flag the instance as changed in storage.'''
+        lock = models.storage.lock
+        if lock is not None:
+            with lock:
+                self.__set(name, value)
+        else:
+            self.__set(name, value)
+
+    def __set(self, name, value):
+        '''Flag the instance as changed in storage and set an attribute.'''
+        models.storage.touch(self)
+        if name in self._fields:
+            object.__setattr__(self, name, value)
+        else:
+            self._extra_dict()[name] = value
+
+    def _extra_dict(self):
+        '''Return the dict of ad-hoc attributes, creating it if needed.'''
+        try:
+            return object.__getattribute__(self, '_extra')
+        except AttributeError:
+            extra = {}
+            object.__setattr__(self, '_extra', extra)
+            return extra
+
+    def _attributes(self):
+        '''Return a new dict of the attributes set on the instance.'''
+        attributes = {}
+        for name in self._fields:
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        try:
+            attributes.update(object.__getattribute__(self, '_extra'))
+        except AttributeError:
+            pass
+        return attributes
+
+    def _restore(self, attributes):
+        '''Replace all the attributes of the instance, without telling
+        storage (used to roll changes back).'''
+        for name in tuple(self._fields) + ('_extra',):
+            try:
+                object.__delattr__(self, name)
+            except AttributeError:
+                pass
+        for name, value in attributes.items():
+            if name in self._fields:
+                object.__setattr__(self, name, value)
+            else:
+                self._extra_dict()[name] = value
+
+    @classmethod
+    def _from_attributes(cls, attributes):
+        '''Return a new instance with these attributes, without running
+        __init__() or telling storage (the inverse of _attributes()).'''
+        obj = object.__new__(cls)
+        fields = cls._fields
+        for name, value in attributes.items():
+            if name in fields:
+                object.__setattr__(obj, name, value)
+            else:
+                obj._extra_dict()[name] = value
+        return obj
+
+    def __str__(self):
+        '''Return the str/print rep of the instance (see BaseModel).'''
+        return f'[{self._model.__name__}] ({(self.id)}) ' \
+            f'{self._attributes()}'
+
+
+def compact_class(cls):
+    '''Return the compact variant of the model class cls.
+
+    The variant has no per-instance __dict__: it keeps every attribute
+    declared on the model (e.g. Place.city_id) in __slots__, next to id,
+    created_at and updated_at. The methods of cls and its bases are
+    copied over (they must not use the zero-argument form of super()),
+    and instances report cls as their __class__.
+
+    Args:
+        cls (type): BaseModel or one of its subclasses.
+    '''
+    if '_model' in cls.__dict__:
+        return cls
+    compact = _compact_classes.get(cls)
+    if compact is None:
+        namespace = {}
+        defaults = {}
+        mro = cls.__mro__
+        for klass in reversed(mro[:-1]):
+            for name, value in vars(klass).items():
+                if hasattr(value, '__get__'):
+                    namespace[name] = value
+                elif klass is not BaseModel and not name.startswith('_'):
+                    defaults[name] = value
+        for name in ('__new__', '__init_subclass__', '__dict__',
+                     '__weakref__') + tuple(vars(CompactModel)):
+            namespace.pop(name, None)
+        fields = ('id', 'created_at', 'updated_at') + tuple(defaults)
+        namespace.update({
+            '__slots__': fields,
+            '__module__': cls.__module__,
+            '__qualname__': cls.__qualname__,
+            '__doc__': cls.__doc__,
+            '_model': cls,
+            '_defaults': defaults,
+            '_fields': dict.fromkeys(fields),
+        })
+        compact = type(cls.__name__, (CompactModel,), namespace)
+        _compact_classes[cls] = compact
+    return compact
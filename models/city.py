@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 '''Defines the child class - City.'''
 
+import models
 from models.base_model import BaseModel
 
 
@@ -10,7 +11,14 @@ class City(BaseModel):
     Attributes:
         state_id (str): The State's id.
         name (str): The name of the city.
+        places (list): The Place instances of the city (read-only).
     '''
 
     state_id = ''
     name = ''
+
+    @property
+    def places(self):
+        '''list: The Place instances whose city_id is the city's id.'''
+        return list(models.storage.related('Place', 'city_id',
+                                           self.id).values())
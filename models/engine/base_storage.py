@@ -0,0 +1,287 @@
+#!/usr/bin/python3
+'''Defines the BaseStorage class, the interface of the storage engines.'''
+
+import inspect
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from models.engine import geo
+from models.base_model import ListAttribute, classes, datetimes
+
+
+class BaseStorage(ABC):
+    '''Forms the base class every storage engine inherits from.
+
+    Objects are identified by their key, <class name>.id. Wherever a class
+    is expected, the class itself or its name can be passed.
+
+    The models call new() when an instance is created, touch() before one
+    of its attributes is set and save() from BaseModel.save().
+
+    Attributes:
+        read_only (bool): True if new(), delete() and save() are not
+            supported.
+        lock (RLock): Held by the models while they change an object
+            (touch() and the change itself), so an engine writing in
+            another thread never sees a change half made. None when no
+            other thread needs to be kept out.
+    '''
+
+    read_only = False
+    lock = None
+
+    @abstractmethod
+    def all(self, cls=None):
+        '''Returns a dictionary of the stored objects by key.
+
+        Args:
+            cls (type or str): If given, only the objects of this class.
+        '''
+
+    def count(self, cls=None):
+        '''Returns the number of stored objects.
+
+        Args:
+            cls (type or str): If given, only count this class.
+        '''
+        return len(self.all(cls))
+
+    def get(self, cls, id):
+        '''Returns the stored object of class cls with this id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        return self.all(cls).get(self.key(cls, id))
+
+    def related(self, cls, attribute, value):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute equals value.
+
+        It looks up the objects referring to another one through a
+        foreign key, e.g. related(Review, 'place_id', place.id). This
+        implementation scans every object of cls; engines override it
+        with an index.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            value (any): The value looked for.
+        '''
+        return {key: obj for key, obj in self.all(cls).items()
+                if getattr(obj, attribute, None) == value}
+
+    def between(self, cls, attribute, low=None, high=None):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a number from low to high, in increasing order
+        of attribute.
+
+        Only values is_number() accepts are found. This implementation
+        scans every object of cls; engines override it with an index.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            low (int or float): The smallest value included, or None.
+            high (int or float): The largest value included, or None.
+        '''
+        found = []
+        for key, obj in self.all(cls).items():
+            value = getattr(obj, attribute, None)
+            if self.is_number(value) and \
+                    (low is None or value >= low) and \
+                    (high is None or value <= high):
+                found.append((value, key, obj))
+        found.sort(key=lambda item: item[0])
+        return {key: obj for value, key, obj in found}
+
+    def containing(self, cls, attribute, values):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a list holding every one of values.
+
+        It filters objects by a list of ids, e.g. the Places with both
+        amenities: containing(Place, 'amenity_ids', [wifi.id, pets.id]).
+        This implementation scans every object of cls; engines override
+        it with an index.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute, e.g. amenity_ids.
+            values (iterable): The elements looked for.
+        '''
+        values = list(values)
+        found = {}
+        for key, obj in self.all(cls).items():
+            held = self.list_of(obj, attribute)
+            if held is not None and all(value in held for value in values):
+                found[key] = obj
+        return found
+
+    def in_bbox(self, south, west, north, east, cls='Place'):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose latitude and longitude are in a box.
+
+        A box whose west is greater than its east crosses the
+        antimeridian. This implementation scans every object of cls;
+        engines override it with an index.
+
+        Args:
+            south (float): The smallest latitude included.
+            west (float): The westernmost longitude included.
+            north (float): The largest latitude included.
+            east (float): The easternmost longitude included.
+            cls (type or str): The class of the objects.
+        '''
+        found = {}
+        for key, obj in self.all(cls).items():
+            lat = getattr(obj, 'latitude', None)
+            lon = getattr(obj, 'longitude', None)
+            if self.is_number(lat) and self.is_number(lon) and \
+                    geo.inside(lat, lon, south, west, north, east):
+                found[key] = obj
+        return found
+
+    def within_radius(self, lat, lon, km, cls='Place'):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        within km of a point, nearest first.
+
+        The candidates are looked up with in_bbox(), so engines only
+        need to index that.
+
+        Args:
+            lat (float): The latitude of the point.
+            lon (float): The longitude of the point.
+            km (float): The distance.
+            cls (type or str): The class of the objects.
+        '''
+        found = []
+        for key, obj in self.in_bbox(*geo.around(lat, lon, km),
+                                     cls=cls).items():
+            away = geo.distance(lat, lon, obj.latitude, obj.longitude)
+            if away <= km:
+                found.append((away, key, obj))
+        found.sort(key=lambda item: item[0])
+        return {key: obj for away, key, obj in found}
+
+    @abstractmethod
+    def new(self, obj):
+        '''Adds an object to the storage.
+
+        Args:
+            obj (BaseModel): The object to be stored.
+        '''
+
+    def touch(self, obj):
+        '''Tells the storage that an attribute of obj is about to be set.
+
+        Args:
+            obj (BaseModel): The object that changes.
+        '''
+
+    @abstractmethod
+    def delete(self, obj=None):
+        '''Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to be removed. Does nothing if None.
+        '''
+
+    @abstractmethod
+    def save(self):
+        '''Makes the changes since the last save persistent.'''
+
+    @abstractmethod
+    def reload(self):
+        '''Loads (or opens) the persisted objects.'''
+
+    @contextmanager
+    def batch(self):
+        '''Groups the changes and saves made in the block.
+
+        Engines that support it defer the saves made in the block to its
+        end, and put the objects back the way they were if it raises.
+        This implementation only runs the block.
+
+            with storage.batch():
+                for row in rows:
+                    place = Place()
+                    place.name = row['name']
+                    place.save()
+        '''
+        yield self
+
+    def flush(self):
+        '''Blocks until every save() so far has been written.'''
+
+    def refresh(self):
+        '''Picks up the changes other processes saved, if supported.'''
+
+    def close(self):
+        '''Releases the resources held by the storage.'''
+
+    @staticmethod
+    def key(cls, id):
+        '''Returns the key of the object of class cls with this id.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        return BaseStorage._class_name(cls) + '.' + str(id)
+
+    @staticmethod
+    def _class_name(cls):
+        '''Returns the name of cls, which may be a class or a class name.
+
+        Args:
+            cls (type or str): The class.
+        '''
+        return cls if isinstance(cls, str) else cls.__name__
+
+    @staticmethod
+    def _declared(name, attribute):
+        '''Return True if the model class called name declares attribute:
+        every model has an id and its timestamps, and the others are the
+        plain class attributes of the class or its bases. Engines only
+        index those, so that arbitrary queries do not add indexes every
+        change has to update.'''
+        if attribute == 'id' or attribute in datetimes:
+            return True
+        for model in getattr(classes.get(name), '__mro__', ()):
+            if attribute in vars(model):
+                value = vars(model)[attribute]
+                return not callable(value) and \
+                    not isinstance(value, (property, staticmethod,
+                                           classmethod))
+        return False
+
+    @staticmethod
+    def list_of(obj, attribute):
+        '''Returns the attribute of obj if it is a list or tuple, else None.
+
+        Unlike getattr(), it does not store the default of a ListAttribute
+        on obj, so a query does not change what the objects save.
+
+        Args:
+            obj (BaseModel): The object.
+            attribute (str): The name of the attribute.
+        '''
+        try:
+            held = vars(obj)[attribute]
+        except (TypeError, KeyError):
+            held = inspect.getattr_static(obj, attribute, None)
+        if isinstance(held, ListAttribute):
+            held = held.peek(obj)
+        elif held is None:
+            held = getattr(obj, attribute, None)
+        return held if isinstance(held, (list, tuple)) else None
+
+    @staticmethod
+    def is_number(value):
+        '''Returns True if value is an int or float between() can order
+        (not NaN).
+
+        Args:
+            value (any): The value of an attribute.
+        '''
+        return isinstance(value, (int, float)) and value == value
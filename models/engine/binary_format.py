@@ -0,0 +1,562 @@
+#!/usr/bin/python3
+'''Defines a compact binary format for the FileStorage snapshot.
+
+A file starts with MAGIC and the order of the records, then holds one
+block per class:
+
+    class name, field names    the schema, written once per block
+    number of groups
+    groups                     the records with the same keys in the
+                               same order, stored column by column
+
+A group is the field numbers of its keys and its number of records,
+followed by one column per key. A column starts with a one byte kind,
+chosen from the values it holds:
+
+    _UUID     lowercase UUID strings, 16 bytes each
+    _TIME     isoformat() timestamps, int64 microseconds since the epoch
+    _CLASS    the name of the block's class, nothing stored
+    _STR      other strings, their lengths then their UTF-8 text
+    _INT      integers, int64 each
+    _FLOAT    floats, 8 bytes each
+    _ANY      anything else, each value tagged with its own kind
+
+so whole columns are decoded at once by struct and bytes methods rather
+than value by value. Strings are stored as UTF-8, lone surrogates
+included.
+
+The order is a number of runs, each the number of a group (counting
+from the first group of the first block) and how many of its records
+come next. No runs means the records are in the order of the groups,
+which can then be read one group at a time.
+
+A string is only packed if it decodes back to the same string, so
+reading a file gives records equal to the ones written, in the same
+order and with their keys in the same order, and converting JSON to
+binary and back is lossless.
+
+Usage: python3 -m models.engine.binary_format to-binary|to-json SRC DST
+'''
+
+import re
+import sys
+import json
+import struct
+from datetime import datetime, timedelta
+from models.engine import json_stream
+
+MAGIC = b'HBNB\x02'
+# Every version read; the first one has no order, its records are read in
+# the order of the groups.
+MAGICS = (MAGIC, b'HBNB\x01')
+
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_LIST = 6
+_DICT = 7
+_UUID = 8
+_TIME = 9
+_CLASS = 10
+_ANY = 11
+
+_UUID_RE = re.compile('[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                      '[0-9a-f]{12}')
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_double = struct.Struct('<d')
+_int64 = struct.Struct('<q')
+
+
+def _write_varint(out, n):
+    '''Append the unsigned integer n to out, 7 bits per byte.'''
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_str(out, s):
+    '''Append the length and UTF-8 bytes of s to out.'''
+    data = s.encode('utf-8', 'surrogatepass')
+    _write_varint(out, len(data))
+    out += data
+
+
+def _is_uuid(s):
+    '''Return True if s is a lowercase UUID string.'''
+    return len(s) == 36 and _UUID_RE.fullmatch(s) is not None
+
+
+def _timestamp(s):
+    '''Return the microseconds since the epoch of the isoformat()
+    timestamp s, or None if s does not round-trip as one.'''
+    if len(s) not in (19, 26) or s[10] != 'T':
+        return None
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None or dt.isoformat() != s:
+        return None
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _uuid(h):
+    '''Return the UUID string of the 32 hex digits h.'''
+    return '{}-{}-{}-{}-{}'.format(h[:8], h[8:12], h[12:16], h[16:20],
+                                   h[20:])
+
+
+def _isoformat(us):
+    '''Return the isoformat() timestamp of us microseconds since the
+    epoch.'''
+    return (_EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+def _write_value(out, value, class_name):
+    '''Append the tag and bytes of value to out.'''
+    if type(value) is str:
+        if value == class_name:
+            out.append(_CLASS)
+        elif _is_uuid(value):
+            out.append(_UUID)
+            out += bytes.fromhex(value.replace('-', ''))
+        else:
+            us = _timestamp(value)
+            if us is None:
+                out.append(_STR)
+                _write_str(out, value)
+            else:
+                out.append(_TIME)
+                out += _int64.pack(us)
+    elif value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif type(value) is int:
+        out.append(_INT)
+        # Zigzag, so small negative numbers stay short.
+        _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    elif type(value) is float:
+        out.append(_FLOAT)
+        out += _double.pack(value)
+    elif type(value) is list:
+        out.append(_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _write_value(out, item, class_name)
+    elif type(value) is dict:
+        out.append(_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _write_str(out, key)
+            _write_value(out, item, class_name)
+    else:
+        raise TypeError('Cannot encode {}'.format(type(value).__name__))
+
+
+def _write_column(out, values, class_name):
+    '''Append the kind and bytes of a column of values to out.'''
+    n = len(values)
+    kind = type(values[0])
+    if any(type(value) is not kind for value in values):
+        kind = None
+    if kind is str:
+        if all(value == class_name for value in values):
+            out.append(_CLASS)
+            return
+        if all(_is_uuid(value) for value in values):
+            out.append(_UUID)
+            out += bytes.fromhex(''.join(values).replace('-', ''))
+            return
+        micros = [_timestamp(value) for value in values]
+        if None not in micros:
+            out.append(_TIME)
+            out += struct.pack('<{}q'.format(n), *micros)
+            return
+        text = ''.join(values).encode('utf-8', 'surrogatepass')
+        out.append(_STR)
+        out += struct.pack('<{}I'.format(n), *map(len, values))
+        _write_varint(out, len(text))
+        out += text
+    elif kind is int and _INT64_MIN <= min(values) and \
+            max(values) <= _INT64_MAX:
+        out.append(_INT)
+        out += struct.pack('<{}q'.format(n), *values)
+    elif kind is float:
+        out.append(_FLOAT)
+        out += struct.pack('<{}d'.format(n), *values)
+    else:
+        out.append(_ANY)
+        for value in values:
+            _write_value(out, value, class_name)
+
+
+def dump(records, f):
+    '''Write records to the binary file f.
+
+    Args:
+        records (iterable): The dictionaries to write (to_dict() output);
+            each must have a '__class__' key.
+        f (file): A file opened in binary mode.
+    '''
+    blocks = {}
+    order = []
+    for record in records:
+        class_name = record['__class__']
+        keys = tuple(record)
+        blocks.setdefault(class_name, {}).setdefault(keys, []).append(record)
+        order.append((class_name, keys))
+    numbers = {}
+    for class_name, groups in blocks.items():
+        for keys in groups:
+            numbers[class_name, keys] = len(numbers)
+    runs = []
+    for group in order:
+        number = numbers[group]
+        if runs and runs[-1][0] == number:
+            runs[-1][1] += 1
+        else:
+            runs.append([number, 1])
+    if all(number == i for i, (number, n) in enumerate(runs)):
+        runs = []
+    out = bytearray(MAGIC)
+    _write_varint(out, len(runs))
+    for number, n in runs:
+        _write_varint(out, number)
+        _write_varint(out, n)
+    f.write(out)
+    for class_name, groups in blocks.items():
+        fields = {}
+        for keys in groups:
+            for key in keys:
+                fields.setdefault(key, len(fields))
+        out = bytearray()
+        _write_str(out, class_name)
+        _write_varint(out, len(fields))
+        for key in fields:
+            _write_str(out, key)
+        _write_varint(out, len(groups))
+        f.write(out)
+        # One group at a time, so the file (or compressor) is fed as the
+        # columns are encoded rather than once the whole block is.
+        for keys, group in groups.items():
+            out = bytearray()
+            _write_varint(out, len(keys))
+            for key in keys:
+                _write_varint(out, fields[key])
+            _write_varint(out, len(group))
+            for key in keys:
+                _write_column(out, [record[key] for record in group],
+                              class_name)
+            f.write(out)
+
+
+def _read_varint(data, pos):
+    '''Return the varint at pos in data and the position after it.'''
+    n = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _read_str(data, pos):
+    '''Return the string at pos in data and the position after it.'''
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise IndexError
+    return data[pos:end].decode('utf-8', 'surrogatepass'), end
+
+
+def _read_value(data, pos, class_name):
+    '''Return the tagged value at pos in data and the position after it.'''
+    tag = data[pos]
+    pos += 1
+    if tag == _STR:
+        return _read_str(data, pos)
+    if tag == _UUID:
+        if pos + 16 > len(data):
+            raise IndexError
+        return _uuid(data[pos:pos + 16].hex()), pos + 16
+    if tag == _TIME:
+        return _isoformat(_int64.unpack_from(data, pos)[0]), pos + 8
+    if tag == _CLASS:
+        return class_name, pos
+    if tag == _INT:
+        n, pos = _read_varint(data, pos)
+        return (n >> 1 if not n & 1 else -(n >> 1) - 1), pos
+    if tag == _FLOAT:
+        return _double.unpack_from(data, pos)[0], pos + 8
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _LIST:
+        n, pos = _read_varint(data, pos)
+        items = []
+        for i in range(n):
+            item, pos = _read_value(data, pos, class_name)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        n, pos = _read_varint(data, pos)
+        items = {}
+        for i in range(n):
+            key, pos = _read_str(data, pos)
+            items[key], pos = _read_value(data, pos, class_name)
+        return items, pos
+    raise ValueError('Unknown tag {}'.format(tag))
+
+
+def _read_column(data, pos, n, class_name, times=False):
+    '''Return the column of n values at pos in data and the position
+    after it; a _TIME column gives datetimes if times is True.'''
+    kind = data[pos]
+    pos += 1
+    if kind == _UUID:
+        end = pos + 16 * n
+        if end > len(data):
+            raise IndexError
+        h = data[pos:end].hex()
+        return [h[i:i + 8] + '-' + h[i + 8:i + 12] + '-' +
+                h[i + 12:i + 16] + '-' + h[i + 16:i + 20] + '-' +
+                h[i + 20:i + 32] for i in range(0, 32 * n, 32)], end
+    if kind == _TIME:
+        micros = struct.unpack_from('<{}q'.format(n), data, pos)
+        values = [_EPOCH + timedelta(microseconds=us) for us in micros]
+        if not times:
+            values = [value.isoformat() for value in values]
+        return values, pos + 8 * n
+    if kind == _CLASS:
+        return [class_name] * n, pos
+    if kind == _STR:
+        lengths = struct.unpack_from('<{}I'.format(n), data, pos)
+        size, pos = _read_varint(data, pos + 4 * n)
+        if pos + size > len(data):
+            raise IndexError
+        text = data[pos:pos + size].decode('utf-8', 'surrogatepass')
+        values = []
+        start = 0
+        for length in lengths:
+            values.append(text[start:start + length])
+            start += length
+        return values, pos + size
+    if kind == _INT:
+        values = struct.unpack_from('<{}q'.format(n), data, pos)
+        return list(values), pos + 8 * n
+    if kind == _FLOAT:
+        values = struct.unpack_from('<{}d'.format(n), data, pos)
+        return list(values), pos + 8 * n
+    if kind == _ANY:
+        values = []
+        for i in range(n):
+            value, pos = _read_value(data, pos, class_name)
+            values.append(value)
+        return values, pos
+    raise ValueError('Unknown column kind {}'.format(kind))
+
+
+def _read_magic(data, pos):
+    '''Return the MAGIC-sized header at pos in data and the position
+    after it.'''
+    end = pos + len(MAGIC)
+    if end > len(data):
+        raise IndexError
+    return bytes(data[pos:end]), end
+
+
+class _Reader:
+    '''Parses the content of a binary file, held whole or read as needed.
+
+    Attributes:
+        data (bytes): The content read and not parsed yet, from pos.
+        pos (int): The position in data of the next value.
+        file (file): The file the rest of the content is read from, or
+            None once it is all in data.
+    '''
+
+    def __init__(self, data=b'', file=None):
+        self.data = data
+        self.pos = 0
+        self.file = file
+
+    def parse(self, read, *args):
+        '''Return the value read(data, pos, *args) finds at the position,
+        and move past it; read raises IndexError or struct.error if data
+        is cut short of the value.'''
+        while True:
+            try:
+                value, self.pos = read(self.data, self.pos, *args)
+                return value
+            except (IndexError, struct.error):
+                if not self.__read_more():
+                    raise
+
+    def at_end(self):
+        '''Return True if the whole content has been parsed.'''
+        return self.pos >= len(self.data) and not self.__read_more()
+
+    def __read_more(self):
+        '''Add more of the file to data, dropping what was parsed; return
+        False if there is no more.'''
+        if self.file is None:
+            return False
+        # At least doubles what is held, so a value is parsed again only
+        # a few times however long it is.
+        more = self.file.read(max(len(self.data) - self.pos, 1 << 16))
+        if not more:
+            self.file = None
+            return False
+        self.data = self.data[self.pos:] + more
+        self.pos = 0
+        return True
+
+
+def _iter_groups(reader, datetimes=()):
+    '''Yield the keys and columns of each group of the blocks the reader
+    parses; see iter_records() for datetimes.'''
+    while not reader.at_end():
+        class_name = reader.parse(_read_str)
+        fields = [reader.parse(_read_str)
+                  for i in range(reader.parse(_read_varint))]
+        for i in range(reader.parse(_read_varint)):
+            keys = [fields[reader.parse(_read_varint)]
+                    for j in range(reader.parse(_read_varint))]
+            n = reader.parse(_read_varint)
+            yield keys, [reader.parse(_read_column, n, class_name,
+                                      key in datetimes)
+                         for key in keys]
+
+
+def _iter_records(reader, datetimes):
+    '''Yield the records the reader parses; see iter_records().'''
+    try:
+        magic = reader.parse(_read_magic)
+    except (IndexError, struct.error):
+        magic = None
+    if magic not in MAGICS:
+        raise ValueError('Not a binary storage file')
+    try:
+        runs = []
+        if magic == MAGIC:
+            for i in range(reader.parse(_read_varint)):
+                number = reader.parse(_read_varint)
+                runs.append((number, reader.parse(_read_varint)))
+        if not runs:
+            for keys, columns in _iter_groups(reader, datetimes):
+                for row in zip(*columns):
+                    yield dict(zip(keys, row))
+            return
+        groups = [(keys, list(zip(*columns)))
+                  for keys, columns in _iter_groups(reader, datetimes)]
+        read = [0] * len(groups)
+        for number, count in runs:
+            keys, rows = groups[number]
+            start = read[number]
+            if start + count > len(rows):
+                raise IndexError
+            for row in rows[start:start + count]:
+                yield dict(zip(keys, row))
+            read[number] = start + count
+    except (IndexError, struct.error):
+        raise ValueError('Truncated binary storage file') from None
+
+
+def iter_records(data, datetimes=()):
+    '''Yield the records stored in data, in the order they were written.
+
+    Files whose records are in the order of their groups are read one
+    group of records at a time; the others are decoded whole first.
+
+    Args:
+        data (bytes): The content of a binary file.
+        datetimes (tuple): Names of the fields whose timestamps are read
+            as datetime objects rather than isoformat() strings; values
+            not packed as timestamps stay as they were written.
+
+    Raises:
+        ValueError: If data is not in this format or is truncated.
+    '''
+    return _iter_records(_Reader(data), datetimes)
+
+
+def iter_file(f, datetimes=()):
+    '''Yield the records of the binary file f, like iter_records().
+
+    The file is read as it is parsed, so only about one group of records
+    is held as bytes at a time, not the whole (maybe decompressed)
+    content.
+
+    Args:
+        f (file): A file opened in binary mode, at its start.
+        datetimes (tuple): See iter_records().
+
+    Raises:
+        ValueError: If the file is not in this format or is truncated.
+    '''
+    return _iter_records(_Reader(file=f), datetimes)
+
+
+def is_binary(path):
+    '''Returns True if the file at path is in this format.'''
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) in MAGICS
+
+
+def json_to_binary(src, dst):
+    '''Convert the JSON file src to the binary file dst.
+
+    Raises:
+        ValueError: If a key is not <record __class__>.<record id>, as it
+            could not be rebuilt from the record.
+    '''
+    records = []
+    with open(src, 'r', encoding='utf-8') as f:
+        for key, record in json_stream.iter_items(f):
+            if key != '{}.{}'.format(record.get('__class__'),
+                                     record.get('id')):
+                raise ValueError('Unexpected key {!r}'.format(key))
+            records.append(record)
+    with open(dst, 'wb') as f:
+        dump(records, f)
+
+
+def binary_to_json(src, dst):
+    '''Convert the binary file src to the JSON file dst.'''
+    with open(src, 'rb') as f, open(dst, 'w', encoding='utf-8') as out:
+        out.write('{')
+        out.write(', '.join(
+                json.dumps(record['__class__'] + '.' + record['id']) + ': ' +
+                json.dumps(record) for record in iter_file(f)))
+        out.write('}')
+
+
+def main(argv):
+    '''Run the conversion named by argv[1].'''
+    commands = {'to-binary': json_to_binary, 'to-json': binary_to_json}
+    if len(argv) != 4 or argv[1] not in commands:
+        print('Usage: python3 -m models.engine.binary_format '
+              'to-binary|to-json SRC DST', file=sys.stderr)
+        return 2
+    commands[argv[1]](argv[2], argv[3])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+'''Defines the compression codecs FileStorage can write snapshots with.
+
+Every codec streams: data is compressed as it is written and
+decompressed as it is read, so neither side holds an uncompressed copy
+of the whole file. Compressed files are recognised by their first bytes,
+so reading needs no setting.
+'''
+
+import bz2
+import gzip
+import lzma
+
+# The levels favour speed: the highest gzip and lzma levels take several
+# times longer for files a few percent smaller.
+codecs = {
+    # No file name or time in the header, so equal data gives equal files.
+    'gzip': lambda f, mode: gzip.GzipFile('', mode, 6, f, mtime=0),
+    'bz2': bz2.BZ2File,
+    'lzma': lambda f, mode: lzma.LZMAFile(
+            f, mode, preset=1 if mode == 'wb' else None),
+}
+
+_MAGICS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'lzma'),
+)
+
+
+def writer(f, codec):
+    '''Return a binary file compressing what is written to it into f.
+
+    Closing it finishes the compressed stream but leaves f open.
+
+    Args:
+        f (file): The file opened in binary mode to write to.
+        codec (str): A name in codecs.
+
+    Raises:
+        ValueError: If codec is unknown.
+    '''
+    if codec not in codecs:
+        raise ValueError('Unknown compression {!r}'.format(codec))
+    return codecs[codec](f, 'wb')
+
+
+def detect(head):
+    '''Return the codec of a file starting with head, or None.
+
+    Args:
+        head (bytes): The first 8 bytes of the file, or all of it.
+    '''
+    for magic, codec in _MAGICS:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def reader(f):
+    '''Return a binary file reading the decompressed content of f.
+
+    Args:
+        f (file): A buffered file opened in binary mode, at its start. If
+            it is not compressed, it is returned as is.
+    '''
+    codec = detect(f.peek(8))
+    if codec is None:
+        return f
+    return codecs[codec](f, 'rb')
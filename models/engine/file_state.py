@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+'''Defines how FileStorage tells whether its files changed.
+
+A file is recognised by its signature: (inode, size, mtime). On
+filesystems with coarse timestamps a file can change again without its
+mtime changing, so the files modified less than RECENT ago are also told
+apart by a checksum of their content.
+'''
+
+import os
+import time
+import zlib
+
+# In nanoseconds, like st_mtime_ns.
+RECENT = 2 * 10 ** 9
+
+
+def signature(path):
+    '''Return (inode, size, mtime) of path, or None if it is missing.'''
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def checksum(path):
+    '''Return the CRC-32 of the content of path, or None if it is
+    missing.'''
+    crc = 0
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                crc = zlib.crc32(chunk, crc)
+    except FileNotFoundError:
+        return None
+    return crc
+
+
+def scan(paths):
+    '''Return path -> signature of the paths that exist.'''
+    files = {}
+    for path in paths:
+        value = signature(path)
+        if value is not None:
+            files[path] = value
+    return files
+
+
+def recent_checksums(files, paths):
+    '''Return path -> checksum of the files among paths modified too
+    recently for their mtime to tell them apart.
+
+    Args:
+        files (dict): The scan() the paths are in.
+        paths (iterable): The paths to consider.
+    '''
+    recent = time.time_ns() - RECENT
+    return {path: checksum(path) for path in paths
+            if files[path][2] > recent}
+
+
+def verify(files, checksums):
+    '''Check the content of the files against their checksums.
+
+    Args:
+        files (dict): The scan() of the files as they are now.
+        checksums (dict): Path -> checksum of some of them.
+
+    Returns:
+        dict: The checksums still needed (those of the files still
+            modified too recently), or None if a file does not match.
+    '''
+    recent = time.time_ns() - RECENT
+    needed = {}
+    for path, value in checksums.items():
+        if path not in files or checksum(path) != value:
+            return None
+        if files[path][2] > recent:
+            needed[path] = value
+    return needed
@@ -1,31 +1,440 @@
 #!/usr/bin/python3
 '''Defines a new class called FileStorage.'''
 
+import io
+import os
+import re
 import json
-from models.base_model import BaseModel
-from models.user import User
-from models.state import State
-from models.city import City
-from models.amenity import Amenity
-from models.place import Place
-from models.review import Review
+import mmap
+import time
+import math
+import zlib
+import bisect
+import atexit
+import threading
+import multiprocessing
+from os import getenv
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from models.engine import json_stream
+from models.engine import binary_format
+from models.engine import snapshot_index
+from models.engine import compression
+from models.engine import reload_cache
+from models.engine import file_state
+from models.engine import geo
+from models.engine.base_storage import BaseStorage
+from models.engine.lazy_objects import LazyObjects
+from models.engine.lock_file import LockFile
+from models.engine.write_behind import WriteBehind
+from models.base_model import classes, datetimes
 
+_unlocked = nullcontext()
+# A JSON snapshot is only split for reload() into parts of at least this
+# many bytes, so small files are not worth starting processes for.
+_MIN_PART = 1 << 22
+# The end of an entry of a JSON snapshot followed by the key of the next
+# one. A string can hold '}, "' only if its quote closes it, which no key
+# can follow, so this never matches inside a value in practice.
+_ENTRY = re.compile(rb'\}, (?="\w+\.[^"\\]*": \{)')
 
-class FileStorage:
+
+class FileStorage(BaseStorage):
     '''Serializes/desirializes instances of BaseModel class
             to/from a JSON file.
 
     Attributes:
         __file_path (str): Path to JSON file (ex: file.json)
         __objects (dict): Container for objects with key <class name>.id
+        __changes (dict): Objects created or deleted since the last save,
+            keyed by <class name>.id (None marks a delete).
+        __dirty (dict): Objects whose attributes were set since the last
+            save, keyed by their id().
+        __cache (dict): <class name>.id -> (object, JSON text) of the
+            last serialized form of each object.
+        __classes (dict): Class name -> {<class name>.id: None} index
+            over the keys of __objects, so per-class lookups skip other
+            classes.
+        __indexed (dict): The __objects dictionary __classes was built for.
+        __indexed_size (int): Number of keys in __classes. If it is not
+            the size of __objects, objects were added or removed through
+            the dictionary all() returns, behind the indexes, and they are
+            built again.
+        __links (dict): Class name -> {attribute: [{<class name>.id:
+            value}, {value: {<class name>.id: None}}, sorted list of the
+            numeric values or None]}, the reverse indexes related(),
+            between(), in_bbox() and containing() build for each
+            declared attribute they are asked about, kept up to date
+            from then on. For in_bbox(), the attribute is ('latitude',
+            'longitude', grid_size) and the value the grid cell of the
+            location. For containing(), it is (attribute,): an object is
+            filed under each element of its list, and its value is their
+            tuple.
+        __linked (dict): The __objects dictionary __links was built for.
+        __moved (dict): Objects of the classes in __links whose attributes
+            were set since __links was last brought up to date, keyed by
+            their id().
+        __journal_size (int): Number of records in the journal file.
+        journal (bool): If True, save() appends the changes to a journal
+            file next to the snapshot instead of rewriting the snapshot.
+            Defaults to the HBNB_STORAGE_JOURNAL environment variable.
+        lazy (bool): If True, reload() keeps the raw records and only
+            builds an instance when it is first looked up or iterated.
+            Only building the instances is deferred: every entry is
+            still parsed from JSON (or decoded from binary) by reload(),
+            whose cost keeps growing with the size of the store.
+            Defaults to the HBNB_STORAGE_LAZY environment variable.
+        fsync (str): When written files are flushed to disk with fsync():
+            'never' (leave it to the OS), 'always' (on every save) or
+            'interval' (at most once every fsync_interval seconds, so a
+            burst of saves pays for one fsync). In 'interval' mode, the
+            files written since the last fsync are synced by a timer
+            once the interval is over, or by flush() and close(), so no
+            save stays unsynced for longer. Any other value makes save()
+            raise ValueError. Defaults to the HBNB_STORAGE_FSYNC
+            environment variable, else 'never'.
+        fsync_interval (float): Seconds between fsyncs in 'interval'
+            mode. Defaults to HBNB_STORAGE_FSYNC_INTERVAL, else 1.
+        __last_fsync (float): time.monotonic() of the last fsync.
+        __unsynced (dict): Paths of the files written and not synced yet
+            in 'interval' mode (the values are None).
+        __sync_timer (Timer): The timer that syncs them, or None.
+        __sync_lock (Lock): Guards __unsynced and __sync_timer, which the
+            timer thread changes.
+        __batches (list): The open batch() blocks, innermost last.
+        __deferred (bool): True if save() was called inside a batch.
+        shards (int): If 0, all objects are saved in one JSON file.
+            Otherwise each class is saved in its own files, next to
+            __file_path and named after it (file.State.0.json), split into
+            this many buckets by a hash of the key, and save() only
+            rewrites the files holding changed objects. Defaults to the
+            HBNB_STORAGE_SHARDS environment variable.
+        reload_mode (str): What reload() reads in worker processes:
+            'serial' (nothing), 'shards' (the shard files) or 'split'
+            (the shard files, and parts of a JSON snapshot too large to
+            read quickly in one go). Any other value makes reload() raise
+            ValueError. Defaults to the HBNB_STORAGE_RELOAD_MODE
+            environment variable, else 'shards'.
+        reload_workers (int): Number of processes reading the snapshot
+            in parallel on reload(), as reload_mode allows. They also
+            parse the timestamps, leaving this process only the instances
+            to create. 1 reads everything in this process. Defaults to
+            HBNB_STORAGE_RELOAD_WORKERS, else the CPU count.
+        __pending (set): (class name, bucket) of the shards changed since
+            they were last written.
+        __stale (list): Files read by reload() that the current layout
+            does not write; they are removed once it has been written.
+        format (str): 'json', or 'binary' to write the snapshot in the
+            compact format of models/engine/binary_format.py. reload()
+            reads either, whatever the setting, so the next snapshot
+            converts the file. The journal is always JSON. Defaults to
+            the HBNB_STORAGE_FORMAT environment variable, else 'json'.
+        index (bool): If True, each JSON snapshot (in the single file
+            layout) is written with the sorted key index MappedStorage
+            reads. Defaults to the HBNB_STORAGE_INDEX environment
+            variable.
+        compression (str): '' (none), 'gzip', 'bz2' or 'lzma': the codec
+            the snapshot and shard files are compressed with as they are
+            written. reload() recognises compressed files whatever the
+            setting. Compressed snapshots get no index, and the journal
+            is never compressed. Defaults to HBNB_STORAGE_COMPRESSION.
+        write_behind (bool): If True, save() returns at once and the
+            WriteBehind thread of models/engine/write_behind.py writes
+            the changes, coalescing the saves made within max_staleness
+            seconds of each other. flush() and close() wait for the
+            writes. Defaults to HBNB_STORAGE_WRITE_BEHIND.
+        max_staleness (float): Seconds a save() may wait before it is
+            written in write-behind mode. Defaults to
+            HBNB_STORAGE_MAX_STALENESS, else 1.
+        lock (RLock): The lock of the writer, which guards all the state
+            above while it runs; None otherwise, so that nothing pays for
+            locking when there is no writer.
+        __writer (WriteBehind): The background writer, or None.
+        shared (bool): If True, several processes can use the same files:
+            writes hold the LockFile of models/engine/lock_file.py
+            exclusively and first merge what the other processes saved,
+            so no update is lost, and reads hold it shared. Defaults to
+            HBNB_STORAGE_SHARED.
+        __lock_file (LockFile): The lock file, or None.
+        __signatures (dict): The file_state.scan() of the snapshot files
+            and journal as the objects were last read from or written to
+            them, to tell which ones changed since.
+        __checksums (dict): Path -> checksum of the files in __signatures
+            modified too recently for their mtime to tell.
+        __loaded (dict): The __objects dictionary __signatures is for.
+        grid_size (float): Size in degrees of the cells of the grid
+            in_bbox() and within_radius() find objects with. Defaults to
+            HBNB_STORAGE_GRID_SIZE, else 0.1 (about 11 km).
+        reload_cache (bool): If True, reload() starts from the cache of
+            models/engine/reload_cache.py when the files have not changed
+            since it was written, and writes it when they have. Defaults
+            to HBNB_STORAGE_RELOAD_CACHE.
+        skip_unchanged (bool): If True, reload() reads nothing when
+            neither the files nor the objects changed since the objects
+            were last read from or written to the files (see reload()).
+            Defaults to HBNB_STORAGE_SKIP_UNCHANGED.
     '''
 
     __file_path = 'file.json'
     __objects = {}
+    __changes = {}
+    __dirty = {}
+    __cache = {}
+    __classes = {}
+    __indexed = None
+    __indexed_size = 0
+    __links = {}
+    __linked = None
+    __moved = {}
+    __journal_size = 0
+    journal = getenv('HBNB_STORAGE_JOURNAL', '0') == '1'
+    lazy = getenv('HBNB_STORAGE_LAZY', '0') == '1'
+    fsync = getenv('HBNB_STORAGE_FSYNC', 'never')
+    fsync_interval = float(getenv('HBNB_STORAGE_FSYNC_INTERVAL', '1'))
+    __last_fsync = float('-inf')
+    __unsynced = {}
+    __sync_timer = None
+    __sync_lock = threading.Lock()
+    __batches = []
+    __deferred = False
+    shards = int(getenv('HBNB_STORAGE_SHARDS', '0'))
+    reload_mode = getenv('HBNB_STORAGE_RELOAD_MODE', 'shards')
+    reload_workers = int(getenv('HBNB_STORAGE_RELOAD_WORKERS',
+                                str(os.cpu_count() or 1)))
+    __pending = set()
+    __stale = []
+    format = getenv('HBNB_STORAGE_FORMAT', 'json')
+    index = getenv('HBNB_STORAGE_INDEX', '0') == '1'
+    compression = getenv('HBNB_STORAGE_COMPRESSION', '')
+    write_behind = getenv('HBNB_STORAGE_WRITE_BEHIND', '0') == '1'
+    max_staleness = float(getenv('HBNB_STORAGE_MAX_STALENESS', '1'))
+    lock = None
+    __writer = None
+    __atexit = False
+    shared = getenv('HBNB_STORAGE_SHARED', '0') == '1'
+    __lock_file = None
+    __signatures = {}
+    __checksums = {}
+    __loaded = None
+    reload_cache = getenv('HBNB_STORAGE_RELOAD_CACHE', '0') == '1'
+    skip_unchanged = getenv('HBNB_STORAGE_SKIP_UNCHANGED', '0') == '1'
+    grid_size = float(getenv('HBNB_STORAGE_GRID_SIZE', '0.1'))
+
+    def __init__(self, *, path=None):
+        '''Create the engine; the objects are read by reload().
+
+        Every FileStorage shares the same objects and files. Given a
+        path, the storage moves to it, as SQLiteStorage(path) opens
+        another database: the pending saves are written to the current
+        files first, then the objects are forgotten until reload().
+
+        Args:
+            path (str): The snapshot file; the journal, shards and other
+                files are named after it. By default the current one is
+                kept (file.json to begin with).
+        '''
+        if path is None:
+            return
+        self.close()
+        FileStorage.__file_path = path
+        FileStorage.__objects = {}
+        FileStorage.__changes = {}
+        FileStorage.__dirty = {}
+        FileStorage.__cache = {}
+        FileStorage.__journal_size = 0
+        FileStorage.__pending = set()
+        FileStorage.__stale = []
+        FileStorage.__signatures = {}
+        FileStorage.__checksums = {}
+        FileStorage.__loaded = None
+
+    @property
+    def path(self):
+        '''The path of the snapshot file.'''
+        return FileStorage.__file_path
+
+    def all(self, cls=None):
+        '''Returns the dictionary __objects.
+
+        Args:
+            cls (type or str): If given, only the objects of this class
+                (or class name) are returned, in a new dictionary.
+        '''
+        if cls is None:
+            return FileStorage.__objects
+        objects = FileStorage.__objects
+        found = {}
+        for key in self.__index().get(self._class_name(cls), ()):
+            if key not in objects:
+                # Removed through the dictionary all() returns, while as
+                # many others were added: the index has to be rebuilt.
+                FileStorage.__indexed = None
+                return self.all(cls)
+            found[key] = objects[key]
+        return found
+
+    def count(self, cls=None):
+        '''Returns the number of stored objects.
+
+        Args:
+            cls (type or str): If given, only count this class (or class
+                name).
+        '''
+        if cls is None:
+            return len(FileStorage.__objects)
+        name = self._class_name(cls)
+        keys = self.__index().get(name, {})
+        if not FileStorage.__objects.keys() >= keys.keys():
+            # Removed through the dictionary all() returns (see all()).
+            FileStorage.__indexed = None
+            keys = self.__index().get(name, {})
+        return len(keys)
+
+    def get(self, cls, id):
+        '''Returns the stored object of class cls with this id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        return FileStorage.__objects.get(self.key(cls, id))
+
+    def related(self, cls, attribute, value):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute equals value.
+
+        The first lookup of an attribute of a class indexes the objects
+        by it; new(), delete() and setting the attribute keep the index
+        up to date, so later lookups only cost the objects found. Values
+        that cannot be hashed, such as lists, are never found. Only the
+        attributes the class declares are indexed (see _declared()); the
+        objects are scanned for the others.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            value (any): The value looked for.
+        '''
+        name = self._class_name(cls)
+        with self.__locked():
+            if not self._declared(name, attribute):
+                return super().related(name, attribute, value)
+            keys = self.__links_for(name, attribute)[1].get(value, {})
+            objects = FileStorage.__objects
+            return {key: objects[key] for key in list(keys)
+                    if key in objects}
+
+    def between(self, cls, attribute, low=None, high=None):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a number from low to high, in increasing order
+        of attribute.
+
+        The first lookup of an attribute of a class indexes the objects
+        by it, keeping its distinct values sorted; new(), delete() and
+        setting the attribute keep the index up to date (see related()),
+        so later lookups only cost the objects found. As for related(),
+        undeclared attributes are scanned instead.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            low (int or float): The smallest value included, or None.
+            high (int or float): The largest value included, or None.
+        '''
+        name = self._class_name(cls)
+        with self.__locked():
+            if not self._declared(name, attribute):
+                return super().between(name, attribute, low, high)
+            values, keys, ordered = self.__links_for(name, attribute,
+                                                     ordered=True)
+            start = 0 if low is None else bisect.bisect_left(ordered, low)
+            end = len(ordered) if high is None else \
+                bisect.bisect_right(ordered, high)
+            objects = FileStorage.__objects
+            return {key: objects[key] for value in ordered[start:end]
+                    for key in list(keys[value]) if key in objects}
+
+    def in_bbox(self, south, west, north, east, cls='Place'):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose latitude and longitude are in a box.
+
+        The first lookup of a class files its objects in a grid of
+        grid_size degree cells by location, kept up to date like the
+        index of related(); lookups then only read the objects of the
+        cells the box overlaps, unless the class does not declare them
+        (see related()). A box whose west is greater than its east
+        crosses the antimeridian.
+
+        Args:
+            south (float): The smallest latitude included.
+            west (float): The westernmost longitude included.
+            north (float): The largest latitude included.
+            east (float): The easternmost longitude included.
+            cls (type or str): The class of the objects.
+        '''
+        name = self._class_name(cls)
+        size = FileStorage.grid_size
+        found = {}
+        with self.__locked():
+            if not (self._declared(name, 'latitude') and
+                    self._declared(name, 'longitude')):
+                return super().in_bbox(south, west, north, east, name)
+            cells = self.__links_for(name, ('latitude', 'longitude',
+                                            size))[1]
+            objects = FileStorage.__objects
+            for box in geo.split(south, west, north, east):
+                rows = range(math.floor(box[0] / size),
+                             math.floor(box[2] / size) + 1)
+                columns = range(math.floor(box[1] / size),
+                                math.floor(box[3] / size) + 1)
+                if len(rows) * len(columns) <= len(cells):
+                    overlapped = [(row, column) for row in rows
+                                  for column in columns]
+                else:
+                    # A large box: cheaper to go through the cells used.
+                    overlapped = [cell for cell in cells
+                                  if cell is not None and
+                                  cell[0] in rows and cell[1] in columns]
+                for cell in overlapped:
+                    for key in list(cells.get(cell, ())):
+                        if key not in objects:
+                            continue
+                        obj = objects[key]
+                        if geo.inside(obj.latitude, obj.longitude, *box):
+                            found[key] = obj
+        return found
+
+    def containing(self, cls, attribute, values):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a list holding every one of values.
 
-    def all(self):
-        '''Returns the dictionary __objects.'''
-        return FileStorage.__objects
+        The first lookup of an attribute of a class files the objects
+        under each element of their list, kept up to date like the index
+        of related() (so the list has to be assigned again when it
+        changes, as for save()). A lookup then intersects the objects
+        filed under each value, starting from the fewest. As for
+        related(), undeclared attributes are scanned instead.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute, e.g. amenity_ids.
+            values (iterable): The elements looked for.
+        '''
+        name = self._class_name(cls)
+        with self.__locked():
+            if not self._declared(name, attribute):
+                return super().containing(name, attribute, values)
+            held, keys, ordered = self.__links_for(name, (attribute,))
+            same = sorted((keys.get(value, {}) for value in values),
+                          key=len)
+            if not same:
+                found = list(held)
+            else:
+                found = same[0].keys()
+                for other in same[1:]:
+                    found = found & other.keys()
+            objects = FileStorage.__objects
+            return {key: objects[key] for key in found if key in objects}
 
     def new(self, obj):
         '''Stores an object in the __objects dictionary.
@@ -37,27 +446,1273 @@ class FileStorage:
         '''
 
         key = str(obj.__class__.__name__) + '.' + str(obj.id)
-        FileStorage.__objects[key] = obj
+        with self.__locked():
+            FileStorage.__changes[key] = obj
+            self.__put(key, obj)
+
+    def touch(self, obj):
+        '''Flags an object as changed so the next save re-serializes it.
+
+        Called by BaseModel whenever an attribute is set. In-place changes
+        to mutable values (e.g. appending to a list) are not seen; assign
+        the attribute again to have them saved.
+
+        Inside a batch() block it must be called before the attribute
+        is set, so that the previous state can be restored on rollback.
+        Objects that are not stored, such as those being built from
+        keyword arguments, are left alone: there is nothing to save.
+
+        Args:
+            obj (BaseModel): The object that changed.
+        '''
+        # Objects built from keyword arguments may have no id yet.
+        key = obj.__class__.__name__ + '.' + str(getattr(obj, 'id', None))
+        stored = dict.get(FileStorage.__objects, key) is obj
+        if FileStorage.__batches:
+            saved = FileStorage.__batches[-1]['saved']
+            # Deleted inside the block, it comes back on rollback.
+            if id(obj) not in saved and (stored or any(
+                    dict.get(frame['objects'], key) is obj
+                    for frame in FileStorage.__batches)):
+                saved[id(obj)] = (obj, obj._attributes())
+        if not stored:
+            return
+        FileStorage.__dirty[id(obj)] = obj
+        if FileStorage.__linked is FileStorage.__objects and \
+                obj.__class__.__name__ in FileStorage.__links:
+            FileStorage.__moved[id(obj)] = obj
+
+    def delete(self, obj=None):
+        '''Removes an object from __objects if it is stored there.
+
+        Args:
+            obj (any): The object to be removed. Does nothing if None.
+        '''
+        if obj is None:
+            return
+        key = str(obj.__class__.__name__) + '.' + str(obj.id)
+        with self.__locked():
+            if self.__remove(key):
+                FileStorage.__changes[key] = None
 
     def save(self):
-        '''Serializes __objects to the JSON file.'''
-        # Convert the values of __objects to dictionaries.
-        objects = FileStorage.__objects
-        objects_dict = {obj: objects[obj].to_dict() for obj in objects.keys()}
-        # JSON dump into the file
-        with open(FileStorage.__file_path, 'w', encoding='utf-8') as f:
-            json.dump(objects_dict, f)
+        '''Serializes __objects to the JSON file.
+
+        In journal mode only the changes since the last save are appended
+        to the journal; the snapshot is rewritten (compacted) once the
+        journal holds more records than there are objects. Inside a
+        batch() block, the save is deferred to the end of the block. In
+        write-behind mode, the save is left to the background writer.
+        '''
+        with self.__locked():
+            if FileStorage.__batches:
+                FileStorage.__deferred = True
+                return
+            writer = FileStorage.__writer
+            if not FileStorage.write_behind:
+                if writer is not None:
+                    writer.raise_error()
+                self.__write()
+                return
+            if writer is None:
+                writer = WriteBehind(
+                        self.__write, lambda: not FileStorage.__batches)
+                FileStorage.__writer = writer
+                FileStorage.lock = writer.lock
+                # A daemon thread is killed at exit: write what is left
+                # first.
+                self.__close_at_exit()
+            writer.request(FileStorage.max_staleness)
+
+    def flush(self):
+        '''Blocks until every save() so far has been written (and synced,
+        in the 'interval' fsync mode).
+
+        Inside a batch() block, the saves are written when it ends
+        instead.
+
+        Raises:
+            Exception: The error raised by a background write, if any.
+        '''
+        with self.__locked():
+            writer = FileStorage.__writer
+            try:
+                if writer is not None and FileStorage.__batches:
+                    writer.raise_error()
+                elif writer is not None:
+                    writer.flush()
+            finally:
+                self.__sync_pending()
+
+    def refresh(self):
+        '''Picks up the changes other processes saved since this one last
+        read or wrote the files.
+
+        Only does something with the shared option set, and outside
+        batch() blocks. If the generation in the lock file is unchanged,
+        nothing else is read. Otherwise, in journal mode only the new
+        journal records are applied, and with shards only the rewritten
+        shard files are read again. The objects changed here and not
+        saved yet keep their changes.
+        '''
+        if not FileStorage.shared:
+            return
+        with self.__locked():
+            if FileStorage.__batches:
+                return
+            with self.__file_lock(exclusive=False) as lock:
+                self.__refresh(lock)
+
+    def close(self):
+        '''Writes the pending saves and stops the background writer.'''
+        try:
+            self.flush()
+        finally:
+            writer = FileStorage.__writer
+            if writer is not None:
+                writer.close()
+                FileStorage.__writer = None
+                FileStorage.lock = None
+            self.__sync_pending()
+            if FileStorage.__lock_file is not None:
+                FileStorage.__lock_file.close()
+                FileStorage.__lock_file = None
+
+    @contextmanager
+    def batch(self):
+        '''Defers every save() until the block exits, then saves once.
+
+        If the block raises, the objects created, deleted or changed
+        (by setting attributes) inside it are put back the way they were
+        when it started, and nothing is saved. Blocks can be nested; only
+        the outermost one saves.
+
+            with storage.batch():
+                for row in rows:
+                    place = Place()
+                    place.name = row['name']
+                    place.save()
+        '''
+        with self.__locked():
+            frame = {
+                # The raw records as they are, without building them.
+                'objects': dict(dict.items(FileStorage.__objects)),
+                'changes': dict(FileStorage.__changes),
+                'dirty': dict(FileStorage.__dirty),
+                'saved': {},
+            }
+            FileStorage.__batches.append(frame)
+        try:
+            yield self
+        except BaseException:
+            with self.__locked():
+                FileStorage.__batches.pop()
+                self.__rollback(frame)
+                if not FileStorage.__batches:
+                    FileStorage.__deferred = False
+                    self.__wake_writer()
+            raise
+        with self.__locked():
+            FileStorage.__batches.pop()
+            if FileStorage.__batches:
+                # The enclosing block may still roll these changes back.
+                saved = FileStorage.__batches[-1]['saved']
+                for key, value in frame['saved'].items():
+                    saved.setdefault(key, value)
+                return
+            self.__wake_writer()
+            if FileStorage.__deferred:
+                FileStorage.__deferred = False
+                self.save()
 
     def reload(self):
         '''Desirializes JSON file to __objects.
 
-        If the file path does not exist, does nothing.
+        The snapshot is parsed one entry at a time and each object is
+        created before the next entry is read, so the whole parsed file
+        is never held in memory; in lazy mode the parsed records are kept
+        instead, and only the objects are created later. Depending on
+        reload_mode, the shard files, and parts of a large JSON file, are
+        parsed in parallel by up to reload_workers processes. The
+        journal, if any, is replayed on top of the snapshot. If no file
+        exists, does nothing.
+
+        With skip_unchanged set, nothing is read if neither the files nor
+        the objects changed since the objects were last read from or
+        written to the files. The files are recognised by their size and
+        modification time, and those modified just before by a checksum
+        of their content (see models/engine/file_state.py). Only the
+        changes made through new(), delete(), save() and setting
+        attributes are seen: those made directly to the all() dictionary
+        or to the __dict__ of an object are then not undone.
+
+        Raises:
+            ValueError: If reload_mode is not a known mode.
+        '''
+        if FileStorage.reload_mode not in ('serial', 'shards', 'split'):
+            raise ValueError('Unknown reload mode {!r}'.format(
+                    FileStorage.reload_mode))
+        self.flush()
+        with self.__locked():
+            with self.__file_lock(exclusive=False) as lock:
+                if not self.__tracks_files():
+                    self.__reload()
+                    FileStorage.__loaded = None
+                    return
+                generation = None if lock is None else lock.read()
+                files = self.__files_state()
+                checksums = None
+                if FileStorage.skip_unchanged and \
+                        FileStorage.__loaded is FileStorage.__objects and \
+                        not FileStorage.__changes and \
+                        not FileStorage.__dirty and \
+                        files == FileStorage.__signatures:
+                    checksums = file_state.verify(files,
+                                                  FileStorage.__checksums)
+                    if checksums is not None:
+                        # The layout may have changed since.
+                        FileStorage.__stale = self.__snapshot_files()[1]
+                if checksums is None and FileStorage.reload_cache:
+                    checksums = self.__read_cache(files)
+                if checksums is None:
+                    checksums = self.__recent_checksums(files, files)
+                    self.__reload()
+                    if FileStorage.reload_cache:
+                        self.__write_cache(files, checksums)
+                self.__remember(files, checksums)
+                if lock is not None:
+                    lock.generation = generation
+
+    def __start_reload(self):
+        '''Prepare __objects to receive the objects of the files.'''
+        FileStorage.__changes = {}
+        FileStorage.__dirty = {}
+        if FileStorage.lazy and type(FileStorage.__objects) is dict:
+            FileStorage.__objects = LazyObjects(self.__load,
+                                                FileStorage.__objects)
+
+    def __reload(self):
+        '''Load the files into __objects; see reload().'''
+        self.__start_reload()
+        paths, stale = self.__snapshot_files()
+        workers = FileStorage.reload_workers
+        parts = []
+        if FileStorage.reload_mode != 'serial' and workers > 1 and \
+                'fork' in multiprocessing.get_all_start_methods():
+            for path in paths:
+                if FileStorage.reload_mode == 'split':
+                    # Several parts per worker, so that this process
+                    # creates the objects of the first parts while the
+                    # others are still being parsed.
+                    parts += split_snapshot(path, 4 * workers)
+                else:
+                    parts.append((path, None, None))
+        if len(parts) > 1 and self.__hydrate(parts):
+            paths = []
+        normalized = not FileStorage.lazy
+        for path in paths:
+            try:
+                for record in iter_snapshot(path, normalized):
+                    self.__put_record(record, normalized)
+            except FileNotFoundError:
+                pass
+        FileStorage.__stale = stale
+        FileStorage.__pending = set()
+        self.__replay_journal()
+
+    def __hydrate(self, parts):
+        '''Read the parts of the snapshot files in worker processes.
+
+        The workers are forked and handed their parts directly: nothing
+        is pickled but the records, so they run even while models is
+        being imported (reload() at import holds its import lock).
+
+        Args:
+            parts (list): The parts, as returned by split_snapshot().
+
+        Returns:
+            bool: False if a part turned out not to hold whole entries;
+                the files must then be read again in this process.
+        '''
+        context = multiprocessing.get_context('fork')
+        workers = min(FileStorage.reload_workers, len(parts))
+        readers = []
+        processes = []
+        try:
+            for i in range(workers):
+                reader, writer = context.Pipe(False)
+                readers.append(reader)
+                processes.append(context.Process(
+                        target=_send_records, daemon=True,
+                        args=(parts[i::workers], not FileStorage.lazy,
+                              writer)))
+                processes[-1].start()
+                writer.close()
+            for i in range(len(parts)):
+                read, records = readers[i % workers].recv()
+                if not read:
+                    raise records
+                for record in records:
+                    self.__put_record(record, normalized=True)
+        except (ValueError, EOFError):
+            return False
+        finally:
+            # A worker still sending stops when its pipe is closed.
+            for reader in readers:
+                reader.close()
+            for process in processes:
+                process.join()
+        return True
+
+    def __remove(self, key):
+        '''Remove key from __objects and the index.
+
+        Returns:
+            bool: True if the key was stored.
+        '''
+        if key not in FileStorage.__objects:
+            return False
+        dict.__delitem__(FileStorage.__objects, key)
+        name = key.split('.', 1)[0]
+        if FileStorage.__indexed is FileStorage.__objects:
+            same = FileStorage.__classes.get(name, {})
+            if key in same:
+                del same[key]
+                FileStorage.__indexed_size -= 1
+        if FileStorage.__linked is FileStorage.__objects:
+            self.__unlink(key, FileStorage.__links.get(name, {}))
+        return True
+
+    def __put(self, key, value):
+        '''Store an instance or raw record under key and index it.'''
+        FileStorage.__objects[key] = value
+        name = key.split('.', 1)[0]
+        if FileStorage.__indexed is FileStorage.__objects:
+            same = FileStorage.__classes.setdefault(name, {})
+            if key not in same:
+                same[key] = None
+                FileStorage.__indexed_size += 1
+        if FileStorage.__linked is FileStorage.__objects:
+            links = FileStorage.__links.get(name)
+            if links:
+                self.__unlink(key, links)
+                self.__link(key, value, links)
+
+    def __put_record(self, record, normalized=False):
+        '''Store a record read from disk, as is in lazy mode.
+
+        Args:
+            record (dict): The record.
+            normalized (bool): True if normalize() was applied to it.
+        '''
+        key = record['__class__'] + '.' + record['id']
+        if not FileStorage.lazy:
+            if not normalized:
+                normalize(record)
+            # Not through __init__(): setting each attribute would flag
+            # the object as changed, and cost more than the parsing.
+            record = classes[record.pop('__class__')]._from_attributes(
+                    record)
+        self.__put(key, record)
+
+    def __merge(self, key, record):
+        '''Apply the record (None if deleted) saved for key by another
+        process, unless key was changed here since the last save.'''
+        if key in FileStorage.__changes:
+            return
+        obj = dict.get(FileStorage.__objects, key)
+        if obj is not None and id(obj) in FileStorage.__dirty:
+            return
+        if record is None:
+            self.__remove(key)
+        else:
+            self.__put_record(record)
+
+    def __load(self, record):
+        '''Build the instance described by a record read from disk.'''
+        with self.__locked():
+            obj = classes[record['__class__']](**record)
+            # Matches the file, so it does not need to be written again.
+            FileStorage.__dirty.pop(id(obj), None)
+        return obj
+
+    def __write(self):
+        '''Write the changes since the last save, now.'''
+        with self.__file_lock(exclusive=True) as lock:
+            if lock is not None:
+                # Take in what the other processes saved, or it would be
+                # overwritten.
+                self.__refresh(lock)
+            if FileStorage.journal and \
+                    FileStorage.__journal_size <= len(FileStorage.__objects):
+                self.__append_journal()
+            else:
+                self.__write_snapshot()
+            FileStorage.__changes = {}
+            FileStorage.__dirty = {}
+            if lock is not None:
+                lock.advance()
+            if self.__tracks_files():
+                self.__remember()
+            else:
+                FileStorage.__loaded = None
+
+    @contextmanager
+    def __file_lock(self, exclusive):
+        '''Hold the lock file, if the shared option is set.
+
+        Args:
+            exclusive (bool): True to write, False to read.
+
+        Yields:
+            LockFile: The lock file, or None if the shared option is not
+                set.
+        '''
+        if not FileStorage.shared:
+            yield None
+            return
+        path = FileStorage.__file_path + '.lock'
+        lock = FileStorage.__lock_file
+        if lock is None or lock.path != path:
+            if lock is not None:
+                lock.close()
+            lock = FileStorage.__lock_file = LockFile(path)
+        with lock.held(exclusive):
+            yield lock
+
+    def __files_state(self):
+        '''Return path -> (inode, size, mtime) of the snapshot files and
+        journal that exist.'''
+        return file_state.scan(self.__snapshot_files()[0] +
+                               [self.__journal_path()])
+
+    def __recent_checksums(self, files, paths):
+        '''Return path -> checksum of the snapshot files among paths that
+        were modified too recently for their mtime to tell them apart.
+
+        The journal is left out: it only grows, so its size tells.
+        '''
+        journal = self.__journal_path()
+        return file_state.recent_checksums(
+                files, [path for path in paths if path != journal])
+
+    def __tracks_files(self):
+        '''Return True if an option needs the state of the files the
+        objects are up to date with: skip_unchanged, reload_cache or
+        shared. Otherwise the files are neither listed nor checksummed.'''
+        return FileStorage.skip_unchanged or FileStorage.reload_cache or \
+            FileStorage.shared
+
+    def __remember(self, files=None, checksums=None):
+        '''Record the state of the files the objects are now up to date
+        with.
+
+        Args:
+            files (dict): The __files_state() the objects were read from;
+                by default the files as they are now.
+            checksums (dict): The checksums of the files; by default they
+                are computed for the files that changed since the last
+                call.
+        '''
+        if files is None:
+            files = self.__files_state()
+        if checksums is None:
+            known = FileStorage.__signatures
+            checksums = {path: checksum for path, checksum
+                         in FileStorage.__checksums.items()
+                         if path in files and files[path] == known.get(path)}
+            checksums.update(self.__recent_checksums(
+                    files, [path for path in files
+                            if files[path] != known.get(path)]))
+        FileStorage.__signatures = files
+        FileStorage.__checksums = checksums
+        FileStorage.__loaded = FileStorage.__objects
+
+    def __read_cache(self, files):
+        '''Load the objects from the reload cache, if it was written for
+        the files as they are now.
+
+        Args:
+            files (dict): The __files_state() of the files.
+
+        Returns:
+            dict: The checksums of the files still needed, or None if the
+                cache could not be used.
+        '''
+        cached = reload_cache.read(FileStorage.__file_path, files,
+                                   FileStorage.shards)
+        if cached is None:
+            return None
+        state, objects = cached
+        self.__start_reload()
+        for key, obj in objects:
+            if type(obj) is dict and not FileStorage.lazy:
+                obj = self.__load(obj)
+            self.__put(key, obj)
+        FileStorage.__stale = self.__snapshot_files()[1]
+        FileStorage.__pending = set(state['pending'])
+        FileStorage.__journal_size = state['journal_size']
+        return state['checksums']
+
+    def __write_cache(self, files, checksums):
+        '''Write the reload cache of the objects just read from the files.
+
+        Args:
+            files (dict): The __files_state() of the files.
+            checksums (dict): The checksums of the recently modified ones.
+        '''
+        reload_cache.write(FileStorage.__file_path,
+                           dict.items(FileStorage.__objects), {
+                               'files': files,
+                               'checksums': checksums,
+                               'shards': FileStorage.shards,
+                               'pending': FileStorage.__pending,
+                               'journal_size': FileStorage.__journal_size,
+                           })
+
+    def __refresh(self, lock):
+        '''Apply what the other processes saved since the generation the
+        objects are up to date with.
+
+        Only the snapshot files rewritten since then are read, and the
+        journal from where it was left if the snapshot did not change.
+
+        Args:
+            lock (LockFile): The lock file, held.
+        '''
+        generation = lock.read()
+        if generation == lock.generation:
+            return
+        paths, stale = self.__snapshot_files()
+        journal_path = self.__journal_path()
+        known = FileStorage.__signatures
+        changed = [path for path in paths
+                   if file_state.signature(path) != known.get(path)]
+        removed = [path for path in known
+                   if path not in paths and path != journal_path]
+        shards = set()
+        pattern = shard_pattern(FileStorage.__file_path)
+        for path in changed + removed:
+            match = pattern.fullmatch(os.path.basename(path))
+            if match is None or stale or not FileStorage.shards:
+                shards = None
+                break
+            shards.add((match.group(1), int(match.group(2))))
+        if shards is None:
+            # Any object may be in the files: read them all again.
+            changed = paths
+            domain = set(FileStorage.__objects)
+        else:
+            index = self.__index()
+            domain = {key for name, bucket in shards
+                      for key in index.get(name, ())
+                      if self.__bucket(key) == bucket}
+        seen = set()
+        for path in changed:
+            try:
+                for record in iter_snapshot(path, not FileStorage.lazy):
+                    key = record['__class__'] + '.' + record['id']
+                    seen.add(key)
+                    self.__merge(key, record)
+            except FileNotFoundError:
+                pass
+        for key in domain - seen:
+            self.__merge(key, None)
+        recorded = known.get(journal_path)
+        journal = file_state.signature(journal_path)
+        offset = 0
+        if not (changed or removed or journal is None or recorded is None
+                or journal[0] != recorded[0] or journal[1] < recorded[1]):
+            # Otherwise rewritten: the snapshot holds the records read
+            # before.
+            offset = recorded[1]
+        self.__replay_journal(offset)
+        self.__remember()
+        lock.generation = generation
+
+    def __locked(self):
+        '''Return the lock, or a no-op if there is no writer to guard
+        against.'''
+        return FileStorage.lock or _unlocked
+
+    def __wake_writer(self):
+        '''Wake the background writer, if it runs (the batch() block it
+        waits for has ended).'''
+        if FileStorage.__writer is not None:
+            FileStorage.__writer.wake()
+
+    def __close_at_exit(self):
+        '''Have close() called at exit, once.'''
+        if not FileStorage.__atexit:
+            atexit.register(self.close)
+            FileStorage.__atexit = True
+
+    def __index(self):
+        '''Return the per-class index, rebuilding it if __objects was
+        replaced since it was built, or changed behind it (see
+        __indexed_size); the reverse indexes are then dropped too.'''
+        objects = FileStorage.__objects
+        if FileStorage.__indexed is not objects or \
+                FileStorage.__indexed_size != len(objects):
+            classes = {}
+            for key in objects:
+                classes.setdefault(key.split('.', 1)[0], {})[key] = None
+            FileStorage.__classes = classes
+            FileStorage.__indexed = objects
+            FileStorage.__indexed_size = len(objects)
+            FileStorage.__linked = None
+        return FileStorage.__classes
+
+    def __links_for(self, name, attribute, ordered=False):
+        '''Return the reverse index of attribute of the objects of class
+        name, building it or bringing it up to date first.
+
+        Args:
+            name (str): The class name.
+            attribute (str): The attribute.
+            ordered (bool): If True, the index keeps its numeric values
+                sorted from then on.
+        '''
+        # Drops __links if __objects was changed behind the indexes.
+        self.__index()
+        if FileStorage.__linked is not FileStorage.__objects:
+            FileStorage.__links = {}
+            FileStorage.__moved = {}
+            FileStorage.__linked = FileStorage.__objects
+        objects = FileStorage.__objects
+        moved = FileStorage.__moved
+        FileStorage.__moved = {}
+        for obj in moved.values():
+            # Objects built from keyword arguments may have no id.
+            key = obj.__class__.__name__ + '.' + str(getattr(obj, 'id', ''))
+            if dict.get(objects, key) is obj:
+                links = FileStorage.__links[obj.__class__.__name__]
+                self.__unlink(key, links)
+                self.__link(key, obj, links)
+        links = FileStorage.__links.setdefault(name, {})
+        index = links.get(attribute)
+        if index is None:
+            index = links[attribute] = [{}, {}, None]
+            new = {attribute: index}
+            for key in self.__index().get(name, ()):
+                self.__link(key, dict.__getitem__(objects, key), new)
+        if ordered and index[2] is None:
+            index[2] = sorted(value for value in index[1]
+                              if self.is_number(value))
+        return index
+
+    @classmethod
+    def __link(cls, key, obj, links):
+        '''Add key, storing obj (an instance or raw record), to the
+        reverse indexes in links ({attribute: index}).'''
+        for attribute, index in links.items():
+            if type(attribute) is tuple and len(attribute) == 1:
+                if type(obj) is dict:
+                    held = cls.__value(obj, attribute[0])
+                    if not isinstance(held, (list, tuple)):
+                        held = None
+                else:
+                    held = cls.list_of(obj, attribute[0])
+                if held is not None:
+                    index[0][key] = tuple(value for value in held
+                                          if cls.__file(key, value, index))
+            else:
+                value = cls.__value(obj, attribute)
+                if cls.__file(key, value, index):
+                    index[0][key] = value
+
+    @classmethod
+    def __file(cls, key, value, index):
+        '''File key under value in an index.
+
+        Returns:
+            bool: False if value cannot be looked up (it is unhashable)
+                or key was already filed under it.
+        '''
+        keys, ordered = index[1], index[2]
+        try:
+            same = keys.get(value)
+        except TypeError:
+            return False
+        if same is None:
+            same = keys[value] = {}
+            if ordered is not None and cls.is_number(value):
+                bisect.insort(ordered, value)
+        elif key in same:
+            return False
+        same[key] = None
+        return True
+
+    @classmethod
+    def __value(cls, obj, attribute):
+        '''Return the value of the attribute of obj (an instance or raw
+        record), or for a grid ('latitude', 'longitude', cell size), the
+        (row, column) of its cell.'''
+        if type(attribute) is tuple:
+            lat = cls.__value(obj, attribute[0])
+            lon = cls.__value(obj, attribute[1])
+            if not (cls.is_number(lat) and cls.is_number(lon)):
+                return None
+            return (math.floor(lat / attribute[2]),
+                    math.floor(lon / attribute[2]))
+        if type(obj) is dict:
+            return obj.get(attribute, getattr(
+                    classes.get(obj['__class__']), attribute, None))
+        return getattr(obj, attribute, None)
+
+    @classmethod
+    def __unlink(cls, key, links):
+        '''Remove key from the reverse indexes in links.'''
+        for attribute, index in links.items():
+            try:
+                value = index[0].pop(key)
+            except KeyError:
+                continue
+            if type(attribute) is tuple and len(attribute) == 1:
+                for element in value:
+                    cls.__unfile(key, element, index)
+            else:
+                cls.__unfile(key, value, index)
+
+    @classmethod
+    def __unfile(cls, key, value, index):
+        '''Remove key from under value in an index.'''
+        keys, ordered = index[1], index[2]
+        same = keys[value]
+        del same[key]
+        if not same:
+            del keys[value]
+            if ordered is not None and cls.is_number(value):
+                del ordered[bisect.bisect_left(ordered, value)]
+
+    def __rollback(self, frame):
+        '''Restore the state recorded when a batch() block started.'''
+        for obj, attributes in frame['saved'].values():
+            # Objects created inside the block are simply dropped.
+            key = obj.__class__.__name__ + '.' + str(attributes.get('id'))
+            if dict.get(frame['objects'], key) is obj:
+                obj._restore(attributes)
+        objects = FileStorage.__objects
+        dict.clear(objects)
+        dict.update(objects, frame['objects'])
+        FileStorage.__indexed = None
+        FileStorage.__linked = None
+        FileStorage.__changes = frame['changes']
+        FileStorage.__dirty = frame['dirty']
+
+    def __journal_path(self):
+        '''Return the path of the journal kept next to the snapshot.'''
+        return FileStorage.__file_path + '.journal'
+
+    def __sync(self, f):
+        '''Flush f to disk if the fsync policy asks for it now.
+
+        Returns:
+            bool: True if f was synced.
+
+        Raises:
+            ValueError: If the fsync policy is unknown.
+        '''
+        policy = FileStorage.fsync
+        if policy not in ('never', 'always', 'interval'):
+            raise ValueError('Unknown fsync policy {!r}'.format(policy))
+        now = time.monotonic()
+        if policy == 'always' or (
+                policy == 'interval' and
+                now - FileStorage.__last_fsync >= FileStorage.fsync_interval):
+            f.flush()
+            os.fsync(f.fileno())
+            FileStorage.__last_fsync = now
+            return True
+        return False
+
+    def __sync_later(self, path):
+        '''Have path, written and not synced, synced with its directory
+        once the fsync interval is over (in the 'interval' mode).'''
+        if FileStorage.fsync != 'interval':
+            return
+        with FileStorage.__sync_lock:
+            FileStorage.__unsynced[path] = None
+            if FileStorage.__sync_timer is not None:
+                return
+            delay = FileStorage.__last_fsync + FileStorage.fsync_interval - \
+                time.monotonic()
+            timer = threading.Timer(max(delay, 0), self.__sync_pending)
+            timer.daemon = True
+            FileStorage.__sync_timer = timer
+            timer.start()
+        # The timer thread is killed at exit: sync what is left first.
+        self.__close_at_exit()
+
+    def __sync_pending(self):
+        '''Sync the files __sync_later() was given, and their directories.
+
+        Runs in the timer thread, or in flush() and close().
+        '''
+        with FileStorage.__sync_lock:
+            paths = FileStorage.__unsynced
+            FileStorage.__unsynced = {}
+            timer = FileStorage.__sync_timer
+            FileStorage.__sync_timer = None
+        if timer is not None:
+            # Does nothing if this is the timer thread.
+            timer.cancel()
+        if not paths:
+            return
+        directories = {}
+        for path in paths:
+            self.__sync_path(path)
+            directories[os.path.dirname(os.path.abspath(path))] = None
+        for directory in directories:
+            self.__sync_path(directory)
+        FileStorage.__last_fsync = time.monotonic()
+
+    @staticmethod
+    def __sync_path(path):
+        '''fsync() the file or directory at path, if it still exists.'''
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            # Removed or replaced since; its replacement is synced anyway.
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def __replace(self, path, mode, **kwargs):
+        '''Open a temporary file that atomically replaces path on close.
+
+        If the block raises, the temporary file is removed and path is
+        left untouched, so a crash or a full disk never truncates it.
+
+        Args:
+            path (str): The file to replace.
+            mode (str): 'w' or 'wb'.
+            **kwargs (dict): Passed on to open().
+        '''
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, mode, **kwargs) as f:
+                yield f
+                synced = self.__sync(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if synced:
+            # Make the rename itself durable.
+            self.__sync_path(os.path.dirname(os.path.abspath(path)))
+        else:
+            self.__sync_later(path)
+
+    def __serialize(self, key, obj):
+        '''Return the JSON text of obj, reusing the cached one if clean.'''
+        cached = FileStorage.__cache.get(key)
+        if cached is None or cached[0] is not obj or \
+                id(obj) in FileStorage.__dirty:
+            if type(obj) is dict:
+                cached = (obj, json.dumps(obj))
+            else:
+                cached = (obj, json.dumps(obj.to_dict()))
+        return cached
+
+    def __write_snapshot(self):
+        '''Rewrite the snapshot and drop the journal it replaces.'''
+        if FileStorage.shards:
+            self.__write_shards()
+        else:
+            self.__write_file()
+        for path in FileStorage.__stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        FileStorage.__stale = []
+        FileStorage.__pending = set()
+        try:
+            os.remove(self.__journal_path())
+        except FileNotFoundError:
+            pass
+        FileStorage.__journal_size = 0
+
+    def __write_file(self):
+        '''Rewrite the whole snapshot file.'''
+        cache = {}
+        path = FileStorage.__file_path
+        self.__write_objects(path, FileStorage.__objects, cache)
+        FileStorage.__cache = cache
+        if FileStorage.index and FileStorage.format != 'binary' and \
+                not FileStorage.compression:
+            entries = snapshot_index.entries_of(
+                    (key, entry[1]) for key, entry in cache.items())
+            index = snapshot_index.pack(entries, os.stat(path))
+            with self.__replace(snapshot_index.index_path(path), 'wb') as f:
+                f.write(index)
+
+    def __write_shards(self):
+        '''Rewrite the shard files holding changed objects.'''
+        index = self.__index()
+        for key, obj in self.__changed().items():
+            self.__shard_changed(key)
+            if obj is None:
+                FileStorage.__cache.pop(key, None)
+        pending = FileStorage.__pending
+        if FileStorage.__stale:
+            # Some objects were read from files of another layout.
+            for name, keys in index.items():
+                pending.update((name, self.__bucket(key)) for key in keys)
+        by_class = {}
+        for name, bucket in pending:
+            by_class.setdefault(name, {})[bucket] = []
+        for name, groups in by_class.items():
+            for key in index.get(name, ()):
+                group = groups.get(self.__bucket(key))
+                if group is not None:
+                    group.append(key)
+            for bucket, keys in groups.items():
+                path = self.__shard_path(name, bucket)
+                if keys:
+                    self.__write_objects(path, keys, FileStorage.__cache)
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def __write_objects(self, path, keys, cache):
+        '''Atomically write the objects stored under keys to path.
+
+        Args:
+            path (str): The file to write.
+            keys (iterable): The keys of the objects to write.
+            cache (dict): Receives the JSON text of each object, reused
+                by the next save if the object does not change.
         '''
+        # dict.get() so raw records are written without being built.
+        objects = FileStorage.__objects
+        if FileStorage.format == 'binary':
+            records = (dict.get(objects, key) for key in keys)
+            with self.__create(path, binary=True) as f:
+                binary_format.dump(
+                        (obj if type(obj) is dict else obj.to_dict()
+                         for obj in records), f)
+            for key in keys:
+                cache.pop(key, None)
+            return
+        # Serialize only the objects that changed since the last save.
+        for key in keys:
+            cache[key] = self.__serialize(key, dict.get(objects, key))
+        # Same layout as json.dump() of the {key: to_dict()} dictionary.
+        with self.__create(path) as f:
+            separator = '{'
+            # One entry at a time, so the text is streamed to the file
+            # (or compressor) rather than joined in memory first.
+            for key in keys:
+                f.write(separator + json.dumps(key) + ': ' + cache[key][1])
+                separator = ', '
+            f.write('{}' if separator == '{' else '}')
+
+    @contextmanager
+    def __create(self, path, binary=False):
+        '''Open a file that atomically replaces path, compressing what is
+        written to it if the compression option is set.
+
+        Args:
+            path (str): The file to replace.
+            binary (bool): If False, the file is opened in text mode.
+        '''
+        with self.__replace(path, 'wb') as f:
+            if FileStorage.compression:
+                f = compression.writer(f, FileStorage.compression)
+            if not binary:
+                f = io.TextIOWrapper(f, encoding='utf-8')
+            yield f
+            if not binary:
+                # Flush without closing the file __replace() syncs.
+                f = f.detach()
+            if FileStorage.compression:
+                f.close()
+
+    def __bucket(self, key):
+        '''Return the shard bucket of key.'''
+        if FileStorage.shards <= 1:
+            return 0
+        return zlib.crc32(key.encode('utf-8')) % FileStorage.shards
+
+    def __shard_changed(self, key):
+        '''Flag the shard holding key as needing to be rewritten.'''
+        FileStorage.__pending.add((key.split('.', 1)[0], self.__bucket(key)))
+
+    def __shard_path(self, name, bucket):
+        '''Return the path of the shard file of a class and bucket.'''
+        root, ext = os.path.splitext(FileStorage.__file_path)
+        return '{}.{}.{}{}'.format(root, name, bucket, ext)
+
+    def __snapshot_files(self):
+        '''Return the snapshot files to read, in order, and the stale ones.
+
+        Files of the other layout (a single file when sharding, shard
+        files otherwise, or shards of another bucket count) are read
+        first, so that the files of the current layout win.
+
+        Returns:
+            tuple: (list of paths to read, list of stale paths)
+        '''
+        root = os.path.splitext(FileStorage.__file_path)[0]
+        directory = os.path.dirname(root) or '.'
+        pattern = shard_pattern(FileStorage.__file_path)
+        current = []
+        stale = []
+        try:
+            names = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            match = pattern.fullmatch(name)
+            if match is None:
+                continue
+            path = os.path.join(os.path.dirname(root), name)
+            if FileStorage.shards and \
+                    int(match.group(2)) < FileStorage.shards:
+                current.append(path)
+            else:
+                stale.append(path)
+        if os.path.exists(FileStorage.__file_path):
+            if FileStorage.shards:
+                stale.insert(0, FileStorage.__file_path)
+            else:
+                current.append(FileStorage.__file_path)
+        return stale + current, stale
+
+    def __changed(self):
+        '''Return {key: object, or None if deleted} changed since the
+        last save.'''
+        changes = dict(FileStorage.__changes)
+        for obj in FileStorage.__dirty.values():
+            key = obj.__class__.__name__ + '.' + str(obj.id)
+            if dict.get(FileStorage.__objects, key) is obj:
+                changes[key] = obj
+        return changes
+
+    def __append_journal(self):
+        '''Append one JSON line per changed object to the journal.'''
+        changes = self.__changed()
+        if not changes:
+            return
+        lines = []
+        for key, obj in changes.items():
+            self.__shard_changed(key)
+            if obj is None:
+                FileStorage.__cache.pop(key, None)
+                value = 'null'
+            else:
+                FileStorage.__cache[key] = self.__serialize(key, obj)
+                value = FileStorage.__cache[key][1]
+            lines.append('{"key": ' + json.dumps(key) +
+                         ', "value": ' + value + '}\n')
+        path = self.__journal_path()
+        with open(path, 'a+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b'\n':
+                    # A crash tore the last append: start a line of our
+                    # own, or the first record would be glued onto it.
+                    lines.insert(0, '\n')
+            f.write(''.join(lines).encode('utf-8'))
+            synced = self.__sync(f)
+        if not synced:
+            self.__sync_later(path)
+        elif not end:
+            # Just created (e.g. after a compaction): make its entry in
+            # the directory durable too, as __replace() does.
+            self.__sync_path(os.path.dirname(os.path.abspath(path)))
+        FileStorage.__journal_size += len(changes)
+
+    def __replay_journal(self, offset=0):
+        '''Apply the journal records, in order, to __objects.
+
+        A line that is not a whole record, such as the torn end of an
+        append a crash interrupted, is skipped; the appends after it start
+        on a new line.
+
+        Args:
+            offset (int): Where to start reading, in bytes; the records
+                before it must have been applied already.
+        '''
+        if offset == 0:
+            FileStorage.__journal_size = 0
         try:
-            with open(FileStorage.__file_path, 'r') as f:
-                objects_dict = json.load(f)
-                for obj in objects_dict.values():
-                    class_name = obj['__class__']
-                    self.new(eval(class_name)(**obj))
+            with open(self.__journal_path(), 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    FileStorage.__journal_size += 1
+                    self.__shard_changed(record['key'])
+                    self.__merge(record['key'], record['value'])
         except FileNotFoundError:
             return
+
+
+def shard_pattern(path):
+    '''Return the regular expression matching the names of the shard
+    files of the store at path, capturing the class name and bucket.'''
+    root, ext = os.path.splitext(os.path.basename(path))
+    return re.compile(re.escape(root) + r'\.(\w+)\.(\d+)' + re.escape(ext))
+
+
+def iter_snapshot(path, normalized=False):
+    '''Yield the records of a JSON or binary snapshot file, one at a time.
+
+    The file may be compressed; it is decompressed as it is read.
+
+    Args:
+        path (str): The path of the file.
+        normalized (bool): If True, normalize() the records. The
+            timestamps of a binary file are then read as datetimes
+            directly, without isoformat() strings in between.
+    '''
+    with open(path, 'rb') as f:
+        f = compression.reader(f)
+        if f.peek(len(binary_format.MAGIC)).startswith(binary_format.MAGICS):
+            records = binary_format.iter_file(
+                    f, datetimes if normalized else ())
+        else:
+            records = (obj for key, obj in json_stream.iter_items(
+                    io.TextIOWrapper(f, encoding='utf-8')))
+        for record in records:
+            if normalized:
+                normalize(record)
+            yield record
+
+
+def read_snapshot(path, normalized=False):
+    '''Return the records of a snapshot file, or [] if it does not exist.
+
+    Args:
+        path (str): The path of the file.
+        normalized (bool): If True, normalize() the records.
+    '''
+    try:
+        return list(iter_snapshot(path, normalized))
+    except FileNotFoundError:
+        return []
+
+
+def split_snapshot(path, count):
+    '''Return the parts a snapshot file can be read in, in order.
+
+    A JSON file written by FileStorage is cut where entries start, into up
+    to count parts of at least _MIN_PART bytes. Other files (binary,
+    compressed or small) are one part.
+
+    Args:
+        path (str): The path of the file.
+        count (int): The largest number of parts wanted.
+
+    Returns:
+        list: (path, start, end) tuples, each covering the entries between
+            byte offsets start and end, or the whole file if start is
+            None.
+    '''
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return [(path, None, None)]
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        count = min(count, size // _MIN_PART)
+        if count < 2 or f.read(1) != b'{':
+            return [(path, None, None)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = data.rfind(b'}')
+            parts = []
+            start = 1
+            for i in range(1, count):
+                match = _ENTRY.search(data, max(size * i // count, start),
+                                      end)
+                if match is None:
+                    break
+                # The part keeps the closing brace of its last entry.
+                parts.append((path, start, match.start() + 1))
+                start = match.end()
+            parts.append((path, start, end))
+    return parts
+
+
+def normalize(record):
+    '''Parse the timestamps of a record read from a snapshot, in place.
+
+    Args:
+        record (dict): The record, as written by to_dict().
+    '''
+    for name in datetimes:
+        # Those of a binary file may have been read as datetimes.
+        if name in record and type(record[name]) is not datetime:
+            record[name] = datetime.fromisoformat(record[name])
+
+
+def _send_records(parts, normalized, connection):
+    '''Send (True, hydrate(part)) for each part over connection, in order.
+
+    Runs in the worker processes of FileStorage.reload(). An error is sent
+    as (False, error) instead, and ends the work.
+
+    Args:
+        parts (list): Parts returned by split_snapshot().
+        normalized (bool): If True, normalize() the records.
+        connection (Connection): The writing end of a pipe.
+    '''
+    try:
+        for part in parts:
+            try:
+                records = hydrate(part, normalized)
+            except Exception as error:
+                connection.send((False, error))
+                break
+            connection.send((True, records))
+    except OSError:
+        # reload() stopped reading.
+        pass
+    finally:
+        connection.close()
+
+
+def hydrate(part, normalized=True):
+    '''Return the records of a part of a snapshot file.
+
+    Runs in the worker processes of FileStorage.reload().
+
+    Args:
+        part (tuple): A part returned by split_snapshot().
+        normalized (bool): If True, normalize() the records.
+
+    Raises:
+        ValueError: If the part does not hold whole entries.
+    '''
+    path, start, end = part
+    if start is None:
+        return read_snapshot(path, normalized)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        entries = json.loads(b'{' + f.read(end - start) + b'}')
+    records = list(entries.values())
+    try:
+        aligned = all(key == record['__class__'] + '.' + record['id']
+                      for key, record in entries.items())
+    except (TypeError, KeyError):
+        aligned = False
+    if not aligned:
+        raise ValueError('Not the entries of a snapshot')
+    if normalized:
+        for record in records:
+            normalize(record)
+    return records
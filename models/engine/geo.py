@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+'''Defines the geometry behind the location queries of the storage engines.
+
+Points are a latitude and a longitude in degrees. Distances are in km,
+along the surface of a sphere of the Earth's mean radius. A box is
+(south, west, north, east); one whose west is greater than its east
+crosses the antimeridian.
+'''
+
+import math
+
+EARTH_RADIUS = 6371.0088
+
+
+def distance(lat1, lon1, lat2, lon2):
+    '''Return the distance in km between two points (haversine formula).'''
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def around(lat, lon, km):
+    '''Return the smallest box holding every point within km of a point.
+
+    Args:
+        lat (float): The latitude of the point.
+        lon (float): The longitude of the point.
+        km (float): The distance.
+
+    Returns:
+        tuple: (south, west, north, east).
+    '''
+    angle = km / EARTH_RADIUS
+    south = lat - math.degrees(angle)
+    north = lat + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        # A pole is within reach: so is every longitude.
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    ratio = math.sin(angle) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return south, -180.0, north, 180.0
+    width = math.degrees(math.asin(ratio))
+    west = lon - width
+    east = lon + width
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def split(south, west, north, east):
+    '''Return the box as a list of boxes not crossing the antimeridian.'''
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def inside(lat, lon, south, west, north, east):
+    '''Return True if the point is in the box (edges included).'''
+    if not south <= lat <= north:
+        return False
+    if west <= east:
+        return west <= lon <= east
+    return lon >= west or lon <= east
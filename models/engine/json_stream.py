@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+'''Defines an incremental reader for the top-level entries of a JSON object.
+'''
+
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_items(f, chunk_size=1 << 16):
+    '''Yield the (key, value) pairs of the JSON object stored in f.
+
+    The file is read chunk_size characters at a time and each entry is
+    decoded as soon as it is complete, so only one entry (plus one chunk)
+    is held in memory at a time.
+
+    Args:
+        f (file): A text file containing a single JSON object.
+        chunk_size (int): Number of characters read at a time.
+
+    Raises:
+        ValueError: If the file is not a JSON object.
+    '''
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill(buf, pos):
+        '''Drop the consumed part of buf and append the next chunk.'''
+        chunk = f.read(chunk_size)
+        return buf[pos:] + chunk, 0, chunk == ''
+
+    def skip(buf, pos, eof):
+        '''Skip whitespace, reading more input if the buffer runs out.'''
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf, pos, eof
+            buf, pos, eof = fill(buf, pos)
+
+    def decode(buf, pos, eof):
+        '''Decode the next complete value, reading more input as needed.'''
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+                # A value that ends the buffer may continue in the next
+                # chunk (e.g. a number), so only trust it at EOF.
+                if end < len(buf) or eof:
+                    return value, buf, end, eof
+            except ValueError:
+                if eof:
+                    raise
+            buf, pos, eof = fill(buf, pos)
+
+    buf, pos, eof = skip(buf, pos, eof)
+    if buf[pos:pos + 1] != '{':
+        raise ValueError('Expecting a JSON object')
+    pos += 1
+    buf, pos, eof = skip(buf, pos, eof)
+    if buf[pos:pos + 1] == '}':
+        return
+    while True:
+        key, buf, pos, eof = decode(buf, pos, eof)
+        buf, pos, eof = skip(buf, pos, eof)
+        if buf[pos:pos + 1] != ':':
+            raise ValueError('Expecting \':\' delimiter')
+        buf, pos, eof = skip(buf, pos + 1, eof)
+        value, buf, pos, eof = decode(buf, pos, eof)
+        yield key, value
+        buf, pos, eof = skip(buf, pos, eof)
+        delimiter = buf[pos:pos + 1]
+        pos += 1
+        if delimiter == '}':
+            return
+        if delimiter != ',':
+            raise ValueError('Expecting \',\' delimiter')
+        buf, pos, eof = skip(buf, pos, eof)
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+'''Defines the LazyObjects dictionary used by FileStorage in lazy mode.'''
+
+
+class LazyObjects(dict):
+    '''A dictionary of stored objects that may still hold raw records.
+
+    A value is either an instance or the plain dict it was loaded from.
+    Raw records are turned into instances the first time they are looked
+    up by key or when the values are iterated, and copies (copy(), dict())
+    hold instances only; iterating over the keys, len() and ``in`` never
+    build an instance. FileStorage reads the raw records with the methods
+    of dict, such as dict.items().
+
+    Attributes:
+        loader (callable): Builds an instance from a raw record.
+    '''
+
+    def __init__(self, loader, *args):
+        '''Create the dictionary.
+
+        Args:
+            loader (callable): Builds an instance from a raw record.
+            *args (any): Passed on to dict().
+        '''
+        super().__init__(*args)
+        self.loader = loader
+
+    def __getitem__(self, key):
+        '''Return the instance stored under key, building it if needed.'''
+        value = super().__getitem__(key)
+        if type(value) is dict:
+            value = self.loader(value)
+            super().__setitem__(key, value)
+        return value
+
+    def __iter__(self):
+        '''Iterate over the keys.
+
+        Overridden so that dict(), {**...}, copy(), | and update() read
+        the values through __getitem__() and get instances: CPython only
+        copies the stored values directly (raw records included) from
+        dictionaries that do not override __iter__().
+        '''
+        return super().__iter__()
+
+    def copy(self):
+        '''Return a plain dict of the items, building every instance.'''
+        return dict(self)
+
+    def setdefault(self, key, default=None):
+        '''Return the instance stored under key, storing default first if
+        there is none.'''
+        if key in self:
+            return self[key]
+        return super().setdefault(key, default)
+
+    def popitem(self):
+        '''Remove the last item and return it, building its instance.'''
+        key, value = super().popitem()
+        if type(value) is dict:
+            value = self.loader(value)
+        return key, value
+
+    def get(self, key, default=None):
+        '''Return the instance stored under key, or default.'''
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        '''Remove key and return its instance (or default).'''
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return super().pop(key, *default)
+
+    def values(self):
+        '''Return the values, building every instance not built yet.'''
+        self.load_all()
+        return super().values()
+
+    def items(self):
+        '''Return the items, building every instance not built yet.'''
+        self.load_all()
+        return super().items()
+
+    def load_all(self):
+        '''Build the instances of all the raw records left.'''
+        for key, value in super().items():
+            if type(value) is dict:
+                super().__setitem__(key, self.loader(value))
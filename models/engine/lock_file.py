@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+'''Defines the lock file through which processes share FileStorage files.'''
+
+import io
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows: the shared option is not available there.
+    fcntl = None
+
+
+class LockFile:
+    '''The <snapshot>.lock file of files several processes use.
+
+    Writers hold an exclusive advisory lock (fcntl.flock()) on it and
+    readers a shared one. It holds a generation number every write
+    increases, so a process can tell with one read whether another one
+    wrote the files since it last read or wrote them.
+
+    Attributes:
+        path (str): The path of the lock file.
+        generation (int): The generation the objects of this process are
+            up to date with, or None if not known.
+        __opened (tuple): (process id, descriptor) of the open file, or
+            None.
+    '''
+
+    def __init__(self, path):
+        '''Create the lock; the file is opened by held().
+
+        Args:
+            path (str): The path of the lock file.
+        '''
+        self.path = path
+        self.generation = None
+        self.__opened = None
+
+    @contextmanager
+    def held(self, exclusive):
+        '''Hold the lock.
+
+        Args:
+            exclusive (bool): True to write, False to read.
+
+        Raises:
+            io.UnsupportedOperation: If fcntl is not available.
+        '''
+        if fcntl is None:
+            raise io.UnsupportedOperation('shared storage needs fcntl')
+        fd = self.__open()
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield self
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def read(self):
+        '''Return the generation in the file; the lock must be held.'''
+        return int.from_bytes(os.pread(self.__opened[1], 8, 0), 'little')
+
+    def advance(self):
+        '''Increase the generation in the file after a write, which the
+        objects are then up to date with; the lock must be held
+        exclusively.
+
+        Returns:
+            int: The new generation.
+        '''
+        self.generation = self.read() + 1
+        os.pwrite(self.__opened[1], self.generation.to_bytes(8, 'little'),
+                  0)
+        return self.generation
+
+    def close(self):
+        '''Close the file, if this process opened it.'''
+        opened = self.__opened
+        self.__opened = None
+        if opened is not None and opened[0] == os.getpid():
+            os.close(opened[1])
+
+    def __open(self):
+        '''Return the descriptor of the file, opening it if needed.'''
+        if self.__opened is not None and self.__opened[0] == os.getpid():
+            return self.__opened[1]
+        # A forked child must not share the lock of its parent: flock()
+        # locks belong to the open file, which fork() shares.
+        self.close()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        self.__opened = (os.getpid(), fd)
+        self.generation = None
+        return fd
@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+'''Defines a read-only storage engine over a memory-mapped snapshot.'''
+
+import io
+import os
+import json
+import mmap
+import weakref
+from models.base_model import classes
+from models.engine.base_storage import BaseStorage
+from models.engine.file_storage import shard_pattern
+from models.engine import snapshot_index, compression, binary_format
+
+
+class MappedStorage(BaseStorage):
+    '''Reads the objects saved by FileStorage without loading them all.
+
+    reload() memory-maps file.json and its sorted key index (see
+    models/engine/snapshot_index.py), so opening the store does not
+    depend on its size: get() bisects the index and decodes one record,
+    count(cls) is the size of a range of the index, and all(cls) only
+    decodes the records of that class. The records of the journal, if
+    any, are read on reload() and take precedence over the snapshot.
+
+    The index is the one FileStorage writes when its index option is set;
+    if it is missing or out of date, the snapshot is scanned once and the
+    rebuilt index saved next to it. Only the JSON single file layout can
+    be mapped: reload() raises ValueError for shard files and for
+    compressed or binary snapshots.
+
+    The store is read-only: new(), delete() and save() raise
+    io.UnsupportedOperation. Attributes of the instances it returns can
+    be set, but the changes cannot be saved.
+
+    Attributes:
+        read_only (bool): Always True.
+        __path (str): Path to the snapshot.
+        __file (file): The open snapshot, or None.
+        __index (SnapshotIndex): The index of the mapped snapshot, or None
+            if there is no snapshot.
+        __journal (dict): <class name>.id -> record (None if deleted) of
+            the journal.
+        __objects (WeakValueDictionary): Instances already decoded, by
+            key, so a record is always represented by the same instance.
+    '''
+
+    read_only = True
+
+    def __init__(self, path='file.json'):
+        '''Create the engine; the snapshot is mapped by reload().
+
+        Args:
+            path (str): Path to the snapshot written by FileStorage.
+        '''
+        self.__path = path
+        self.__file = None
+        self.__index = None
+        self.__journal = {}
+        self.__objects = weakref.WeakValueDictionary()
+
+    def all(self, cls=None):
+        '''Returns a dictionary of the stored objects by key.
+
+        Args:
+            cls (type or str): If given, only the objects of this class
+                (or class name) are returned.
+        '''
+        prefix = '' if cls is None else self._class_name(cls) + '.'
+        objects = {}
+        if self.__index is not None:
+            if cls is None:
+                entries = range(len(self.__index))
+            else:
+                entries = self.__index.prefix_range(prefix)
+            for i in entries:
+                key = self.__index.key(i)
+                if key not in self.__journal:
+                    objects[key] = self.__load(key, i)
+        for key, record in self.__journal.items():
+            if record is not None and key.startswith(prefix):
+                objects[key] = self.__get(key)
+        return objects
+
+    def count(self, cls=None):
+        '''Returns the number of stored objects.
+
+        Args:
+            cls (type or str): If given, only count this class (or class
+                name).
+        '''
+        prefix = '' if cls is None else self._class_name(cls) + '.'
+        count = 0
+        if self.__index is not None:
+            if cls is None:
+                count = len(self.__index)
+            else:
+                count = len(self.__index.prefix_range(prefix))
+        for key, record in self.__journal.items():
+            if key.startswith(prefix):
+                stored = self.__index is not None and \
+                        self.__index.find(key) is not None
+                count += (record is not None) - stored
+        return count
+
+    def get(self, cls, id):
+        '''Returns the stored object of class cls with this id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        return self.__get(self.key(cls, id))
+
+    def new(self, obj):
+        '''Raises io.UnsupportedOperation: the store is read-only.'''
+        raise io.UnsupportedOperation('storage is read-only')
+
+    def delete(self, obj=None):
+        '''Raises io.UnsupportedOperation: the store is read-only.'''
+        raise io.UnsupportedOperation('storage is read-only')
+
+    def save(self):
+        '''Raises io.UnsupportedOperation: the store is read-only.'''
+        raise io.UnsupportedOperation('storage is read-only')
+
+    def reload(self):
+        '''Maps the snapshot and its index and reads the journal.
+
+        If there is no snapshot, the store only holds the journal's
+        objects.
+
+        Raises:
+            ValueError: If the store cannot be mapped: it is sharded, or
+                its snapshot is compressed, binary or not a JSON object.
+        '''
+        self.close()
+        directory = os.path.dirname(self.__path) or '.'
+        pattern = shard_pattern(self.__path)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            names = []
+        if any(pattern.fullmatch(name) for name in names):
+            self.__unmappable('it is sharded')
+        try:
+            self.__file = open(self.__path, 'rb')
+        except FileNotFoundError:
+            pass
+        else:
+            head = self.__file.read(8)
+            if compression.detect(head) is not None:
+                self.__unmappable('its snapshot is compressed')
+            if head[:len(binary_format.MAGIC)] in binary_format.MAGICS:
+                self.__unmappable('its snapshot is binary')
+            if os.fstat(self.__file.fileno()).st_size:
+                data = mmap.mmap(self.__file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+                self.__index = snapshot_index.open_index(self.__path, data)
+        self.__journal = {}
+        try:
+            with open(self.__path + '.journal', 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn record; the appends after it start on a
+                        # new line.
+                        continue
+                    self.__journal[record['key']] = record['value']
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        '''Unmaps and closes the snapshot.'''
+        if self.__index is not None:
+            self.__index.data.close()
+            self.__index = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__objects = weakref.WeakValueDictionary()
+
+    def __unmappable(self, reason):
+        '''Close the snapshot and raise ValueError for reason.'''
+        self.close()
+        raise ValueError('Cannot map {}: {}; only a single uncompressed '
+                         'JSON snapshot can be mapped'.format(self.__path,
+                                                              reason))
+
+    def __get(self, key):
+        '''Return the instance stored under key, or None.'''
+        if key in self.__journal:
+            return self.__load(key)
+        if self.__index is None:
+            return None
+        i = self.__index.find(key)
+        if i is None:
+            return None
+        return self.__load(key, i)
+
+    def __load(self, key, i=None):
+        '''Return the instance of key, decoding entry i of the index (or
+        the journal's record if i is None) the first time.'''
+        obj = self.__objects.get(key)
+        if obj is None:
+            if i is None:
+                record = self.__journal[key]
+                if record is None:
+                    return None
+            else:
+                record = self.__index.value(i)
+            obj = classes[record['__class__']](**record)
+            self.__objects[key] = obj
+        return obj
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+'''Defines a storage engine that keeps objects in memory only.'''
+
+from models.engine.base_storage import BaseStorage
+
+
+class MemoryStorage(BaseStorage):
+    '''Keeps objects in dictionaries and never writes them anywhere.
+
+    It is the baseline the other engines can be measured against.
+
+    Attributes:
+        __classes (dict): Class name -> {<class name>.id: object}.
+    '''
+
+    def __init__(self):
+        '''Create an empty storage.'''
+        self.__classes = {}
+
+    def all(self, cls=None):
+        '''Returns a dictionary of the stored objects by key.
+
+        Args:
+            cls (type or str): If given, only the objects of this class.
+        '''
+        if cls is not None:
+            return dict(self.__classes.get(self._class_name(cls), {}))
+        objects = {}
+        for class_objects in self.__classes.values():
+            objects.update(class_objects)
+        return objects
+
+    def count(self, cls=None):
+        '''Returns the number of stored objects.
+
+        Args:
+            cls (type or str): If given, only count this class.
+        '''
+        if cls is not None:
+            return len(self.__classes.get(self._class_name(cls), ()))
+        return sum(len(objects) for objects in self.__classes.values())
+
+    def get(self, cls, id):
+        '''Returns the stored object of class cls with this id, or None.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        objects = self.__classes.get(self._class_name(cls), {})
+        return objects.get(self.key(cls, id))
+
+    def new(self, obj):
+        '''Adds an object to the storage.
+
+        Args:
+            obj (BaseModel): The object to be stored.
+        '''
+        self.__classes.setdefault(obj.__class__.__name__, {})[
+                self.key(obj.__class__, obj.id)] = obj
+
+    def delete(self, obj=None):
+        '''Removes an object from the storage.
+
+        Args:
+            obj (BaseModel): The object to be removed. Does nothing if None.
+        '''
+        if obj is not None:
+            self.__classes.get(obj.__class__.__name__, {}).pop(
+                    self.key(obj.__class__, obj.id), None)
+
+    def save(self):
+        '''Does nothing: there is nothing to persist to.'''
+
+    def reload(self):
+        '''Does nothing: there is nothing to load from.'''
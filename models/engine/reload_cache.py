@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+'''Defines the sidecar cache FileStorage.reload() can start from.
+
+Most of what reload() costs is parsing the snapshot and building each
+instance through __init__(). The cache (<snapshot>.cache) holds the
+attributes of every object as reload() left them, with what reload()
+needs to check that the files have not changed since, so another process
+can build the instances straight from it.
+
+It is written with marshal, which loads plain data much faster than the
+json module and, unlike pickle, never runs code while doing so. The
+marshal format may change between Python versions, so a cache written by
+another version is ignored. created_at and updated_at are written in ISO
+format; marshal cannot write other datetime attributes, so objects that
+have some cannot be cached.
+'''
+
+import os
+import sys
+import marshal
+from datetime import datetime
+from models.engine import file_state
+from models.base_model import classes, datetimes
+
+VERSION = ('hbnb-cache', 1) + tuple(sys.version_info[:2])
+
+
+def cache_path(path):
+    '''Return the path of the cache of the snapshot at path.'''
+    return path + '.cache'
+
+
+def read(path, files, shards):
+    '''Return the cache of the snapshot at path, if it was written for
+    its files as they are now.
+
+    Args:
+        path (str): The snapshot.
+        files (dict): The file_state.scan() of its files.
+        shards (int): The shards option it is read with.
+
+    Returns:
+        tuple: (state, iterator of (key, object) pairs), as loads()
+            returns them, with state['checksums'] holding the checksums
+            still needed (see file_state.verify()); or None if there is
+            no cache for the files.
+    '''
+    try:
+        with open(cache_path(path), 'rb') as f:
+            state, objects = loads(f.read())
+    except (OSError, ValueError):
+        return None
+    if state['files'] != files or state['shards'] != shards:
+        return None
+    state['checksums'] = file_state.verify(files, state['checksums'])
+    if state['checksums'] is None:
+        return None
+    return state, objects
+
+
+def write(path, items, state):
+    '''Write the cache of the snapshot at path, if the objects can be.
+
+    The cache only saves time, so a failure is ignored: the next
+    reload() tries again.
+
+    Args:
+        path (str): The snapshot.
+        items (iterable): See dumps().
+        state (dict): See dumps(); read() checks its 'files', 'shards' and
+            'checksums'.
+    '''
+    tmp_path = cache_path(path) + '.tmp'
+    try:
+        data = dumps(items, state)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path(path))
+    except (OSError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def dumps(items, state):
+    '''Return the cache of the objects.
+
+    Args:
+        items (iterable): The (key, object) pairs, where an object is an
+            instance or a raw record (in lazy mode).
+        state (dict): What else the cache records (marshal-able values).
+
+    Raises:
+        ValueError: If an object has attributes marshal cannot write.
+    '''
+    entries = []
+    for key, obj in items:
+        if type(obj) is dict:
+            entries.append((key, None, obj))
+            continue
+        attributes = obj._attributes()
+        for name in datetimes:
+            if name in attributes:
+                attributes[name] = attributes[name].isoformat()
+        entries.append((key, obj.__class__.__name__, attributes))
+    return marshal.dumps((VERSION, state, entries))
+
+
+def loads(data):
+    '''Return the state and objects of a cache.
+
+    Args:
+        data (bytes): The content of the cache.
+
+    Returns:
+        tuple: (state, iterator of (key, object) pairs). Raw records are
+            left as they are; instances are built as they are iterated.
+
+    Raises:
+        ValueError: If data is not a cache of this version.
+    '''
+    try:
+        version, state, entries = marshal.loads(data)
+    except (EOFError, TypeError, ValueError):
+        raise ValueError('Not a reload cache') from None
+    if version != VERSION:
+        raise ValueError('Reload cache of another version')
+    return state, _objects(entries)
+
+
+def _objects(entries):
+    '''Yield the (key, object) pairs of the entries of a cache.'''
+    for key, name, attributes in entries:
+        if name is not None:
+            for date in datetimes:
+                if date in attributes:
+                    attributes[date] = datetime.fromisoformat(
+                            attributes[date])
+            attributes = classes[name]._from_attributes(attributes)
+        yield key, attributes
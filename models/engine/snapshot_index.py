@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+'''Defines the sorted key index of a JSON snapshot file.
+
+The index (<snapshot>.idx) lets a reader find the entries of file.json
+without parsing it. After a header recording the size and modification
+time of the snapshot it was built for, it holds one fixed size entry per
+key, sorted by key:
+
+    offset and length of the key (as written, without its quotes)
+    offset and length of the value
+
+both in the snapshot, so a key is found by bisecting the entries, and
+the keys of one class, which all start with <class name>., form a
+contiguous range of entries. Offsets are in bytes.
+'''
+
+import os
+import json
+import mmap
+import struct
+import bisect
+
+MAGIC = b'HBNX\x01'
+_header = struct.Struct('<5sQqQ')
+_entry = struct.Struct('<QIQI')
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def index_path(path):
+    '''Return the path of the index of the snapshot at path.'''
+    return path + '.idx'
+
+
+def entries_of(items):
+    '''Yield the index entries of a snapshot written as
+    '{' + ', '.join(json.dumps(key) + ': ' + value) + '}'.
+
+    Args:
+        items (iterable): The (key, JSON text of the value) pairs, in the
+            order they are written.
+
+    Yields:
+        tuple: (key as written, key offset, key length, value offset,
+            value length).
+    '''
+    pos = 1
+    for key, value in items:
+        key = json.dumps(key)
+        yield (key[1:-1], pos + 1, len(key) - 2, pos + len(key) + 2,
+               len(value))
+        pos += len(key) + 2 + len(value) + 2
+
+
+def scan(data):
+    '''Return the index entries of the JSON snapshot data.
+
+    Used when a snapshot has no up to date index; it parses the whole
+    snapshot once.
+
+    Args:
+        data (bytes): The content of the snapshot.
+
+    Raises:
+        ValueError: If data is not a JSON object.
+    '''
+    # latin-1 maps each byte to one character, so offsets stay in bytes.
+    text = data.decode('latin-1')
+    entries = []
+
+    def skip(pos):
+        '''Return the position of the next non-whitespace character.'''
+        while pos < len(text) and text[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    pos = skip(0)
+    if text[pos:pos + 1] != '{':
+        raise ValueError('Expecting a JSON object')
+    pos = skip(pos + 1)
+    if text[pos:pos + 1] == '}':
+        return entries
+    while True:
+        if text[pos:pos + 1] != '"':
+            raise ValueError('Expecting a key')
+        key_end = _decoder.raw_decode(text, pos)[1]
+        key = (text[pos + 1:key_end - 1], pos + 1, key_end - pos - 2)
+        pos = skip(key_end)
+        if text[pos:pos + 1] != ':':
+            raise ValueError('Expecting \':\' delimiter')
+        pos = skip(pos + 1)
+        end = _decoder.raw_decode(text, pos)[1]
+        entries.append(key + (pos, end - pos))
+        pos = skip(end)
+        delimiter = text[pos:pos + 1]
+        pos = skip(pos + 1)
+        if delimiter == '}':
+            return entries
+        if delimiter != ',':
+            raise ValueError('Expecting \',\' delimiter')
+
+
+def pack(entries, stat):
+    '''Return the content of the index of a snapshot.
+
+    Args:
+        entries (iterable): The entries, as returned by entries_of() or
+            scan(), in any order.
+        stat (os.stat_result): The stat() of the snapshot they index.
+    '''
+    entries = sorted(entries)
+    out = bytearray(_header.pack(MAGIC, stat.st_size, stat.st_mtime_ns,
+                                 len(entries)))
+    for key, *offsets in entries:
+        out += _entry.pack(*offsets)
+    return bytes(out)
+
+
+class SnapshotIndex:
+    '''Looks keys up in a snapshot through its index, both memory-mapped.
+
+    Attributes:
+        data (mmap): The snapshot.
+        __index (mmap): The index.
+        __size (int): Number of keys.
+    '''
+
+    def __init__(self, data, index):
+        '''Wrap a mapped snapshot and its index.
+
+        Args:
+            data (mmap or bytes): The snapshot.
+            index (mmap or bytes): Its index.
+        '''
+        self.data = data
+        self.__index = index
+        self.__size = _header.unpack_from(index)[3]
+
+    def __len__(self):
+        '''Return the number of keys.'''
+        return self.__size
+
+    def __getitem__(self, i):
+        '''Return the key of entry i, as written in the snapshot (bytes).
+
+        Makes the index a sorted sequence bisect can search.
+        '''
+        if not 0 <= i < self.__size:
+            raise IndexError(i)
+        key_pos, key_len, pos, size = _entry.unpack_from(
+                self.__index, _header.size + i * _entry.size)
+        return self.data[key_pos:key_pos + key_len]
+
+    def key(self, i):
+        '''Return the key of entry i.'''
+        return json.loads(b'"' + self[i] + b'"')
+
+    def value(self, i):
+        '''Return the decoded value of entry i.'''
+        key_pos, key_len, pos, size = _entry.unpack_from(
+                self.__index, _header.size + i * _entry.size)
+        return json.loads(self.data[pos:pos + size])
+
+    def find(self, key):
+        '''Return the entry number of key, or None if it is not stored.'''
+        target = json.dumps(key)[1:-1].encode('utf-8')
+        i = bisect.bisect_left(self, target)
+        if i < self.__size and self[i] == target:
+            return i
+        return None
+
+    def prefix_range(self, prefix):
+        '''Return the range of the entries whose key starts with prefix.
+
+        Args:
+            prefix (str): E.g. '<class name>.'.
+        '''
+        target = json.dumps(prefix)[1:-1].encode('utf-8')
+        # The smallest bytes string greater than every one starting with
+        # target.
+        stop = target[:-1] + bytes([target[-1] + 1])
+        return range(bisect.bisect_left(self, target),
+                     bisect.bisect_left(self, stop))
+
+
+def open_index(path, data, writable=True):
+    '''Return the SnapshotIndex of the snapshot at path.
+
+    The index file is used if it was built for the snapshot as it is now;
+    otherwise the snapshot is scanned and, if writable, the new index is
+    saved for the next time.
+
+    Args:
+        path (str): The path of the snapshot.
+        data (mmap): The snapshot, mapped.
+        writable (bool): Whether a rebuilt index may be saved.
+    '''
+    stat = os.stat(path)
+    try:
+        with open(index_path(path), 'rb') as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, mtime_ns, count = _header.unpack_from(index)
+        if magic == MAGIC and size == stat.st_size and \
+                mtime_ns == stat.st_mtime_ns and \
+                len(index) == _header.size + count * _entry.size:
+            return SnapshotIndex(data, index)
+        index.close()
+    except (OSError, ValueError, struct.error):
+        pass
+    index = pack(scan(data[:]), stat)
+    if writable:
+        tmp_path = index_path(path) + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(index)
+            os.replace(tmp_path, index_path(path))
+        except OSError:
+            pass
+    return SnapshotIndex(data, index)
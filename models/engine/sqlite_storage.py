@@ -0,0 +1,456 @@
+#!/usr/bin/python3
+'''Defines a storage engine backed by an SQLite database.'''
+
+import json
+import sqlite3
+import weakref
+from os import getenv
+from contextlib import contextmanager, nullcontext
+from models.base_model import classes
+from models.engine import geo
+from models.engine.base_storage import BaseStorage
+
+
+class SQLiteStorage(BaseStorage):
+    '''Stores instances of BaseModel class as rows of an SQLite table.
+
+    Each object is one row of the ``objects`` table: its key
+    (<class name>.id), its class name and its to_dict() as JSON. Only the
+    rows that are looked up are turned into instances, and save() only
+    writes the rows of objects created, changed or deleted since the last
+    save.
+
+    Attributes:
+        __path (str): Path to the database file.
+        __conn (sqlite3.Connection): The open connection, or None.
+        __objects (WeakValueDictionary): Instances already loaded, by key,
+            so a row is always represented by the same instance.
+        __new (dict): Objects added with new() since the last save.
+        __dirty (dict): Objects whose attributes were set since the last
+            save, keyed by their id().
+        __deleted (set): Keys of the objects deleted since the last save.
+        __related (set): The attributes related() and between() have
+            indexed. Only the attributes the model classes declare are
+            indexed, each by an objects_attr_<attribute> index.
+        __batches (list): The batch() blocks being run, innermost last,
+            each with the state to restore if it raises.
+    '''
+
+    def __init__(self, path=None):
+        '''Create the engine; the database is opened by reload().
+
+        Args:
+            path (str): Path to the database file. Defaults to the
+                HBNB_SQLITE_PATH environment variable, else hbnb.db.
+        '''
+        if path is None:
+            path = getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+        self.__path = path
+        self.__conn = None
+        self.__objects = weakref.WeakValueDictionary()
+        self.__new = {}
+        self.__dirty = {}
+        self.__deleted = set()
+        self.__related = set()
+        self.__batches = []
+
+    def all(self, cls=None):
+        '''Returns a dictionary of the stored objects by key.
+
+        Args:
+            cls (type or str): If given, only the objects of this class
+                (or class name) are returned.
+        '''
+        if cls is None:
+            rows = self.__conn.execute('SELECT key, data FROM objects')
+        else:
+            rows = self.__conn.execute(
+                    'SELECT key, data FROM objects WHERE class = ?',
+                    (self._class_name(cls),))
+        objects = {}
+        for key, data in rows:
+            if key not in self.__deleted:
+                objects[key] = self.__load(key, data)
+        for key, obj in self.__new.items():
+            if cls is None or key.split('.', 1)[0] == \
+                    self._class_name(cls):
+                objects[key] = obj
+        return objects
+
+    def count(self, cls=None):
+        '''Returns the number of stored objects.
+
+        Args:
+            cls (type or str): If given, only count this class (or class
+                name).
+        '''
+        name = None if cls is None else self._class_name(cls)
+        total = self.__count(name)
+        # Adjust for the changes not saved yet.
+        for key in set(self.__new) | self.__deleted:
+            if name is not None and key.split('.', 1)[0] != name:
+                continue
+            stored = self.__conn.execute(
+                    'SELECT 1 FROM objects WHERE key = ?',
+                    (key,)).fetchone() is not None
+            if key in self.__new and not stored:
+                total += 1
+            elif key in self.__deleted and stored:
+                total -= 1
+        return total
+
+    def get(self, cls, id):
+        '''Returns the stored object of class cls with this id, or None.
+
+        Only the row of that object is read.
+
+        Args:
+            cls (type or str): The class of the object.
+            id (str): The id of the object.
+        '''
+        key = self.key(cls, id)
+        if key in self.__deleted:
+            return None
+        obj = self.__objects.get(key)
+        if obj is None:
+            row = self.__conn.execute(
+                    'SELECT data FROM objects WHERE key = ?',
+                    (key,)).fetchone()
+            if row is not None:
+                obj = self.__load(key, row[0])
+        return obj
+
+    def related(self, cls, attribute, value):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute equals value.
+
+        The first lookup of an attribute creates an index on it in the
+        database, so only the matching rows are read.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            value (any): The value looked for.
+
+        Raises:
+            ValueError: If attribute is not a valid identifier.
+        '''
+        return self.__select(
+                cls, attribute, '{0} = ?', (value,),
+                lambda obj: getattr(obj, attribute, None) == value)
+
+    def between(self, cls, attribute, low=None, high=None):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a number from low to high, in increasing order
+        of attribute.
+
+        The rows are read through the index related() creates.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            low (int or float): The smallest value included, or None.
+            high (int or float): The largest value included, or None.
+
+        Raises:
+            ValueError: If attribute is not a valid identifier.
+        '''
+        condition = "json_type(data, '$.{1}') IN " \
+            "('integer', 'real', 'true', 'false')"
+        params = ()
+        if low is not None:
+            condition += ' AND {0} >= ?'
+            params += (low,)
+        if high is not None:
+            condition += ' AND {0} <= ?'
+            params += (high,)
+
+        def match(obj):
+            '''Tell whether the attribute of obj is in range.'''
+            value = getattr(obj, attribute, None)
+            return self.is_number(value) and \
+                (low is None or value >= low) and \
+                (high is None or value <= high)
+
+        objects = self.__select(cls, attribute, condition, params, match)
+        return dict(sorted(objects.items(),
+                           key=lambda item: getattr(item[1], attribute)))
+
+    def containing(self, cls, attribute, values):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose attribute is a list holding every one of values.
+
+        The lists are searched by the database (json_each()), so only
+        the matching rows are turned into instances.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute, e.g. amenity_ids.
+            values (iterable): The elements looked for.
+
+        Raises:
+            ValueError: If attribute is not a valid identifier.
+        '''
+        values = tuple(values)
+        condition = "json_type(data, '$.{1}') = 'array'" + \
+            " AND EXISTS (SELECT 1 FROM json_each(data, '$.{1}')" \
+            ' WHERE json_each.value = ?)' * len(values)
+
+        def match(obj):
+            '''Tell whether the list of obj holds every value.'''
+            held = self.list_of(obj, attribute)
+            return held is not None and \
+                all(value in held for value in values)
+
+        return self.__select(cls, attribute, condition, values, match,
+                             indexed=False)
+
+    def in_bbox(self, south, west, north, east, cls='Place'):
+        '''Returns a dictionary, by key, of the stored objects of class cls
+        whose latitude and longitude are in a box.
+
+        The rows are read through the index related() creates on the
+        latitude. A box whose west is greater than its east crosses the
+        antimeridian.
+
+        Args:
+            south (float): The smallest latitude included.
+            west (float): The westernmost longitude included.
+            north (float): The largest latitude included.
+            east (float): The easternmost longitude included.
+            cls (type or str): The class of the objects.
+        '''
+        condition = "{0} BETWEEN ? AND ? AND " \
+            "json_extract(data, '$.longitude') BETWEEN ? AND ?"
+        found = {}
+        for box in geo.split(south, west, north, east):
+
+            def match(obj):
+                '''Tell whether obj is located in the box.'''
+                lat = getattr(obj, 'latitude', None)
+                lon = getattr(obj, 'longitude', None)
+                return self.is_number(lat) and self.is_number(lon) and \
+                    geo.inside(lat, lon, *box)
+
+            found.update(self.__select(cls, 'latitude', condition,
+                                       (box[0], box[2], box[1], box[3]),
+                                       match))
+        return found
+
+    def new(self, obj):
+        '''Adds an object to the storage; it is written by save().
+
+        Args:
+            obj (BaseModel): The object to be stored.
+        '''
+        key = str(obj.__class__.__name__) + '.' + str(obj.id)
+        self.__new[key] = obj
+        self.__objects[key] = obj
+        self.__deleted.discard(key)
+
+    def touch(self, obj):
+        '''Flags an object as changed so the next save writes its row.
+
+        Objects that are not stored, such as those being built from
+        keyword arguments, are left alone.
+
+        Args:
+            obj (BaseModel): The object that changed.
+        '''
+        key = obj.__class__.__name__ + '.' + str(getattr(obj, 'id', None))
+        if self.__objects.get(key) is obj:
+            if self.__batches:
+                saved = self.__batches[-1]['saved']
+                if id(obj) not in saved:
+                    saved[id(obj)] = (obj, obj._attributes())
+            self.__dirty[id(obj)] = obj
+
+    def delete(self, obj=None):
+        '''Removes an object from the storage; the row goes on save().
+
+        Args:
+            obj (BaseModel): The object to be removed. Does nothing if None.
+        '''
+        if obj is None:
+            return
+        key = str(obj.__class__.__name__) + '.' + str(obj.id)
+        self.__new.pop(key, None)
+        self.__objects.pop(key, None)
+        self.__deleted.add(key)
+
+    def save(self):
+        '''Writes the rows of the objects changed since the last save.'''
+        changed = dict(self.__new)
+        for obj in self.__dirty.values():
+            key = obj.__class__.__name__ + '.' + str(obj.id)
+            if self.__objects.get(key) is obj:
+                changed[key] = obj
+        with self.__writing():
+            self.__conn.executemany(
+                    'DELETE FROM objects WHERE key = ?',
+                    [(key,) for key in self.__deleted])
+            self.__conn.executemany(
+                    'INSERT OR REPLACE INTO objects (key, class, data) '
+                    'VALUES (?, ?, ?)',
+                    [(key, key.split('.', 1)[0], json.dumps(obj.to_dict()))
+                     for key, obj in changed.items()])
+        self.__new = {}
+        self.__dirty = {}
+        self.__deleted = set()
+
+    @contextmanager
+    def batch(self):
+        '''Runs the block in one transaction.
+
+        The saves made in the block are not committed until the outermost
+        block exits. If the block raises, the rows it wrote are rolled
+        back and the objects created, deleted or changed (by setting
+        attributes) inside it are put back the way they were when it
+        started. Blocks can be nested.
+
+            with storage.batch():
+                for row in rows:
+                    place = Place()
+                    place.name = row['name']
+                    place.save()
+        '''
+        savepoint = 'batch{}'.format(len(self.__batches))
+        self.__conn.execute('SAVEPOINT ' + savepoint)
+        frame = {
+            'objects': dict(self.__objects),
+            'new': dict(self.__new),
+            'dirty': dict(self.__dirty),
+            'deleted': set(self.__deleted),
+            'saved': {},
+        }
+        self.__batches.append(frame)
+        try:
+            yield self
+        except BaseException:
+            self.__batches.pop()
+            self.__conn.execute('ROLLBACK TO ' + savepoint)
+            self.__conn.execute('RELEASE ' + savepoint)
+            self.__rollback(frame)
+            raise
+        self.__batches.pop()
+        if self.__batches:
+            # The enclosing block may still roll these changes back.
+            saved = self.__batches[-1]['saved']
+            for key, value in frame['saved'].items():
+                saved.setdefault(key, value)
+        # Releasing the outermost savepoint commits the transaction.
+        self.__conn.execute('RELEASE ' + savepoint)
+
+    def reload(self):
+        '''Opens the database, creating the table if needed.
+
+        Instances loaded before are forgotten, so they are read again.
+        '''
+        if self.__conn is None:
+            self.__conn = sqlite3.connect(self.__path)
+            with self.__conn:
+                self.__conn.execute(
+                        'CREATE TABLE IF NOT EXISTS objects ('
+                        'key TEXT PRIMARY KEY, class TEXT NOT NULL, '
+                        'data TEXT NOT NULL)')
+                self.__conn.execute(
+                        'CREATE INDEX IF NOT EXISTS objects_class '
+                        'ON objects (class)')
+        self.__objects = weakref.WeakValueDictionary(self.__new)
+
+    def close(self):
+        '''Closes the database; unsaved changes are lost.'''
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+    def __select(self, cls, attribute, condition, params, match,
+                 indexed=True):
+        '''Return the objects of class cls whose attribute matches.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): The name of the attribute.
+            condition (str): The SQL condition the rows must meet, where
+                {0} stands for the value of the attribute in the row and
+                {1} for its name.
+            params (tuple): The parameters of condition.
+            match (callable): Tells whether an object matches, to check
+                the objects not saved as they are.
+            indexed (bool): If False, no index is created (the condition
+                cannot use it). Indexes are only created for attributes
+                the class declares, so that arbitrary queries do not add
+                indexes every save() has to update.
+
+        Raises:
+            ValueError: If attribute is not a valid identifier.
+        '''
+        if not attribute.isidentifier():
+            raise ValueError('Invalid attribute name: ' + repr(attribute))
+        name = self._class_name(cls)
+        # The query has to spell out the indexed expression, so the
+        # attribute cannot be a parameter.
+        expression = "json_extract(data, '$.{}')".format(attribute)
+        if indexed and attribute not in self.__related and \
+                self._declared(name, attribute):
+            # The prefix keeps these apart from the objects_class index.
+            with self.__writing():
+                self.__conn.execute(
+                        'CREATE INDEX IF NOT EXISTS objects_attr_{} '
+                        'ON objects (class, {})'.format(attribute, expression))
+            self.__related.add(attribute)
+        rows = self.__conn.execute(
+                'SELECT key, data FROM objects WHERE class = ? AND ' +
+                condition.format(expression, attribute), (name,) + params)
+        candidates = [self.__load(key, data) for key, data in rows
+                      if key not in self.__deleted]
+        # Rows still hold the values of the last save.
+        candidates += self.__new.values()
+        candidates += self.__dirty.values()
+        objects = {}
+        for obj in candidates:
+            key = obj.__class__.__name__ + '.' + str(getattr(obj, 'id', ''))
+            if key.split('.', 1)[0] == name and \
+                    self.__objects.get(key) is obj and \
+                    match(obj):
+                objects[key] = obj
+        return objects
+
+    def __writing(self):
+        '''Return the context to write in: the connection, which commits
+        the writes, or nothing inside a batch(), which commits them.'''
+        return nullcontext() if self.__batches else self.__conn
+
+    def __rollback(self, frame):
+        '''Restore the state recorded when a batch() block started.'''
+        for obj, attributes in frame['saved'].values():
+            # Objects created inside the block are simply dropped.
+            key = obj.__class__.__name__ + '.' + str(attributes.get('id'))
+            if frame['objects'].get(key) is obj:
+                obj._restore(attributes)
+        self.__objects = weakref.WeakValueDictionary(frame['objects'])
+        self.__new = frame['new']
+        self.__dirty = frame['dirty']
+        self.__deleted = frame['deleted']
+        # Indexes created inside the block were rolled back with it.
+        self.__related = set()
+
+    def __count(self, name):
+        '''Return the number of rows, of class name if given.'''
+        if name is None:
+            row = self.__conn.execute('SELECT COUNT(*) FROM objects')
+        else:
+            row = self.__conn.execute(
+                    'SELECT COUNT(*) FROM objects WHERE class = ?', (name,))
+        return row.fetchone()[0]
+
+    def __load(self, key, data):
+        '''Return the instance for a row, building it if not loaded yet.'''
+        obj = self.__objects.get(key)
+        if obj is None:
+            record = json.loads(data)
+            obj = classes[record['__class__']](**record)
+            # Matches the row, so it does not need to be written again.
+            self.__dirty.pop(id(obj), None)
+            self.__objects[key] = obj
+        return obj
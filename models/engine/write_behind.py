@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+'''Defines the background writer of the write-behind mode of FileStorage.'''
+
+import time
+import threading
+
+
+class WriteBehind:
+    '''A thread that writes the saves of a storage in the background.
+
+    request() returns at once; the thread writes once the oldest request
+    not written yet is due, so the requests made close together are
+    written once. It writes the objects as they are when it runs, so
+    changes made after the last request may be written too.
+
+    Attributes:
+        lock (RLock): Held by the thread while it writes, and by the
+            storage while it changes what the thread writes.
+        __write (callable): Writes the saves.
+        __ready (callable): Returns False while the saves must not be
+            written.
+        __wake (Condition): Wakes the thread, and the threads waiting
+            for it in flush().
+        __thread (Thread): The thread.
+        __deadline (float): time.monotonic() by which the requests not
+            written yet are due, or None if there are none.
+        __urgent (bool): True if flush() asked for an immediate write.
+        __closing (bool): True if close() asked the thread to stop.
+        __error (Exception): The error the last write raised, re-raised
+            by the next request() or flush().
+    '''
+
+    def __init__(self, write, ready=lambda: True):
+        '''Start the thread.
+
+        Args:
+            write (callable): Writes the saves; called holding lock.
+            ready (callable): Returns False while the saves must not be
+                written (such as in the middle of a batch); wake() is
+                called once they can.
+        '''
+        self.lock = threading.RLock()
+        self.__write = write
+        self.__ready = ready
+        self.__wake = threading.Condition(self.lock)
+        self.__deadline = None
+        self.__urgent = False
+        self.__closing = False
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run,
+                                         name='FileStorage writer',
+                                         daemon=True)
+        self.__thread.start()
+
+    def request(self, max_staleness):
+        '''Ask for the saves to be written within max_staleness seconds.
+
+        Raises:
+            Exception: The error raised by the last write, if any.
+        '''
+        with self.__wake:
+            self.raise_error()
+            deadline = time.monotonic() + max_staleness
+            if self.__deadline is None or deadline < self.__deadline:
+                self.__deadline = deadline
+                self.__wake.notify_all()
+
+    def flush(self):
+        '''Block until every request so far has been written.
+
+        Raises:
+            Exception: The error raised by the last write, if any.
+        '''
+        with self.__wake:
+            if self.__deadline is not None:
+                self.__urgent = True
+                self.__wake.notify_all()
+                while self.__deadline is not None:
+                    self.__wake.wait()
+            self.raise_error()
+
+    def wake(self):
+        '''Have the thread check again whether the saves can be written.'''
+        with self.__wake:
+            self.__wake.notify_all()
+
+    def raise_error(self):
+        '''Raise the error of the last write, once.'''
+        with self.lock:
+            error = self.__error
+            self.__error = None
+        if error is not None:
+            raise error
+
+    def close(self):
+        '''Write the requests left and stop the thread.'''
+        with self.__wake:
+            self.__closing = True
+            self.__wake.notify_all()
+        self.__thread.join()
+
+    def __run(self):
+        '''Write the requested saves until close() is called.
+
+        Holds the lock except while it waits.
+        '''
+        with self.__wake:
+            while True:
+                if self.__deadline is None:
+                    if self.__closing:
+                        return
+                    self.__wake.wait()
+                    continue
+                delay = self.__deadline - time.monotonic()
+                if delay > 0 and not self.__urgent and not self.__closing:
+                    self.__wake.wait(delay)
+                    continue
+                if not self.__ready():
+                    self.__wake.wait()
+                    continue
+                self.__deadline = None
+                self.__urgent = False
+                try:
+                    self.__write()
+                except Exception as error:
+                    self.__error = error
+                self.__wake.notify_all()
@@ -1,7 +1,8 @@
 #!/usr/bin/python3
 '''Defines the child class - Place.'''
 
-from models.base_model import BaseModel
+import models
+from models.base_model import BaseModel, ListAttribute
 
 
 class Place(BaseModel):
@@ -18,7 +19,12 @@ class Place(BaseModel):
         price_by_night (int) - How much the place costs per night.
         latitude (float) - The latitude of the place.
         longitude (float) - The longitude of the place.
-        amenity_ids (list) - A list of the Amenity ids.
+        amenity_ids (list) - A list of the Amenity ids, empty by
+            default (see ListAttribute). Assign a new list to change it,
+            so that storage sees the change.
+        reviews (list) - The Review instances of the place (read-only).
+        amenities (list) - The Amenity instances of amenity_ids
+            (read-only).
     '''
 
     city_id = ''
@@ -31,4 +37,20 @@ class Place(BaseModel):
     price_by_night = 0
     latitude = 0.0
     longitude = 0.0
-    amenity_ids = []
+    amenity_ids = ListAttribute()
+
+    @property
+    def reviews(self):
+        '''list: The Review instances whose place_id is the place's id.'''
+        return list(models.storage.related('Review', 'place_id',
+                                           self.id).values())
+
+    @property
+    def amenities(self):
+        '''list: The Amenity instances whose ids are in amenity_ids.'''
+        amenities = []
+        for amenity_id in models.storage.list_of(self, 'amenity_ids'):
+            amenity = models.storage.get('Amenity', amenity_id)
+            if amenity is not None:
+                amenities.append(amenity)
+        return amenities
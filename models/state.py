@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 '''Defines child class - State.'''
+import models
 from models.base_model import BaseModel
 
 
@@ -8,6 +9,13 @@ class State(BaseModel):
 
     Attributes:
         name (str): The name of the state.
+        cities (list): The City instances of the state (read-only).
     '''
 
     name = ''
+
+    @property
+    def cities(self):
+        '''list: The City instances whose state_id is the state's id.'''
+        return list(models.storage.related('City', 'state_id',
+                                           self.id).values())
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 '''This defines a class User'''
+import models
 from models.base_model import BaseModel
 
 
@@ -11,9 +12,23 @@ class User(BaseModel):
         password (str) - The User's password.
         first_name (str) - The User's first name.
         last_name (str) - The User's last name.
+        places (list) - The Place instances the User owns (read-only).
+        reviews (list) - The Review instances the User wrote (read-only).
     '''
 
     email = ''
     password = ''
     first_name = ''
     last_name = ''
+
+    @property
+    def places(self):
+        '''list: The Place instances whose user_id is the user's id.'''
+        return list(models.storage.related('Place', 'user_id',
+                                           self.id).values())
+
+    @property
+    def reviews(self):
+        '''list: The Review instances whose user_id is the user's id.'''
+        return list(models.storage.related('Review', 'user_id',
+                                           self.id).values())
@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+'''Defines the unittests for console.py.'''
+
+import io
+import os
+import ast
+import tempfile
+import unittest
+import models
+from unittest import mock
+from console import HBNBCommand
+from models.state import State
+from models.place import Place
+from models.engine.file_storage import FileStorage
+
+
+def run(line):
+    '''Return what the console prints for the command line.'''
+    with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+        HBNBCommand().onecmd(line)
+    return out.getvalue()
+
+
+def listed(objects):
+    '''Return what the console prints for a list of objects.'''
+    return str([str(obj) for obj in objects]) + '\n'
+
+
+def printed(output):
+    '''Return the set of objects a console listing shows.'''
+    return set(ast.literal_eval(output))
+
+
+class ConsoleTestCase(unittest.TestCase):
+    '''Runs each test on an empty storage saved in a temporary file.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+
+    def tearDown(self):
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+
+class TestHBNBCommand_search(ConsoleTestCase):
+    '''Unittests for the search command.'''
+
+    def setUp(self):
+        super().setUp()
+        self.places = []
+        for price, guests in ((250, 1), (100, 4), (50, 2), (200, 2),
+                              (150, 6)):
+            place = Place()
+            place.price_by_night = price
+            place.max_guest = guests
+            self.places.append(place)
+        models.storage.save()
+        self.by_price = sorted(self.places,
+                               key=lambda place: place.price_by_night)
+
+    def test_range(self):
+        '''Test that the places in range are listed by increasing value.'''
+        self.assertEqual(run('search Place price_by_night=100..200'),
+                         listed(self.by_price[1:4]))
+
+    def test_open_ended(self):
+        '''Test ranges missing a bound, and single values.'''
+        self.assertEqual(run('search Place price_by_night=150..'),
+                         listed(self.by_price[2:]))
+        self.assertEqual(run('search Place price_by_night=..100'),
+                         listed(self.by_price[:2]))
+        self.assertEqual(run('search Place price_by_night=200'),
+                         listed([self.by_price[3]]))
+        self.assertEqual(run('search Place price_by_night=1000..'),
+                         '[]\n')
+
+    def test_several_ranges(self):
+        '''Test that every range must match.'''
+        self.assertEqual(
+                run('search Place price_by_night=..200 max_guest=2..4'),
+                listed(self.by_price[:2] + [self.by_price[3]]))
+
+    def test_invalid(self):
+        '''Test the messages of missing or invalid arguments.'''
+        self.assertEqual(run('search'), '** class name missing **\n')
+        self.assertEqual(run('search MyModel price_by_night=1'),
+                         '** class doesn\'t exist **\n')
+        self.assertEqual(run('search Place'), '** range missing **\n')
+        for arg in ('price_by_night', 'price_by_night=',
+                    'price_by_night=abc', 'price_by_night=1..x',
+                    '2x=1..2', '=1..2'):
+            self.assertEqual(run('search Place ' + arg),
+                             '** invalid range: {} **\n'.format(arg))
+
+    def test_dot_notation(self):
+        '''Test the <class_name>.search(...) form.'''
+        self.assertEqual(run('Place.search(price_by_night=100..200)'),
+                         listed(self.by_price[1:4]))
+        self.assertEqual(
+                run('Place.search(price_by_night=..200, max_guest=2..4)'),
+                listed(self.by_price[:2] + [self.by_price[3]]))
+        self.assertEqual(run('Place.search()'), '** range missing **\n')
+
+
+class TestHBNBCommand_location(ConsoleTestCase):
+    '''Unittests for the nearby and bbox commands.'''
+
+    def setUp(self):
+        super().setUp()
+        self.places = {}
+        for name, latitude, longitude in (
+                ('Lagos', 6.52, 3.38), ('Ibadan', 7.38, 3.94),
+                ('Abuja', 9.07, 7.40), ('Suva', -18.14, 178.44),
+                ('Apia', -13.83, -171.76)):
+            place = Place()
+            place.name = name
+            place.latitude = latitude
+            place.longitude = longitude
+            self.places[name] = place
+        models.storage.save()
+
+    def named(self, *names):
+        '''Return the places called names.'''
+        return [self.places[name] for name in names]
+
+    def test_nearby(self):
+        '''Test that the places within the distance are listed, nearest
+        first.'''
+        self.assertEqual(run('nearby 6.5 3.4 200'),
+                         listed(self.named('Lagos', 'Ibadan')))
+        self.assertEqual(run('nearby 9 7.4 1000'),
+                         listed(self.named('Abuja', 'Ibadan', 'Lagos')))
+        self.assertEqual(run('nearby 0 0 100'), '[]\n')
+
+    def test_nearby_antimeridian(self):
+        '''Test a circle crossing the antimeridian.'''
+        self.assertEqual(run('nearby -16 -179 1000'),
+                         listed(self.named('Suva', 'Apia')))
+
+    def test_nearby_invalid(self):
+        '''Test the messages of missing or invalid arguments.'''
+        self.assertEqual(run('nearby'), '** latitude missing **\n')
+        self.assertEqual(run('nearby 6.5'), '** longitude missing **\n')
+        self.assertEqual(run('nearby 6.5 3.4'), '** km missing **\n')
+        self.assertEqual(run('nearby north 3.4 10'),
+                         '** invalid latitude: north **\n')
+        self.assertEqual(run('nearby 6.5 3.4 far'),
+                         '** invalid km: far **\n')
+
+    def test_bbox(self):
+        '''Test that the places in the box are listed.'''
+        self.assertEqual(printed(run('bbox 6 3 8 4')),
+                         set(map(str, self.named('Lagos', 'Ibadan'))))
+        self.assertEqual(printed(run('bbox 6 3 10 8')),
+                         set(map(str, self.named('Lagos', 'Ibadan',
+                                                 'Abuja'))))
+        self.assertEqual(run('bbox 10 3 20 8'), '[]\n')
+
+    def test_bbox_antimeridian(self):
+        '''Test that a box whose west is greater than its east crosses the
+        antimeridian.'''
+        self.assertEqual(printed(run('bbox -20 170 -10 -170')),
+                         set(map(str, self.named('Suva', 'Apia'))))
+        self.assertEqual(run('bbox -20 -170 -10 170'), '[]\n')
+
+    def test_bbox_invalid(self):
+        '''Test the messages of missing or invalid arguments.'''
+        self.assertEqual(run('bbox'), '** south missing **\n')
+        self.assertEqual(run('bbox 6 3'), '** north missing **\n')
+        self.assertEqual(run('bbox 6 3 8'), '** east missing **\n')
+        self.assertEqual(run('bbox 6 west 8 4'),
+                         '** invalid west: west **\n')
+
+
+class TestHBNBCommand_containing(ConsoleTestCase):
+    '''Unittests for the containing command.'''
+
+    def setUp(self):
+        super().setUp()
+        self.places = []
+        for amenity_ids in (['wifi', 'pool'], ['wifi'], ['pool', 'gym'],
+                            ['gym', 'wifi', 'pool'], []):
+            place = Place()
+            place.amenity_ids = amenity_ids
+            self.places.append(place)
+        models.storage.save()
+
+    def test_containing(self):
+        '''Test that the places holding every value are listed.'''
+        self.assertEqual(printed(run('containing Place amenity_ids wifi')),
+                         set(map(str, self.places[0:2] + [self.places[3]])))
+        self.assertEqual(
+                printed(run('containing Place amenity_ids wifi pool')),
+                {str(self.places[0]), str(self.places[3])})
+        self.assertEqual(run('containing Place amenity_ids sauna'), '[]\n')
+
+    def test_dot_notation(self):
+        '''Test the <class_name>.containing(...) form.'''
+        self.assertEqual(
+                printed(run('Place.containing(amenity_ids, "pool", "gym")')),
+                {str(self.places[2]), str(self.places[3])})
+
+    def test_invalid(self):
+        '''Test the messages of missing or invalid arguments.'''
+        self.assertEqual(run('containing'), '** class name missing **\n')
+        self.assertEqual(run('containing MyModel amenity_ids wifi'),
+                         '** class doesn\'t exist **\n')
+        self.assertEqual(run('containing Place'),
+                         '** attribute name missing **\n')
+        self.assertEqual(run('Place.containing()'),
+                         '** attribute name missing **\n')
+
+
+class TestHBNBCommand_update(ConsoleTestCase):
+    '''Unittests for the update command.'''
+
+    def setUp(self):
+        super().setUp()
+        self.place = Place()
+        self.place.save()
+
+    def update(self, attribute, value):
+        '''Update an attribute of the place, returning the output.'''
+        return run('update Place {} {} {}'.format(self.place.id, attribute,
+                                                  value))
+
+    def test_numbers_stay_numeric(self):
+        '''Test that int and float attributes are stored as numbers.'''
+        self.assertEqual(self.update('price_by_night', '"120"'), '')
+        self.assertEqual(self.update('latitude', '"6.5"'), '')
+        self.assertEqual(self.update('name', '"120"'), '')
+        self.assertEqual(self.place.price_by_night, 120)
+        self.assertIs(type(self.place.price_by_night), int)
+        self.assertEqual(self.place.latitude, 6.5)
+        self.assertIs(type(self.place.latitude), float)
+        self.assertEqual(self.place.name, '120')
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+        saved = models.storage.get(Place, self.place.id)
+        self.assertEqual(saved.price_by_night, 120)
+        self.assertEqual(saved.latitude, 6.5)
+
+    def test_numbers_are_searched_as_numbers(self):
+        '''Test that updated numbers are compared as numbers, not text.'''
+        other = Place()
+        other.price_by_night = 10
+        other.save()
+        self.update('price_by_night', '9')
+        self.assertEqual(run('search Place price_by_night=5..50'),
+                         listed([self.place, other]))
+
+    def test_not_a_number(self):
+        '''Test that a value that is not a number is refused.'''
+        self.assertEqual(self.update('number_rooms', 'many'),
+                         '** number_rooms must be int **\n')
+        self.assertEqual(self.update('longitude', 'east'),
+                         '** longitude must be float **\n')
+        self.assertEqual(self.place.number_rooms, 0)
+        self.assertNotIn('longitude', self.place.to_dict())
+
+    def test_list(self):
+        '''Test that a list attribute takes a JSON list or comma-separated
+        values, and is found by containing.'''
+        self.assertEqual(self.update('amenity_ids', '["wifi","pool"]'), '')
+        self.assertEqual(self.place.amenity_ids, ['wifi', 'pool'])
+        self.assertEqual(self.update('amenity_ids', 'gym,,wifi'), '')
+        self.assertEqual(self.place.amenity_ids, ['gym', 'wifi'])
+        self.assertEqual(self.update('amenity_ids', '"gym"'), '')
+        self.assertEqual(self.place.amenity_ids, ['gym'])
+        self.assertEqual(run('containing Place amenity_ids gym'),
+                         listed([self.place]))
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+        self.assertEqual(
+                models.storage.get(Place, self.place.id).amenity_ids,
+                ['gym'])
+
+    def test_not_a_list(self):
+        '''Test that a JSON value that is not a list is refused.'''
+        self.update('amenity_ids', 'wifi')
+        for value in ('["wifi"', '[1,]'):
+            self.assertEqual(self.update('amenity_ids', value),
+                             '** amenity_ids must be list **\n')
+        self.assertEqual(self.place.amenity_ids, ['wifi'])
+
+    def test_read_only(self):
+        '''Test that a property computed from other objects is refused.'''
+        self.assertEqual(self.update('reviews', '[]'),
+                         '** attribute can\'t be set **\n')
+        self.assertEqual(self.update('amenities', 'x'),
+                         '** attribute can\'t be set **\n')
+        self.assertNotIn('reviews', self.place.to_dict())
+        state = State()
+        state.save()
+        self.assertEqual(run('update State {} cities x'.format(state.id)),
+                         '** attribute can\'t be set **\n')
+        self.assertNotIn('cities', state.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
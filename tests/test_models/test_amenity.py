@@ -7,6 +7,7 @@ import unittest
 from time import sleep
 from datetime import datetime
 from models.amenity import Amenity
+from models.place import Place
 from models.base_model import BaseModel
 
 
@@ -275,5 +276,26 @@ class TestAmenity_to_dict(unittest.TestCase):
             a.to_dict(None)
 
 
+class TestAmenity_places(unittest.TestCase):
+    '''Unittests for the places property of the Amenity class.'''
+
+    def test_places(self):
+        '''Test that places lists the places having the amenity.'''
+        wifi = Amenity()
+        place = Place()
+        Place().amenity_ids = [Amenity().id]
+        self.assertEqual(wifi.places, [])
+        place.amenity_ids = [wifi.id]
+        self.assertEqual(wifi.places, [place])
+        place.amenity_ids = []
+        self.assertEqual(wifi.places, [])
+
+    def test_places_leaves_places_unchanged(self):
+        '''Test that looking places up does not set their amenity_ids.'''
+        place = Place()
+        self.assertEqual(Amenity().places, [])
+        self.assertNotIn('amenity_ids', place.to_dict())
+
+
 if __name__ == "__main__":
     unittest.main()
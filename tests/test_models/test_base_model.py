@@ -2,10 +2,13 @@
 ''' Defines unittests for models/base_model.py. '''
 
 import os
+import models
 import unittest
 from time import sleep
 from datetime import datetime
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact_class
+from models.place import Place
+from models.engine.file_storage import FileStorage
 
 
 class TestBaseModel_init(unittest.TestCase):
@@ -85,6 +88,15 @@ class TestBaseModel_init(unittest.TestCase):
                        updated_at=dt_isoformat, __class__='BaseModel')
         self.assertNotEqual(bm.__class__, 'BaseModel')
 
+    def test_init_without_microseconds(self):
+        '''Test kwargs timestamps that isoformat() wrote without microseconds.
+        '''
+        dt = datetime(2024, 1, 2, 3, 4, 5)
+        bm = BaseModel(id='123', created_at=dt.isoformat(),
+                       updated_at=dt.isoformat())
+        self.assertEqual(bm.created_at, dt)
+        self.assertEqual(bm.updated_at, dt)
+
     def test_init_with_None_kwargs(self):
         '''Test __init__ methods with kwargs whose values are None.'''
         with self.assertRaises(TypeError):
@@ -269,5 +281,112 @@ class TestBaseModel_to_dict(unittest.TestCase):
             bm.to_dict(None)
 
 
+class TestBaseModel_compact(unittest.TestCase):
+    '''Unittests for the compact layout of model instances.'''
+
+    def setUp(self):
+        BaseModel.compact = True
+
+    def tearDown(self):
+        BaseModel.compact = False
+
+    def test_instance_uses_slots(self):
+        '''Test that declared attributes are stored in slots.'''
+        place = Place()
+        place.city_id = '42'
+        place.max_guest = 3
+        self.assertIs(type(place), compact_class(Place))
+        self.assertIsInstance(place, Place)
+        self.assertIsInstance(place, BaseModel)
+        self.assertEqual(type(place).__name__, 'Place')
+        self.assertFalse(hasattr(place, '__dict__'))
+        self.assertEqual(place.city_id, '42')
+        self.assertEqual(place.max_guest, 3)
+
+    def test_unset_attribute_has_class_default(self):
+        '''Test that an unset declared attribute reads the class default.'''
+        place = Place()
+        self.assertEqual(place.name, '')
+        self.assertEqual(place.latitude, 0.0)
+        with self.assertRaises(AttributeError):
+            place.not_an_attribute
+
+    def test_list_attribute(self):
+        '''Test that each instance gets its own default list.'''
+        first = Place()
+        second = Place()
+        first.amenity_ids.append('a')
+        self.assertEqual(first.amenity_ids, ['a'])
+        self.assertEqual(second.amenity_ids, [])
+        self.assertEqual(first.to_dict()['amenity_ids'], ['a'])
+        first.amenity_ids = ['b']
+        self.assertEqual(first.amenity_ids, ['b'])
+
+    def test_overflow_attribute(self):
+        '''Test that ad-hoc attributes go to the overflow dict.'''
+        place = Place()
+        place.nickname = 'home'
+        self.assertEqual(place.nickname, 'home')
+        self.assertEqual(place._extra, {'nickname': 'home'})
+        self.assertEqual(place.to_dict()['nickname'], 'home')
+
+    def test_from_attributes(self):
+        '''Test that _from_attributes() rebuilds an instance without
+        telling storage.'''
+        place = Place()
+        place.name = 'Loft'
+        place.nickname = 'home'
+        dirty = FileStorage._FileStorage__dirty
+        copy = Place._from_attributes(place._attributes())
+        self.assertNotIn(id(copy), dirty)
+        self.assertIs(type(copy), compact_class(Place))
+        self.assertDictEqual(copy.to_dict(), place.to_dict())
+        BaseModel.compact = False
+        copy = Place._from_attributes(copy._attributes())
+        self.assertIs(type(copy), Place)
+        self.assertDictEqual(copy.to_dict(), place.to_dict())
+
+    def test_save_and_reload(self):
+        '''Test that compact instances round-trip through FileStorage.'''
+        try:
+            os.rename('file.json', 'tmp')
+        except IOError:
+            pass
+        place = Place()
+        place.name = 'Loft'
+        place.nickname = 'home'
+        place.save()
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        loaded = models.storage.all()['Place.' + place.id]
+        self.assertIsNot(loaded, place)
+        self.assertIs(type(loaded), compact_class(Place))
+        self.assertDictEqual(loaded.to_dict(), place.to_dict())
+        os.remove('file.json')
+        try:
+            os.rename('tmp', 'file.json')
+        except IOError:
+            pass
+
+    def test_to_dict_and_str(self):
+        '''Test that to_dict and __str__ match the regular layout.'''
+        dt = datetime.now()
+        kwargs = {'id': '123', 'created_at': dt.isoformat(),
+                  'updated_at': dt.isoformat(), 'name': 'Loft',
+                  'price_by_night': 80, 'extra': [1, 2]}
+        place = Place(**dict(kwargs))
+        BaseModel.compact = False
+        regular = Place(**dict(kwargs))
+        self.assertDictEqual(place.to_dict(), regular.to_dict())
+        self.assertEqual(str(place), str(regular))
+
+    def test_compact_class_is_cached(self):
+        '''Test that each class has a single compact variant.'''
+        self.assertIs(compact_class(Place), compact_class(Place))
+        self.assertIs(compact_class(compact_class(Place)),
+                      compact_class(Place))
+        self.assertIsNot(compact_class(BaseModel), compact_class(Place))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,6 +7,7 @@ import unittest
 from time import sleep
 from datetime import datetime
 from models.city import City
+from models.place import Place
 from models.base_model import BaseModel
 
 
@@ -279,5 +280,19 @@ class TestCity_to_dict(unittest.TestCase):
             city.to_dict(None)
 
 
+class TestCity_places(unittest.TestCase):
+    '''Unittests for the places property of the City class.'''
+
+    def test_places(self):
+        '''Test that places lists the places of the city only.'''
+        city = City()
+        place = Place()
+        place.city_id = city.id
+        Place().city_id = City().id
+        self.assertEqual(city.places, [place])
+        models.storage.delete(place)
+        self.assertEqual(city.places, [])
+
+
 if __name__ == "__main__":
     unittest.main()
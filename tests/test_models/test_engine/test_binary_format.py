@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/binary_format.py.'''
+
+import io
+import os
+import json
+import tempfile
+import unittest
+from models.place import Place
+from models.state import State
+from models.engine import binary_format
+
+
+def roundtrip(records):
+    '''Return the records read back from their binary form.'''
+    f = io.BytesIO()
+    binary_format.dump(records, f)
+    return list(binary_format.iter_records(f.getvalue()))
+
+
+class TestBinaryFormat(unittest.TestCase):
+    '''Unittests for dump(), iter_records() and iter_file().'''
+
+    def test_model_records(self):
+        '''Test that to_dict() records are read back equal, in order.'''
+        place = Place()
+        place.name = 'Loft'
+        place.amenity_ids = ['a', 'b']
+        state = State()
+        records = [place.to_dict(), state.to_dict(), Place().to_dict()]
+        read = roundtrip(records)
+        self.assertEqual(read, records)
+        for record, original in zip(read, records):
+            self.assertEqual(list(record), list(original))
+
+    def test_datetimes(self):
+        '''Test that the timestamps of the named fields can be read as
+        datetimes.'''
+        place = Place()
+        place.checkin = place.created_at.isoformat()
+        f = io.BytesIO()
+        binary_format.dump([place.to_dict()], f)
+        record, = binary_format.iter_records(f.getvalue(),
+                                             ('created_at', 'updated_at'))
+        self.assertEqual(record['created_at'], place.created_at)
+        self.assertEqual(record['updated_at'], place.updated_at)
+        self.assertEqual(record['checkin'], place.checkin)
+
+    def test_order(self):
+        '''Test that interleaved classes and key sets keep their order.'''
+        records = []
+        for i in range(20):
+            record = {'__class__': ('Place', 'State', 'City')[i % 3],
+                      'id': str(i)}
+            if i % 4 == 0:
+                record['name'] = 'n' + str(i)
+            records.append(record)
+        self.assertEqual(roundtrip(records), records)
+        grouped = sorted(records, key=lambda r: r['__class__'])
+        self.assertEqual(roundtrip(grouped), grouped)
+
+    def test_values(self):
+        '''Test that every JSON value, and look-alikes of the packed ones,
+        are read back unchanged.'''
+        record = {
+            '__class__': 'Place', 'id': 'not-a-uuid',
+            'created_at': '2017-09-28T21:03:54.052298',
+            'updated_at': '2017-09-28T21:03:54',
+            'upper': 'D5A2C3B0-0000-4000-8000-000000000000',
+            'uuid': 'd5a2c3b0-0000-4000-8000-000000000000',
+            'date': '2017-09-28', 'aware': '2017-09-28T21:03:54+00:00',
+            'old': '1900-01-01T00:00:00.000001',
+            'ints': [0, 1, -1, 127, 128, -129, 2 ** 70, -2 ** 70],
+            'floats': [0.0, -1.5, 1e300], 'flags': [True, False, None],
+            'nested': {'Place': 'Place', 'list': [], 'dict': {}},
+            'text': 'Aiïsha "quoted" \U0001f600', 'empty': '',
+            'lone': '\ud83d', 'pair': ['\ud83d', '\ude00'],
+        }
+        [read] = roundtrip([record])
+        self.assertEqual(json.dumps(read), json.dumps(record))
+
+    def test_lone_surrogates(self):
+        '''Test that strings JSON allows but UTF-8 does not, such as lone
+        surrogates, are read back unchanged, packed column or not.'''
+        records = [{'__class__': 'Place', 'id': str(i),
+                    'name': ('\udc80', '\ud83d')[i % 2]} for i in range(3)]
+        records.append({'__class__': 'Place', 'id': '3', 'name': 1,
+                        'other': {'\udfff': ['\ud800']}})
+        self.assertEqual(roundtrip(records), records)
+
+    def test_first_version(self):
+        '''Test that files written without the order are still read.'''
+        records = [Place().to_dict(), Place().to_dict(), State().to_dict()]
+        f = io.BytesIO()
+        binary_format.dump(records, f)
+        data = f.getvalue()
+        # In the order of the groups, the order is a single 0 byte.
+        self.assertEqual(data[:len(binary_format.MAGIC) + 1],
+                         binary_format.MAGIC + b'\x00')
+        old = b'HBNB\x01' + data[len(binary_format.MAGIC) + 1:]
+        self.assertEqual(list(binary_format.iter_records(old)), records)
+
+    def test_mixed_columns(self):
+        '''Test records whose values for a key differ in kind.'''
+        records = [
+            {'__class__': 'Place', 'id': '1', 'x': 1, 'y': 'Place'},
+            {'__class__': 'Place', 'id': '2', 'x': 'one', 'y': 2 ** 64},
+            {'__class__': 'Place', 'id': '3', 'x': 1.5, 'y': -2 ** 64},
+            {'id': '4', '__class__': 'Place'},
+        ]
+        self.assertEqual(roundtrip(records), records)
+        self.assertEqual(list(roundtrip(records)[3]), ['id', '__class__'])
+
+    def test_smaller_than_json(self):
+        '''Test that model records take less room than their JSON.'''
+        records = [Place().to_dict() for i in range(100)]
+        f = io.BytesIO()
+        binary_format.dump(records, f)
+        self.assertLess(len(f.getvalue()) * 2, len(json.dumps(records)))
+
+    def test_empty(self):
+        '''Test that a file with no records reads back empty.'''
+        self.assertEqual(roundtrip([]), [])
+
+    def test_not_binary(self):
+        '''Test that data without the header raises ValueError.'''
+        with self.assertRaises(ValueError):
+            list(binary_format.iter_records(b'{}'))
+
+    def test_truncated(self):
+        '''Test that truncated data raises ValueError.'''
+        f = io.BytesIO()
+        binary_format.dump([Place().to_dict()], f)
+        with self.assertRaises(ValueError):
+            list(binary_format.iter_records(f.getvalue()[:-3]))
+
+    def test_iter_file(self):
+        '''Test that a file is read as it is parsed, one group at a time,
+        even when a group is longer than what is read at once.'''
+        records = [{'__class__': 'State', 'id': str(i)} for i in range(3)]
+        records += [{'__class__': 'Place', 'id': str(i),
+                     'text': 'é' * 2000, 'any': [i]} for i in range(100)]
+        f = io.BytesIO()
+        binary_format.dump(records, f)
+        size = len(f.getvalue())
+        f.seek(0)
+        read = binary_format.iter_file(f)
+        self.assertEqual(next(read), records[0])
+        self.assertLess(f.tell(), size)
+        self.assertEqual([records[0]] + list(read), records)
+        for data in (b'{}', f.getvalue()[:-3]):
+            with self.assertRaises(ValueError):
+                list(binary_format.iter_file(io.BytesIO(data)))
+
+    def test_unsupported_value(self):
+        '''Test that a value JSON cannot hold raises TypeError.'''
+        with self.assertRaises(TypeError):
+            binary_format.dump([{'__class__': 'Place', 'x': {1, 2}}],
+                               io.BytesIO())
+
+
+class TestBinaryFormat_convert(unittest.TestCase):
+    '''Unittests for the JSON <-> binary conversion tools.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        '''Return the path of name in the temporary directory.'''
+        return os.path.join(self.tmp.name, name)
+
+    def test_lossless(self):
+        '''Test that JSON -> binary -> JSON gives back the same file.'''
+        objects = [Place(), State(), Place()]
+        objects[0].name = 'Loft'
+        text = json.dumps({type(o).__name__ + '.' + o.id: o.to_dict()
+                           for o in objects})
+        with open(self.path('file.json'), 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.assertEqual(binary_format.main(
+                ['', 'to-binary', self.path('file.json'),
+                 self.path('file.bin')]), 0)
+        self.assertTrue(binary_format.is_binary(self.path('file.bin')))
+        binary_format.main(['', 'to-json', self.path('file.bin'),
+                            self.path('back.json')])
+        with open(self.path('back.json'), 'r', encoding='utf-8') as f:
+            back = f.read()
+        self.assertEqual(back, text)
+
+    def test_bad_key(self):
+        '''Test that a key the record does not match is refused.'''
+        with open(self.path('file.json'), 'w', encoding='utf-8') as f:
+            json.dump({'Place.1': {'__class__': 'Place', 'id': '2'}}, f)
+        with self.assertRaises(ValueError):
+            binary_format.json_to_binary(self.path('file.json'),
+                                         self.path('file.bin'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/file_state.py.'''
+
+import os
+import tempfile
+import unittest
+from models.engine import file_state
+
+
+class TestFileState(unittest.TestCase):
+    '''Unittests for telling whether files changed.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"a": 1}')
+        self.missing = os.path.join(self.tmp.name, 'missing.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rewrite(self, text):
+        '''Rewrite the file keeping its size and mtime.'''
+        stat = os.stat(self.path)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    def test_scan(self):
+        '''Test that only the files that exist are listed.'''
+        files = file_state.scan([self.path, self.missing])
+        self.assertEqual(list(files), [self.path])
+        self.assertEqual(files[self.path][1], 8)
+        self.assertIsNone(file_state.signature(self.missing))
+        self.assertIsNone(file_state.checksum(self.missing))
+
+    def test_recent_checksums(self):
+        '''Test that only the recently modified files are checksummed.'''
+        files = file_state.scan([self.path])
+        checksums = file_state.recent_checksums(files, files)
+        self.assertEqual(checksums,
+                         {self.path: file_state.checksum(self.path)})
+        os.utime(self.path, (0, 0))
+        files = file_state.scan([self.path])
+        self.assertEqual(file_state.recent_checksums(files, files), {})
+
+    def test_verify(self):
+        '''Test that a rewrite keeping the size and mtime is seen.'''
+        files = file_state.scan([self.path])
+        checksums = file_state.recent_checksums(files, files)
+        self.assertEqual(file_state.verify(files, checksums), checksums)
+        self.rewrite('{"a": 2}')
+        self.assertEqual(file_state.scan([self.path]), files)
+        self.assertIsNone(file_state.verify(files, checksums))
+        self.assertIsNone(file_state.verify({}, checksums))
+
+    def test_verify_old_files(self):
+        '''Test that the checksums of files no longer recent are checked
+        one last time, and no longer needed.'''
+        files = file_state.scan([self.path])
+        checksums = file_state.recent_checksums(files, files)
+        os.utime(self.path, (0, 0))
+        files = file_state.scan([self.path])
+        self.assertEqual(file_state.verify(files, checksums), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,18 @@
 #!/usr/bin/python3
 '''Defines the unittests for models/engine/file_storage.py.'''
 
+import gc
 import os
+import sys
 import json
+import time
+import tempfile
+import weakref
+import subprocess
 import unittest
+import multiprocessing
 import models
+from unittest import mock
 from datetime import datetime
 from models.base_model import BaseModel
 from models.state import State
@@ -12,7 +20,10 @@ from models.city import City
 from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
+from models.engine.base_storage import BaseStorage
 from models.engine.file_storage import FileStorage
+from models.engine import file_storage
+from models.engine import binary_format
 
 
 class TestFileStorage_init(unittest.TestCase):
@@ -76,15 +87,29 @@ class TestFileStorage_all(unittest.TestCase):
         '''Test that all method returns a dictionary.'''
         self.assertEqual(type(FileStorage().all()), dict)
 
-    def test_all_with_arg(self):
-        '''Test the all method with an argument.'''
-        with self.assertRaises(TypeError):
-            FileStorage().all('an_argument')
+    def test_all_with_unknown_class(self):
+        '''Test the all method with a class name that has no objects.'''
+        self.assertEqual(FileStorage().all('an_argument'), {})
 
     def test_all_with_None_arg(self):
-        '''Test the all method with None argument.'''
+        '''Test the all method with None argument returns every object.'''
+        self.assertIs(FileStorage().all(None), FileStorage().all())
+
+    def test_all_with_two_args(self):
+        '''Test the all method with two arguments.'''
         with self.assertRaises(TypeError):
-            FileStorage().all(None)
+            FileStorage().all(State, 'an_argument')
+
+    def test_all_by_class(self):
+        '''Test that all(cls) returns only the objects of that class.'''
+        state = State()
+        city = City()
+        states = models.storage.all(State)
+        self.assertIn('State.' + state.id, states)
+        self.assertNotIn('City.' + city.id, states)
+        self.assertEqual(models.storage.all('State'), states)
+        for obj in states.values():
+            self.assertIsInstance(obj, State)
 
     def test_correct_output(self):
         '''Test that the all method returns the correct dictionary.'''
@@ -290,5 +315,1561 @@ class TestFileStorage_reload(unittest.TestCase):
         self.assertIsNone(models.storage.reload())
 
 
+class TestFileStorage_path(unittest.TestCase):
+    '''Unittests for the path argument of FileStorage.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+
+    def tearDown(self):
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def test_path(self):
+        '''Test that the objects are saved to and reloaded from the path.'''
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(models.storage.path, self.path)
+        self.assertEqual(models.storage.all(), {})
+        place = Place()
+        place.save()
+        self.assertTrue(os.path.isfile(self.path))
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(models.storage.all(), {})
+        models.storage.reload()
+        self.assertEqual(list(models.storage.all()), ['Place.' + place.id])
+
+    def test_default_keeps_path(self):
+        '''Test that without a path the current file and objects are kept.'''
+        models.storage = FileStorage(path=self.path)
+        place = Place()
+        storage = FileStorage()
+        self.assertEqual(storage.path, self.path)
+        self.assertIs(storage.get(Place, place.id), place)
+
+    def test_writes_pending_saves(self):
+        '''Test that the saves left to the background writer are written
+        to the previous path before moving.'''
+        models.storage = FileStorage(path=self.path)
+        with mock.patch.object(FileStorage, 'write_behind', True), \
+                mock.patch.object(FileStorage, 'max_staleness', 60):
+            place = Place()
+            place.save()
+            models.storage = FileStorage(path=self.path + '.other')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertIn('Place.' + place.id, json.load(f))
+
+
+class TestFileStorage_journal(unittest.TestCase):
+    '''Unittests for the journal mode of save() and reload().'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage.journal = True
+
+    @classmethod
+    def tearDown(self):
+        FileStorage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def test_save_appends_to_journal(self):
+        '''Test that a save only appends the changed object.'''
+        bm = BaseModel()
+        models.storage.save()
+        with open('file.json.journal', 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('BaseModel.' + bm.id, lines[0])
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_update_and_delete_are_replayed(self):
+        '''Test that reload replays updates and deletes from the journal.'''
+        bm = BaseModel()
+        city = City()
+        models.storage.save()
+        bm.name = 'Aishah'
+        bm.save()
+        models.storage.delete(city)
+        models.storage.save()
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        objects = models.storage.all()
+        self.assertEqual(objects['BaseModel.' + bm.id].name, 'Aishah')
+        self.assertNotIn('City.' + city.id, objects)
+
+    def test_compaction_rewrites_snapshot(self):
+        '''Test that a long journal is folded back into the snapshot.'''
+        bm = BaseModel()
+        for i in range(len(models.storage.all()) + 2):
+            bm.save()
+        self.assertTrue(os.path.exists('file.json'))
+        with open('file.json', 'r', encoding='utf-8') as f:
+            self.assertIn('BaseModel.' + bm.id, f.read())
+
+    def test_torn_journal_line_is_ignored(self):
+        '''Test that a partially written last record does not break reload.'''
+        bm = BaseModel()
+        models.storage.save()
+        with open('file.json.journal', 'a', encoding='utf-8') as f:
+            f.write('{"key": "BaseModel.x", "val')
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        self.assertIn('BaseModel.' + bm.id, models.storage.all())
+
+    def test_saves_after_torn_journal_line(self):
+        '''Test that the saves after a torn record are replayed.'''
+        states = [State() for i in range(3)]
+        models.storage.save()
+        with open('file.json.journal', 'a', encoding='utf-8') as f:
+            f.write('{"key": "State.torn", "val')
+        # As a new process would, from the files.
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        state = State()
+        state.name = 'After'
+        models.storage.save()
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        objects = models.storage.all()
+        self.assertEqual(objects['State.' + state.id].name, 'After')
+        for other in states:
+            self.assertIn('State.' + other.id, objects)
+        self.assertNotIn('State.torn', objects)
+
+
+class TestFileStorage_dirty(unittest.TestCase):
+    '''Unittests for the re-serialization of changed objects only.'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    @classmethod
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def test_clean_object_is_not_reserialized(self):
+        '''Test that an object with no attribute set reuses its JSON.'''
+        bm = BaseModel()
+        models.storage.save()
+        bm.__dict__['name'] = 'not seen'
+        models.storage.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            self.assertNotIn('not seen', f.read())
+
+    def test_set_attribute_is_reserialized(self):
+        '''Test that setting an attribute marks the object dirty.'''
+        bm = BaseModel()
+        models.storage.save()
+        bm.name = 'Aishah'
+        models.storage.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            self.assertIn(json.dumps(bm.to_dict()), f.read())
+
+    def test_snapshot_is_valid_json(self):
+        '''Test that the assembled snapshot matches json.dump output.'''
+        bm = BaseModel()
+        city = City()
+        models.storage.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        self.assertEqual(content['BaseModel.' + bm.id], bm.to_dict())
+        self.assertEqual(content['City.' + city.id], city.to_dict())
+
+    def test_unstored_object_is_not_kept(self):
+        '''Test that an object never stored is not held until the next
+        save.'''
+        ref = weakref.ref(BaseModel(name='x'))
+        gc.collect()
+        self.assertIsNone(ref())
+        models.storage.save()
+
+
+class TestFileStorage_count(unittest.TestCase):
+    '''Unittests for the public instance method - count().'''
+
+    @classmethod
+    def tearDown(self):
+        models.storage = FileStorage(path='file.json')
+
+    def test_count_all(self):
+        '''Test that count() without a class counts every object.'''
+        BaseModel()
+        State()
+        self.assertEqual(models.storage.count(), len(models.storage.all()))
+
+    def test_count_by_class(self):
+        '''Test count(cls) with a class and with a class name.'''
+        models.storage = FileStorage(path='file.json')
+        State()
+        State()
+        City()
+        self.assertEqual(models.storage.count(State), 2)
+        self.assertEqual(models.storage.count('City'), 1)
+        self.assertEqual(models.storage.count(Review), 0)
+
+    def test_count_after_delete(self):
+        '''Test that delete() keeps the class index up to date.'''
+        models.storage = FileStorage(path='file.json')
+        state = State()
+        self.assertEqual(models.storage.count(State), 1)
+        models.storage.delete(state)
+        self.assertEqual(models.storage.count(State), 0)
+        self.assertEqual(models.storage.all(State), {})
+
+    def test_changes_through_all(self):
+        '''Test that objects added or removed through the dictionary
+        all() returns are counted and found.'''
+        models.storage = FileStorage(path='file.json')
+        states = [State() for i in range(3)]
+        city = City()
+        city.state_id = states[2].id
+        keys = ['State.' + state.id for state in states]
+        self.assertEqual(models.storage.count(State), 3)
+        self.assertEqual(len(models.storage.related(City, 'state_id',
+                                                    states[2].id)), 1)
+        objects = models.storage.all()
+        del objects[keys[0]]
+        self.assertEqual(models.storage.count(State), 2)
+        self.assertEqual(set(models.storage.all(State)), set(keys[1:]))
+        # As many added as removed.
+        del objects[keys[1]]
+        objects[keys[0]] = states[0]
+        self.assertEqual(set(models.storage.all(State)),
+                         {keys[0], keys[2]})
+        self.assertEqual(models.storage.count(State), 2)
+        del objects['City.' + city.id]
+        self.assertEqual(models.storage.related(City, 'state_id',
+                                                states[2].id), {})
+        objects.clear()
+        self.assertEqual(models.storage.count(State), 0)
+        self.assertEqual(models.storage.all(State), {})
+
+    def test_count_after_swap_through_all(self):
+        '''Test that count(cls) notices objects replaced through the
+        dictionary all() returns by as many of another class.'''
+        models.storage = FileStorage(path='file.json')
+        states = [State() for i in range(2)]
+        self.assertEqual(models.storage.count(State), 2)
+        objects = models.storage.all()
+        del objects['State.' + states[0].id]
+        # Built from a record, so new() is not called.
+        city = City(id='c')
+        objects['City.c'] = city
+        self.assertEqual(models.storage.count(State), 1)
+        self.assertEqual(models.storage.count(City), 1)
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    '''Unittests for the lazy mode of reload().'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+        FileStorage.lazy = True
+
+    @classmethod
+    def tearDown(self):
+        FileStorage.lazy = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def reload_saved(self, *objs):
+        '''Save objs, clear storage and reload it lazily.'''
+        models.storage.save()
+        models.storage = FileStorage(path='file.json')
+        models.storage.reload()
+        return dict(dict.items(models.storage.all()))
+
+    def test_records_are_not_built(self):
+        '''Test that reload keeps raw records until they are needed.'''
+        state = State()
+        raw = self.reload_saved(state)
+        self.assertEqual(type(raw['State.' + state.id]), dict)
+        self.assertIn('State.' + state.id, models.storage.all())
+        self.assertEqual(models.storage.count(State), 1)
+
+    def test_lookup_builds_instance(self):
+        '''Test that looking up a key builds the instance once.'''
+        state = State()
+        state.name = 'Lagos'
+        self.reload_saved(state)
+        objects = models.storage.all()
+        loaded = objects['State.' + state.id]
+        self.assertIsInstance(loaded, State)
+        self.assertEqual(loaded.name, 'Lagos')
+        self.assertEqual(loaded.created_at, state.created_at)
+        self.assertIs(objects['State.' + state.id], loaded)
+
+    def test_copies_hold_instances(self):
+        '''Test that copies of the objects hold no raw record.'''
+        state = State()
+        city = City()
+        for copy in (lambda objects: dict(objects),
+                     lambda objects: objects.copy(),
+                     lambda objects: {**objects},
+                     lambda objects: objects | {}):
+            self.reload_saved(state, city)
+            for obj in copy(models.storage.all()).values():
+                self.assertIsInstance(obj, BaseModel)
+        self.reload_saved(state, city)
+        objects = models.storage.all()
+        self.assertIsInstance(objects.setdefault('State.' + state.id),
+                              State)
+        self.assertIsInstance(objects.popitem()[1], BaseModel)
+
+    def test_values_builds_instances(self):
+        '''Test that iterating the values builds every instance.'''
+        state = State()
+        city = City()
+        self.reload_saved(state, city)
+        for obj in models.storage.all().values():
+            self.assertIsInstance(obj, BaseModel)
+
+    def test_save_keeps_raw_records(self):
+        '''Test that saving writes raw records without building them.'''
+        state = State()
+        city = City()
+        self.reload_saved(state, city)
+        city2 = models.storage.all()['City.' + city.id]
+        city2.name = 'Abuja'
+        models.storage.save()
+        raw = dict(dict.items(models.storage.all()))
+        self.assertEqual(type(raw['State.' + state.id]), dict)
+        models.storage = FileStorage(path='file.json')
+        FileStorage.lazy = False
+        models.storage.reload()
+        objects = models.storage.all()
+        self.assertEqual(objects['City.' + city.id].name, 'Abuja')
+        self.assertEqual(objects['State.' + state.id].to_dict(),
+                         state.to_dict())
+
+
+class TestFileStorage_durability(unittest.TestCase):
+    '''Unittests for atomic snapshot writes and the fsync policy.'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    @classmethod
+    def tearDown(self):
+        models.storage.flush()
+        FileStorage.fsync = 'never'
+        FileStorage.fsync_interval = 1
+        FileStorage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def test_failed_write_keeps_old_file(self):
+        '''Test that a failure while writing leaves the old file intact.'''
+        bm = BaseModel()
+        models.storage.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            before = f.read()
+        BaseModel()
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                models.storage.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), before)
+        self.assertFalse(os.path.exists('file.json.tmp'))
+
+    def test_fsync_never(self):
+        '''Test that the default policy does not fsync.'''
+        BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            models.storage.save()
+        fsync.assert_not_called()
+
+    def test_fsync_always(self):
+        '''Test that the 'always' policy syncs the file and its directory.'''
+        FileStorage.fsync = 'always'
+        BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            models.storage.save()
+            models.storage.save()
+        self.assertEqual(fsync.call_count, 4)
+
+    def test_fsync_always_new_journal(self):
+        '''Test that the 'always' policy syncs the directory of a journal
+        it creates, and only the journal afterwards.'''
+        FileStorage.fsync = 'always'
+        FileStorage.journal = True
+        FileStorage._FileStorage__journal_size = 0
+        bm = BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            bm.save()
+            self.assertEqual(fsync.call_count, 2)
+            bm.save()
+            self.assertEqual(fsync.call_count, 3)
+        self.assertTrue(os.path.exists('file.json.journal'))
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_fsync_interval(self):
+        '''Test that the 'interval' policy syncs a burst of saves once.'''
+        FileStorage.fsync = 'interval'
+        FileStorage.fsync_interval = 60
+        FileStorage.journal = True
+        FileStorage._FileStorage__journal_size = 0
+        bm = BaseModel()
+        # Creating the journal would sync its directory too.
+        bm.save()
+        FileStorage._FileStorage__last_fsync = float('-inf')
+        with mock.patch('os.fsync') as fsync:
+            for i in range(5):
+                bm.save()
+        self.assertEqual(fsync.call_count, 1)
+
+    def test_fsync_interval_syncs_the_last_save(self):
+        '''Test that a save within the interval is synced once it is
+        over.'''
+        FileStorage.fsync = 'interval'
+        FileStorage.fsync_interval = 0.2
+        FileStorage._FileStorage__last_fsync = float('-inf')
+        bm = BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            bm.save()
+            bm.save()
+            self.assertEqual(fsync.call_count, 2)
+            deadline = time.monotonic() + 5
+            while fsync.call_count < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            # The file and its directory.
+            self.assertEqual(fsync.call_count, 4)
+
+    def test_flush_syncs(self):
+        '''Test that flush() syncs the saves the interval left.'''
+        FileStorage.fsync = 'interval'
+        FileStorage.fsync_interval = 60
+        FileStorage._FileStorage__last_fsync = float('-inf')
+        bm = BaseModel()
+        with mock.patch('os.fsync') as fsync:
+            bm.save()
+            bm.save()
+            self.assertEqual(fsync.call_count, 2)
+            models.storage.flush()
+            self.assertEqual(fsync.call_count, 4)
+            models.storage.flush()
+            self.assertEqual(fsync.call_count, 4)
+
+    def test_unknown_fsync_policy(self):
+        '''Test that an unknown fsync policy is rejected.'''
+        FileStorage.fsync = 'sometimes'
+        BaseModel()
+        with self.assertRaises(ValueError):
+            models.storage.save()
+        self.assertFalse(os.path.exists('file.json'))
+        self.assertFalse(os.path.exists('file.json.tmp'))
+        FileStorage.fsync = 'never'
+
+
+class TestFileStorage_batch(unittest.TestCase):
+    '''Unittests for the public instance method - batch().'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    @classmethod
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def test_saves_once_on_exit(self):
+        '''Test that the saves inside a batch become one save at the end.'''
+        with mock.patch.object(FileStorage, '_FileStorage__write_snapshot',
+                               autospec=True) as write:
+            with models.storage.batch():
+                for i in range(10):
+                    BaseModel().save()
+                write.assert_not_called()
+            self.assertEqual(write.call_count, 1)
+
+    def test_no_save_no_write(self):
+        '''Test that a batch without save() calls writes nothing.'''
+        with models.storage.batch():
+            BaseModel()
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_objects_are_saved(self):
+        '''Test that the objects created in a batch reach the file.'''
+        with models.storage.batch():
+            state = State()
+            state.save()
+        with open('file.json', 'r', encoding='utf-8') as f:
+            self.assertIn('State.' + state.id, f.read())
+
+    def test_rollback(self):
+        '''Test that an exception undoes the changes made in the block.'''
+        state = State()
+        state.name = 'Lagos'
+        city = City()
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                state.name = 'Abuja'
+                state.extra = 1
+                models.storage.delete(city)
+                review = Review()
+                review.save()
+                raise ValueError
+        objects = models.storage.all()
+        self.assertEqual(state.name, 'Lagos')
+        self.assertFalse(hasattr(state, 'extra'))
+        self.assertIn('City.' + city.id, objects)
+        self.assertNotIn('Review.' + review.id, objects)
+        self.assertEqual(models.storage.count(Review), 0)
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_nested_rollback(self):
+        '''Test that an inner block only rolls back its own changes.'''
+        state = State()
+        with models.storage.batch():
+            state.name = 'Lagos'
+            try:
+                with models.storage.batch():
+                    state.name = 'Abuja'
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertEqual(state.name, 'Lagos')
+        self.assertEqual(state.name, 'Lagos')
+
+
+class TestFileStorage_get_delete(unittest.TestCase):
+    '''Unittests for the public instance methods - get() and delete().'''
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+
+    @classmethod
+    def tearDown(self):
+        FileStorage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        models.storage = FileStorage(path='file.json')
+
+    def test_get(self):
+        '''Test get() with a class, a class name and a missing id.'''
+        city = City()
+        self.assertIs(models.storage.get(City, city.id), city)
+        self.assertIs(models.storage.get('City', city.id), city)
+        self.assertIsNone(models.storage.get(State, city.id))
+        self.assertIsNone(models.storage.get(City, 'missing'))
+
+    def test_get_no_args(self):
+        '''Test the get method with no arguments.'''
+        with self.assertRaises(TypeError):
+            models.storage.get()
+
+    def test_delete(self):
+        '''Test that delete() removes the object and its index entry.'''
+        city = City()
+        models.storage.delete(city)
+        self.assertIsNone(models.storage.get(City, city.id))
+        self.assertNotIn(city, models.storage.all(City).values())
+
+    def test_delete_not_stored(self):
+        '''Test that deleting an object that is not stored does nothing.'''
+        city = City()
+        models.storage.delete(city)
+        models.storage.delete(city)
+        models.storage.delete(None)
+
+    def test_delete_is_journaled(self):
+        '''Test that in journal mode a delete is appended, not rewritten.'''
+        city = City()
+        models.storage.save()
+        FileStorage.journal = True
+        models.storage.delete(city)
+        models.storage.save()
+        with open('file.json.journal', 'r', encoding='utf-8') as f:
+            last = json.loads(f.readlines()[-1])
+        self.assertEqual(last, {'key': 'City.' + city.id, 'value': None})
+
+
+class TestFileStorage_related(unittest.TestCase):
+    '''Unittests for the reverse indexes of related().'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+
+    def tearDown(self):
+        FileStorage.lazy = False
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def test_undeclared_not_indexed(self):
+        '''Test that attributes the class does not declare are found by
+        a scan, without adding an index.'''
+        places = [Place() for i in range(3)]
+        places[0].rank = 2
+        places[1].rank = 1
+        places[1].tags = ['a', 'b']
+        places[2].latitude = 6.5
+        places[2].longitude = 3.4
+        states = [State() for i in range(2)]
+        states[0].latitude = 6.5
+        states[0].longitude = 3.4
+        # Indexed: the indexes of the previous objects are dropped.
+        self.assertEqual(list(models.storage.in_bbox(6, 3, 7, 4)),
+                         ['Place.' + places[2].id])
+        self.assertEqual(list(models.storage.related(Place, 'rank', 1)),
+                         ['Place.' + places[1].id])
+        self.assertEqual(list(models.storage.between(Place, 'rank', 0)),
+                         ['Place.' + places[1].id, 'Place.' + places[0].id])
+        self.assertEqual(list(models.storage.containing(Place, 'tags',
+                                                        ['b'])),
+                         ['Place.' + places[1].id])
+        self.assertEqual(list(models.storage.in_bbox(6, 3, 7, 4, State)),
+                         ['State.' + states[0].id])
+        self.assertEqual({name: list(links) for name, links
+                          in FileStorage._FileStorage__links.items()},
+                         {'Place': [('latitude', 'longitude',
+                                     FileStorage.grid_size)]})
+
+    def test_lazy_records_are_not_built(self):
+        '''Test that only the records found are built in lazy mode.'''
+        place = Place()
+        reviews = [Review() for i in range(3)]
+        reviews[0].place_id = place.id
+        models.storage.save()
+        FileStorage.lazy = True
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+        self.assertEqual(list(models.storage.related(Review, 'place_id',
+                                                     place.id)),
+                         ['Review.' + reviews[0].id])
+        raw = dict(dict.items(models.storage.all()))
+        self.assertIsInstance(raw['Review.' + reviews[0].id], Review)
+        self.assertEqual(type(raw['Review.' + reviews[1].id]), dict)
+
+    def test_reload(self):
+        '''Test that the objects reload() replaces are indexed again.'''
+        review = Review()
+        review.place_id = 'first'
+        models.storage.save()
+        self.assertEqual(len(models.storage.related(Review, 'place_id',
+                                                    'first')), 1)
+        review.place_id = 'second'
+        models.storage.reload()
+        found = models.storage.related(Review, 'place_id', 'first')
+        self.assertIsNot(found['Review.' + review.id], review)
+        self.assertEqual(models.storage.related(Review, 'place_id',
+                                                'second'), {})
+
+    def test_between_follows_updates(self):
+        '''Test that between() agrees with a scan as values change.'''
+        places = [Place() for i in range(30)]
+        models.storage.between(Place, 'max_guest')
+        for i in range(200):
+            place = places[i * 7 % 30]
+            if i % 13 == 0:
+                models.storage.delete(place)
+            else:
+                place.max_guest = (i * 11) % 9
+            for low, high in ((None, None), (2, 5), (3, 3), (7, None)):
+                found = models.storage.between(Place, 'max_guest', low,
+                                               high)
+                self.assertEqual(found, BaseStorage.between(
+                        models.storage, Place, 'max_guest', low, high))
+                values = [obj.max_guest for obj in found.values()]
+                self.assertEqual(values, sorted(values))
+
+    def test_in_bbox_follows_moves(self):
+        '''Test that in_bbox() agrees with a scan as places move.'''
+        places = [Place() for i in range(40)]
+        boxes = ((-10, -20, 10, 20), (30, 170, 60, -170), (-90, -180, 90, 180),
+                 (0.05, 0.05, 0.05, 0.05), (10, 0, -10, 5))
+        for size in (0.1, 7.5):
+            FileStorage.grid_size = size
+            self.addCleanup(setattr, FileStorage, 'grid_size', 0.1)
+            for i in range(120):
+                place = places[i * 7 % 40]
+                if i % 17 == 0:
+                    models.storage.delete(place)
+                    continue
+                place.latitude = (i * 37) % 180 - 90 + i / 20
+                place.longitude = (i * 73) % 360 - 180
+                if i % 11 == 0:
+                    place.latitude = 0.05
+                    place.longitude = 0.05
+                for box in boxes:
+                    self.assertEqual(models.storage.in_bbox(*box),
+                                     BaseStorage.in_bbox(models.storage,
+                                                         *box))
+
+    def test_containing_follows_updates(self):
+        '''Test that containing() agrees with a scan as lists change.'''
+        places = [Place() for i in range(30)]
+        models.storage.containing(Place, 'amenity_ids', ['a'])
+        queries = ([], ['a'], ['a', 'b'], ['c', 'b', 'a'], ['d'])
+        for i in range(150):
+            place = places[i * 7 % 30]
+            if i % 13 == 0:
+                models.storage.delete(place)
+                continue
+            place.amenity_ids = ['abcd'[j] for j in range(i % 5)
+                                 if (i >> j) & 1] + [[]]
+            for values in queries:
+                self.assertEqual(
+                        models.storage.containing(Place, 'amenity_ids',
+                                                  values),
+                        BaseStorage.containing(models.storage, Place,
+                                               'amenity_ids', values))
+
+    def test_batch_rollback(self):
+        '''Test that a rolled back change is rolled back in the index.'''
+        review = Review()
+        review.place_id = 'first'
+        models.storage.related(Review, 'place_id', 'first')
+        with self.assertRaises(RuntimeError):
+            with models.storage.batch():
+                review.place_id = 'second'
+                Review().place_id = 'first'
+                self.assertEqual(len(models.storage.related(
+                        Review, 'place_id', 'first')), 1)
+                raise RuntimeError
+        self.assertEqual(models.storage.related(Review, 'place_id', 'first'),
+                         {'Review.' + review.id: review})
+        self.assertEqual(models.storage.related(Review, 'place_id',
+                                                'second'), {})
+
+
+class TestFileStorage_shards(unittest.TestCase):
+    '''Unittests for the per-class shard files.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.shards = 1
+        self.workers = FileStorage.reload_workers
+        FileStorage.reload_workers = 1
+
+    def tearDown(self):
+        FileStorage.shards = 0
+        FileStorage.reload_workers = self.workers
+        FileStorage.journal = False
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def files(self):
+        '''Return the names of the files in the storage directory.'''
+        return sorted(os.listdir(self.tmp.name))
+
+    def reload(self):
+        '''Reload the storage from the files.'''
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+
+    def test_one_file_per_class(self):
+        '''Test that each class is saved in its own file.'''
+        state = State()
+        City()
+        City()
+        models.storage.save()
+        self.assertEqual(self.files(), ['file.City.0.json',
+                                        'file.State.0.json'])
+        with open(os.path.join(self.tmp.name, 'file.State.0.json'),
+                  'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f),
+                             {'State.' + state.id: state.to_dict()})
+
+    def test_only_changed_shards_are_written(self):
+        '''Test that save() only rewrites the files of changed objects.'''
+        state = State()
+        City()
+        Review()
+        models.storage.save()
+        state.name = 'Lagos'
+        with mock.patch('os.replace', wraps=os.replace) as replace:
+            models.storage.save()
+        self.assertEqual([os.path.basename(call[0][1])
+                          for call in replace.call_args_list],
+                         ['file.State.0.json'])
+
+    def test_buckets(self):
+        '''Test that a class is split into buckets and read back.'''
+        FileStorage.shards = 4
+        objects = [Review() for i in range(40)]
+        models.storage.save()
+        names = self.files()
+        self.assertGreater(len(names), 1)
+        self.assertTrue(all(name.startswith('file.Review.')
+                            for name in names))
+        objects[0].text = 'changed'
+        with mock.patch('os.replace', wraps=os.replace) as replace:
+            models.storage.save()
+        self.assertEqual(replace.call_count, 1)
+        self.reload()
+        self.assertEqual(models.storage.count(Review), 40)
+        self.assertEqual(models.storage.get(Review, objects[0].id).text,
+                         'changed')
+
+    def test_parallel_reload(self):
+        '''Test that reading the shards in worker processes loads the same
+        objects.'''
+        FileStorage.shards = 3
+        for cls in (State, City, Place, Review):
+            for i in range(10):
+                cls().save()
+        expected = {key: obj.to_dict()
+                    for key, obj in models.storage.all().items()}
+        FileStorage.reload_workers = 2
+        self.reload()
+        self.assertEqual({key: obj.to_dict()
+                          for key, obj in models.storage.all().items()},
+                         expected)
+
+    def test_delete_removes_empty_shard(self):
+        '''Test that the file of a class with no objects left is removed.'''
+        state = State()
+        City()
+        models.storage.save()
+        models.storage.delete(state)
+        models.storage.save()
+        self.assertEqual(self.files(), ['file.City.0.json'])
+        self.reload()
+        self.assertEqual(models.storage.count(), 1)
+
+    def test_switch_layout(self):
+        '''Test that a single file is split on the next save, and back.'''
+        FileStorage.shards = 0
+        state = State()
+        City()
+        models.storage.save()
+        self.assertEqual(self.files(), ['file.json'])
+        FileStorage.shards = 2
+        self.reload()
+        state = models.storage.get(State, state.id)
+        state.name = 'Lagos'
+        models.storage.save()
+        self.assertNotIn('file.json', self.files())
+        self.reload()
+        self.assertEqual(models.storage.count(), 2)
+        self.assertEqual(models.storage.get(State, state.id).name, 'Lagos')
+        FileStorage.shards = 0
+        self.reload()
+        models.storage.save()
+        self.assertEqual(self.files(), ['file.json'])
+        self.reload()
+        self.assertEqual(models.storage.count(), 2)
+
+    def test_journal_compaction(self):
+        '''Test that compacting the journal rewrites the changed shards.'''
+        FileStorage.journal = True
+        state = State()
+        city = City()
+        models.storage.save()
+        models.storage.save()
+        self.assertIn('file.json.journal', self.files())
+        city.name = 'Ikeja'
+        models.storage.save()
+        state.name = 'Lagos'
+        with mock.patch('os.replace', wraps=os.replace) as replace:
+            models.storage.save()
+        self.assertEqual(sorted(os.path.basename(call[0][1])
+                                for call in replace.call_args_list),
+                         ['file.City.0.json', 'file.State.0.json'])
+        self.assertNotIn('file.json.journal', self.files())
+        self.reload()
+        self.assertEqual(models.storage.get(City, city.id).name, 'Ikeja')
+        self.assertEqual(models.storage.get(State, state.id).name, 'Lagos')
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    '''Unittests for the binary snapshot format.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.format = 'binary'
+
+    def tearDown(self):
+        FileStorage.format = 'json'
+        FileStorage.shards = 0
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def reload(self):
+        '''Reload the storage from the files.'''
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+
+    def test_save_reload(self):
+        '''Test that objects saved in binary are reloaded unchanged.'''
+        place = Place()
+        place.name = 'Loft'
+        place.price_by_night = 120
+        state = State()
+        models.storage.save()
+        self.assertTrue(binary_format.is_binary(self.path))
+        self.reload()
+        self.assertEqual(models.storage.get(Place, place.id).to_dict(),
+                         place.to_dict())
+        self.assertEqual(models.storage.get(State, state.id).to_dict(),
+                         state.to_dict())
+
+    def test_switch_format(self):
+        '''Test that either format is read and the next save converts.'''
+        FileStorage.format = 'json'
+        place = Place()
+        models.storage.save()
+        FileStorage.format = 'binary'
+        self.reload()
+        models.storage.save()
+        self.assertTrue(binary_format.is_binary(self.path))
+        FileStorage.format = 'json'
+        self.reload()
+        self.assertEqual(models.storage.get(Place, place.id).to_dict(),
+                         place.to_dict())
+        models.storage.save()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertIn('Place.' + place.id, json.load(f))
+
+    def test_shards(self):
+        '''Test that shard files are written in binary too.'''
+        FileStorage.shards = 1
+        state = State()
+        models.storage.save()
+        shard = os.path.join(self.tmp.name, 'file.State.0.json')
+        self.assertTrue(binary_format.is_binary(shard))
+        state.name = 'Lagos'
+        models.storage.save()
+        self.reload()
+        self.assertEqual(models.storage.get(State, state.id).name, 'Lagos')
+
+
+class TestFileStorage_compression(unittest.TestCase):
+    '''Unittests for the compressed snapshots.'''
+
+    magics = {'gzip': b'\x1f\x8b', 'bz2': b'BZh', 'lzma': b'\xfd7zXZ'}
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+
+    def tearDown(self):
+        FileStorage.compression = ''
+        FileStorage.format = 'json'
+        FileStorage.shards = 0
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def reload(self):
+        '''Reload the storage from the files.'''
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+
+    def head(self, path=None):
+        '''Return the first bytes of the snapshot.'''
+        with open(path or self.path, 'rb') as f:
+            return f.read(8)
+
+    def test_codecs(self):
+        '''Test that each codec compresses the file and reloads it.'''
+        places = [Place() for i in range(20)]
+        places[0].name = 'Loft'
+        expected = {key: obj.to_dict()
+                    for key, obj in models.storage.all().items()}
+        for codec, magic in self.magics.items():
+            with self.subTest(codec=codec):
+                FileStorage.compression = codec
+                FileStorage._FileStorage__cache = {}
+                models.storage.save()
+                self.assertTrue(self.head().startswith(magic))
+                self.reload()
+                self.assertEqual(
+                        {key: obj.to_dict()
+                         for key, obj in models.storage.all().items()},
+                        expected)
+
+    def test_uncompress(self):
+        '''Test that a compressed file is read whatever the setting, and
+        the next save writes it uncompressed.'''
+        FileStorage.compression = 'gzip'
+        state = State()
+        models.storage.save()
+        FileStorage.compression = ''
+        self.reload()
+        models.storage.save()
+        self.assertEqual(self.head()[:1], b'{')
+        self.reload()
+        self.assertIsNotNone(models.storage.get(State, state.id))
+
+    def test_empty(self):
+        '''Test that an empty compressed snapshot reloads empty.'''
+        FileStorage.compression = 'bz2'
+        models.storage.save()
+        self.reload()
+        self.assertEqual(models.storage.all(), {})
+
+    def test_binary_shards(self):
+        '''Test compressed binary shard files.'''
+        FileStorage.compression = 'lzma'
+        FileStorage.format = 'binary'
+        FileStorage.shards = 1
+        state = State()
+        City()
+        models.storage.save()
+        shard = os.path.join(self.tmp.name, 'file.State.0.json')
+        self.assertTrue(self.head(shard).startswith(self.magics['lzma']))
+        self.reload()
+        self.assertEqual(models.storage.get(State, state.id).to_dict(),
+                         state.to_dict())
+        self.assertEqual(models.storage.count(), 2)
+
+    def test_unknown_codec(self):
+        '''Test that an unknown codec raises ValueError and keeps the
+        file.'''
+        BaseModel()
+        models.storage.save()
+        FileStorage.compression = 'zip'
+        with self.assertRaises(ValueError):
+            models.storage.save()
+        self.assertEqual(os.listdir(self.tmp.name), ['file.json'])
+
+
+class TestFileStorage_write_behind(unittest.TestCase):
+    '''Unittests for the background writer.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.write_behind = True
+        FileStorage.max_staleness = 60
+
+    def tearDown(self):
+        models.storage.close()
+        FileStorage.write_behind = False
+        FileStorage.max_staleness = 1
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def saved(self):
+        '''Return the content of the snapshot, {} if it does not exist.'''
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def test_save_returns_before_writing(self):
+        '''Test that save() leaves the write to flush().'''
+        state = State()
+        state.save()
+        self.assertEqual(self.saved(), {})
+        self.assertIsNotNone(FileStorage.lock)
+        models.storage.flush()
+        self.assertEqual(self.saved(), {'State.' + state.id:
+                                        state.to_dict()})
+
+    def test_saves_are_coalesced(self):
+        '''Test that saves made close together are written once.'''
+        states = [State() for i in range(10)]
+        with mock.patch('os.replace', wraps=os.replace) as replace:
+            for state in states:
+                state.name = 'Lagos'
+                state.save()
+            models.storage.flush()
+        self.assertEqual(replace.call_count, 1)
+        self.assertEqual(len(self.saved()), 10)
+
+    def test_max_staleness(self):
+        '''Test that a save is written within max_staleness seconds.'''
+        FileStorage.max_staleness = 0.05
+        State().save()
+        deadline = time.monotonic() + 5
+        while not self.saved() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.saved()), 1)
+
+    def test_close_stops_the_writer(self):
+        '''Test that close() writes the saves and stops the thread.'''
+        State().save()
+        models.storage.close()
+        self.assertEqual(len(self.saved()), 1)
+        self.assertIsNone(FileStorage.lock)
+        self.assertIsNone(FileStorage._FileStorage__writer)
+        models.storage.close()
+
+    def test_error_is_raised_by_flush(self):
+        '''Test that a failed background write is reported and retried.'''
+        state = State()
+        state.save()
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                models.storage.flush()
+        state.save()
+        models.storage.flush()
+        self.assertEqual(list(self.saved()), ['State.' + state.id])
+
+    def test_batch_is_written_when_it_ends(self):
+        '''Test that a batch() block is never written half done.'''
+        FileStorage.max_staleness = 0
+        State().save()
+        models.storage.flush()
+        with models.storage.batch():
+            City().save()
+            time.sleep(0.05)
+            models.storage.flush()
+            self.assertEqual(len(self.saved()), 1)
+            City()
+        models.storage.flush()
+        self.assertEqual(len(self.saved()), 3)
+
+    def test_changes_while_writing(self):
+        '''Test that changes made while the writer runs are all saved.'''
+        FileStorage.max_staleness = 0
+        places = []
+        for i in range(300):
+            place = Place()
+            place.number_rooms = i
+            places.append(place)
+            place.save()
+            places[i // 2].name = str(i)
+        models.storage.delete(places[0])
+        models.storage.save()
+        models.storage.flush()
+        self.assertEqual(self.saved(), {
+                'Place.' + place.id: place.to_dict()
+                for place in places[1:]})
+
+    def test_reload_writes_first(self):
+        '''Test that reload() does not drop the saves not written yet.'''
+        state = State()
+        state.save()
+        models.storage.reload()
+        self.assertEqual(list(self.saved()), ['State.' + state.id])
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                     'needs fork')
+class TestFileStorage_parallel_reload(unittest.TestCase):
+    '''Unittests for reading a snapshot in parallel parts.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        self.workers = FileStorage.reload_workers
+        FileStorage.reload_workers = 2
+        FileStorage.reload_mode = 'split'
+        patcher = mock.patch('models.engine.file_storage._MIN_PART', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        FileStorage.reload_workers = self.workers
+        FileStorage.reload_mode = 'shards'
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def reloaded(self):
+        '''Return the to_dict() of the objects read back by reload().'''
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+        return {key: obj.to_dict()
+                for key, obj in models.storage.all().items()}
+
+    def test_split(self):
+        '''Test that the parts hold every entry once, in order.'''
+        objects = [Place() for i in range(20)]
+        objects[3].name = '}, "State.1": {'
+        models.storage.save()
+        parts = file_storage.split_snapshot(self.path, 8)
+        self.assertEqual(len(parts), 8)
+        records = [record for part in parts
+                   for record in file_storage.hydrate(part)]
+        self.assertEqual([record['id'] for record in records],
+                         [obj.id for obj in objects])
+        self.assertIsInstance(records[0]['created_at'], datetime)
+
+    def test_small_or_compressed_file_is_one_part(self):
+        '''Test that files which cannot be split are one part.'''
+        State().save()
+        for min_part, compression in ((1 << 20, ''), (1, 'gzip')):
+            FileStorage.compression = compression
+            models.storage.save()
+            with mock.patch('models.engine.file_storage._MIN_PART',
+                            min_part):
+                self.assertEqual(file_storage.split_snapshot(self.path, 8),
+                                 [(self.path, None, None)])
+        FileStorage.compression = ''
+
+    def test_reload(self):
+        '''Test that a parallel reload reads back the same objects.'''
+        for i in range(20):
+            place = Place()
+            place.name = 'Place {}'.format(i)
+            place.amenity_ids = [str(i)]
+        State().save()
+        objects = {key: obj.to_dict()
+                   for key, obj in models.storage.all().items()}
+        self.assertEqual(self.reloaded(), objects)
+        self.assertEqual(FileStorage._FileStorage__dirty, {})
+
+    def test_split_is_opt_in(self):
+        '''Test that a JSON snapshot is only split in 'split' mode.'''
+        for i in range(20):
+            Place()
+        models.storage.save()
+        objects = {key: obj.to_dict()
+                   for key, obj in models.storage.all().items()}
+        for mode in ('serial', 'shards'):
+            FileStorage.reload_mode = mode
+            with mock.patch.object(FileStorage,
+                                   '_FileStorage__hydrate') as hydrate:
+                self.assertEqual(self.reloaded(), objects)
+            hydrate.assert_not_called()
+
+    def test_unknown_mode(self):
+        '''Test that an unknown reload_mode raises ValueError.'''
+        FileStorage.reload_mode = 'fork'
+        with self.assertRaises(ValueError):
+            models.storage.reload()
+
+    def test_misplaced_split(self):
+        '''Test that a part cut inside an entry is read again whole.'''
+        place = Place()
+        place.meta = {'a': 1}
+        place.__dict__['x.y'] = {'b': 2}
+        models.storage.save()
+        parts = file_storage.split_snapshot(self.path, 8)
+        self.assertEqual(len(parts), 2)
+        with self.assertRaises(ValueError):
+            file_storage.hydrate(parts[1])
+        self.assertEqual(self.reloaded(),
+                         {'Place.' + place.id: place.to_dict()})
+
+    def import_models(self, **variables):
+        '''Return what models.storage counts once imported by a new
+        process, run in the temporary directory with the environment
+        variables.'''
+        env = {name: value for name, value in os.environ.items()
+               if not name.startswith('HBNB_')}
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(
+                os.path.abspath(models.__file__)))
+        env.update(variables)
+        result = subprocess.run(
+                [sys.executable, '-c',
+                 'import models; print(models.storage.count())'],
+                cwd=self.tmp.name, env=env, timeout=60,
+                stdout=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(result.returncode, 0)
+        return int(result.stdout)
+
+    def test_import_shards(self):
+        '''Test that importing models reads the shards in parallel.'''
+        FileStorage.shards = 2
+        for i in range(20):
+            State().save()
+        FileStorage.shards = 0
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+        self.assertEqual(self.import_models(HBNB_STORAGE_SHARDS='2',
+                                            HBNB_STORAGE_RELOAD_WORKERS='2'),
+                         20)
+
+    def test_import_split(self):
+        '''Test that importing models splits a large snapshot.'''
+        created = datetime.now().isoformat()
+        with open(self.path, 'w') as f:
+            json.dump({'State.{}'.format(i): {
+                    '__class__': 'State', 'id': str(i), 'name': 'x' * 250,
+                    'created_at': created, 'updated_at': created}
+                       for i in range(30000)}, f)
+        # Enough for two parts of the default _MIN_PART.
+        self.assertGreater(os.path.getsize(self.path), 2 << 22)
+        self.assertEqual(
+                self.import_models(HBNB_STORAGE_RELOAD_MODE='split',
+                                   HBNB_STORAGE_RELOAD_WORKERS='2'),
+                30000)
+
+
+class TestFileStorage_reload_unchanged(unittest.TestCase):
+    '''Unittests for reload() when the files have not changed.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.skip_unchanged = True
+        self.state = State()
+        self.state.name = 'aaaa'
+        self.state.save()
+
+    def tearDown(self):
+        FileStorage.skip_unchanged = False
+        FileStorage.reload_cache = False
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def reload(self):
+        '''Reload, returning the number of snapshot files read.'''
+        with mock.patch('models.engine.file_storage.iter_snapshot',
+                        wraps=file_storage.iter_snapshot) as read:
+            models.storage.reload()
+        return read.call_count
+
+    def test_unchanged(self):
+        '''Test that nothing is read if nothing changed.'''
+        self.assertEqual(self.reload(), 0)
+        self.assertIs(models.storage.get(State, self.state.id), self.state)
+        self.assertEqual(self.reload(), 0)
+
+    def test_changes_are_reloaded(self):
+        '''Test that unsaved changes or new __objects are reloaded.'''
+        self.state.name = 'bbbb'
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.get(State, self.state.id).name,
+                         'aaaa')
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.count(), 1)
+
+    def test_not_skipped_by_default(self):
+        '''Test that without skip_unchanged, reload() undoes changes made
+        directly to the all() dictionary.'''
+        FileStorage.skip_unchanged = False
+        del models.storage.all()['State.' + self.state.id]
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.get(State, self.state.id).name,
+                         'aaaa')
+        models.storage.all().clear()
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.count(), 1)
+
+    def test_files_not_tracked_by_default(self):
+        '''Test that without the options that need it, the files are not
+        listed or checksummed after a save or reload.'''
+        FileStorage.skip_unchanged = False
+        with mock.patch.object(FileStorage,
+                               '_FileStorage__files_state') as files:
+            with mock.patch.object(FileStorage,
+                                   '_FileStorage__recent_checksums') as crc:
+                self.state.save()
+                models.storage.reload()
+        files.assert_not_called()
+        crc.assert_not_called()
+        FileStorage.skip_unchanged = True
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(self.reload(), 0)
+
+    def test_same_size_and_mtime(self):
+        '''Test that a rewrite keeping the size and mtime is seen.'''
+        stat = os.stat(self.path)
+        with open(self.path, 'r+', encoding='utf-8') as f:
+            text = f.read().replace('aaaa', 'bbbb')
+            f.seek(0)
+            f.write(text)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.get(State, self.state.id).name,
+                         'bbbb')
+
+    def test_cache(self):
+        '''Test that a new process loads the objects from the cache.'''
+        FileStorage.reload_cache = True
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(self.reload(), 1)
+        self.assertTrue(os.path.exists(self.path + '.cache'))
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(self.reload(), 0)
+        loaded = models.storage.get(State, self.state.id)
+        self.assertIsNot(loaded, self.state)
+        self.assertEqual(loaded.to_dict(), self.state.to_dict())
+        self.assertEqual(FileStorage._FileStorage__dirty, {})
+        City().save()
+        models.storage = FileStorage(path=self.path)
+        self.assertEqual(self.reload(), 1)
+        self.assertEqual(models.storage.count(), 2)
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                     'needs fork')
+class TestFileStorage_shared(unittest.TestCase):
+    '''Unittests for several processes sharing the files.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.shared = True
+        self.state = State()
+        self.state.name = 'Lagos'
+        self.state.save()
+
+    def tearDown(self):
+        models.storage.close()
+        FileStorage.shared = False
+        FileStorage.journal = False
+        FileStorage.shards = 0
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def other_process(self, target):
+        '''Run target in another process, as it would change the files.'''
+        process = multiprocessing.get_context('fork').Process(target=target)
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+    def saved(self):
+        '''Return the class names of the objects a new process would
+        load.'''
+        models.storage = FileStorage(path=self.path)
+        models.storage.reload()
+        return sorted(key.split('.')[0] for key in models.storage.all())
+
+    def add_city(self):
+        '''Save a new City, in the other process.'''
+        City().save()
+
+    def rename_state(self):
+        '''Rename the State, in the other process.'''
+        self.state.name = 'Abuja'
+        self.state.save()
+
+    def delete_state(self):
+        '''Delete the State, in the other process.'''
+        models.storage.delete(self.state)
+        models.storage.save()
+
+    def test_refresh(self):
+        '''Test that refresh() picks up what another process saved.'''
+        self.other_process(self.add_city)
+        self.assertEqual(models.storage.count(City), 0)
+        models.storage.refresh()
+        self.assertEqual(models.storage.count(City), 1)
+        self.other_process(self.delete_state)
+        models.storage.refresh()
+        self.assertEqual(models.storage.count(), 1)
+        self.assertEqual(models.storage.count(City), 1)
+
+    def test_refresh_unchanged_reads_nothing(self):
+        '''Test that refresh() does not read unchanged files.'''
+        with mock.patch('models.engine.file_storage.iter_snapshot') as read:
+            models.storage.refresh()
+        read.assert_not_called()
+
+    def test_no_update_is_lost(self):
+        '''Test that a save keeps what another process saved first.'''
+        for journal in (False, True):
+            FileStorage.journal = journal
+            self.other_process(self.add_city)
+            Place().save()
+            self.assertEqual(self.saved()[-2:], ['Place', 'State'])
+        self.assertEqual(self.saved(), ['City', 'City', 'Place', 'Place',
+                                        'State'])
+
+    def test_local_changes_win(self):
+        '''Test that unsaved changes are kept over another process's.'''
+        self.other_process(self.rename_state)
+        self.state.name = 'Kano'
+        models.storage.refresh()
+        self.assertEqual(self.state.name, 'Kano')
+        self.assertIs(models.storage.all()['State.' + self.state.id],
+                      self.state)
+
+    def test_journal_delta(self):
+        '''Test that only the new journal records are read.'''
+        FileStorage.journal = True
+        City().save()
+        self.other_process(self.rename_state)
+        with mock.patch('models.engine.file_storage.iter_snapshot') as read:
+            models.storage.refresh()
+        read.assert_not_called()
+        self.assertEqual(models.storage.get(State, self.state.id).name,
+                         'Abuja')
+
+    def test_shards_delta(self):
+        '''Test that only the rewritten shard files are read.'''
+        FileStorage.shards = 1
+        models.storage.reload()
+        models.storage.save()
+        state = models.storage.get(State, self.state.id)
+        self.other_process(self.add_city)
+        with mock.patch('models.engine.file_storage.iter_snapshot',
+                        wraps=file_storage.iter_snapshot) as read:
+            models.storage.refresh()
+        self.assertEqual([call.args[0] for call in read.call_args_list],
+                         [os.path.join(self.tmp.name, 'file.City.0.json')])
+        self.assertEqual(models.storage.count(City), 1)
+        self.assertIs(models.storage.get(State, self.state.id), state)
+
+
 if __name__ == '__main__':
     unittest.main()
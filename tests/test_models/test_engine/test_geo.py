@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/geo.py.'''
+
+import unittest
+from models.engine import geo
+
+
+class TestGeo(unittest.TestCase):
+    '''Unittests for the geometry of the location queries.'''
+
+    def test_distance(self):
+        '''Test distances along a meridian and across the antimeridian.'''
+        self.assertAlmostEqual(geo.distance(0, 0, 1, 0), 111.195, places=3)
+        self.assertAlmostEqual(geo.distance(0, 179.5, 0, -179.5),
+                               geo.distance(0, 0, 0, 1))
+        self.assertEqual(geo.distance(6.45, 3.39, 6.45, 3.39), 0)
+
+    def test_around(self):
+        '''Test that the box of a circle holds the circle, and no more
+        than needed along the meridian and the parallel.'''
+        south, west, north, east = geo.around(45, 10, 100)
+        self.assertAlmostEqual(geo.distance(45, 10, north, 10), 100)
+        self.assertAlmostEqual(geo.distance(45, 10, south, 10), 100)
+        # The widest point of the circle is north of its parallel.
+        self.assertGreater(geo.distance(45, 10, 45, east), 100)
+        self.assertAlmostEqual(east - 10, 10 - west)
+
+    def test_around_antimeridian_and_poles(self):
+        '''Test boxes crossing the antimeridian or holding a pole.'''
+        south, west, north, east = geo.around(0, 179.9, 50)
+        self.assertGreater(west, east)
+        self.assertTrue(geo.inside(0, -179.9, south, west, north, east))
+        self.assertEqual(geo.around(89.9, 0, 50),
+                         (geo.around(89.9, 0, 50)[0], -180.0, 90.0, 180.0))
+
+    def test_split_and_inside(self):
+        '''Test boxes crossing the antimeridian.'''
+        self.assertEqual(geo.split(0, 170, 10, -170),
+                         [(0, 170, 10, 180.0), (0, -180.0, 10, -170)])
+        self.assertEqual(geo.split(0, -10, 10, 10), [(0, -10, 10, 10)])
+        self.assertTrue(geo.inside(5, 175, 0, 170, 10, -170))
+        self.assertTrue(geo.inside(5, -175, 0, 170, 10, -170))
+        self.assertFalse(geo.inside(5, 0, 0, 170, 10, -170))
+        self.assertFalse(geo.inside(11, 175, 0, 170, 10, -170))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/json_stream.py.'''
+
+import io
+import json
+import unittest
+from models.engine.json_stream import iter_items
+
+
+class TestJsonStream_iter_items(unittest.TestCase):
+    '''Unittests for the iter_items function.'''
+
+    def test_empty_object(self):
+        '''Test that an empty object yields nothing.'''
+        self.assertEqual(list(iter_items(io.StringIO(' { } '))), [])
+
+    def test_matches_json_load(self):
+        '''Test that the entries match json.load for every chunk size.'''
+        data = {
+            'BaseModel.1': {'id': '1', 'n': 12345, 'f': -1.5e3},
+            'Place.2': {'id': '2', 'amenity_ids': ['a', 'b'], 'x': None},
+            'User.3': {'id': '3', 'name': 'Ai\\u00efsha "quoted" {}'},
+        }
+        text = json.dumps(data, indent=2)
+        for size in (1, 2, 3, 7, 64, 1 << 16):
+            items = iter_items(io.StringIO(text), chunk_size=size)
+            self.assertEqual(dict(items), data)
+
+    def test_numbers_split_across_chunks(self):
+        '''Test that a top-level number is not cut at a chunk boundary.'''
+        items = iter_items(io.StringIO('{"a": 123456, "b": 7}'), 2)
+        self.assertEqual(list(items), [('a', 123456), ('b', 7)])
+
+    def test_not_an_object(self):
+        '''Test that a file that is not a JSON object raises ValueError.'''
+        with self.assertRaises(ValueError):
+            list(iter_items(io.StringIO('[1, 2]')))
+
+    def test_truncated_file(self):
+        '''Test that a truncated file raises ValueError.'''
+        with self.assertRaises(ValueError):
+            list(iter_items(io.StringIO('{"a": {"id": "1"}, "b": {"i')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/lock_file.py.'''
+
+import os
+import tempfile
+import unittest
+import multiprocessing
+from models.engine import lock_file
+from models.engine.lock_file import LockFile
+
+
+@unittest.skipIf(lock_file.fcntl is None, 'needs fcntl')
+class TestLockFile(unittest.TestCase):
+    '''Unittests for the lock file of the shared option.'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json.lock')
+        self.lock = LockFile(self.path)
+
+    def tearDown(self):
+        self.lock.close()
+        self.tmp.cleanup()
+
+    def test_generation(self):
+        '''Test that the generation starts at 0 and each advance()
+        increases it, for every process reading the file.'''
+        self.assertIsNone(self.lock.generation)
+        with self.lock.held(exclusive=False) as lock:
+            self.assertIs(lock, self.lock)
+            self.assertEqual(lock.read(), 0)
+        with self.lock.held(exclusive=True):
+            self.assertEqual(self.lock.advance(), 1)
+            self.assertEqual(self.lock.advance(), 2)
+        self.assertEqual(self.lock.generation, 2)
+        other = LockFile(self.path)
+        self.addCleanup(other.close)
+        with other.held(exclusive=False):
+            self.assertEqual(other.read(), 2)
+        self.assertIsNone(other.generation)
+
+    def test_exclusive(self):
+        '''Test that an exclusive lock keeps other processes waiting.'''
+        context = multiprocessing.get_context('fork')
+        locked = context.Event()
+        release = context.Event()
+
+        def hold():
+            '''Hold the lock in the other process until released.'''
+            with LockFile(self.path).held(exclusive=True):
+                locked.set()
+                release.wait(5)
+
+        process = context.Process(target=hold)
+        process.start()
+        self.assertTrue(locked.wait(5))
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            with self.assertRaises(BlockingIOError):
+                lock_file.fcntl.flock(fd, lock_file.fcntl.LOCK_SH |
+                                      lock_file.fcntl.LOCK_NB)
+        finally:
+            os.close(fd)
+        release.set()
+        process.join()
+        with self.lock.held(exclusive=False):
+            self.assertEqual(self.lock.read(), 0)
+
+    def test_forked_child_opens_its_own(self):
+        '''Test that a forked child does not use the lock of its parent,
+        and that its generation is not known until it reads it.'''
+        with self.lock.held(exclusive=True):
+            self.lock.advance()
+        context = multiprocessing.get_context('fork')
+        queue = context.SimpleQueue()
+
+        def child():
+            '''Report what the child sees through the inherited lock.'''
+            with self.lock.held(exclusive=True):
+                queue.put((self.lock.generation, self.lock.advance()))
+
+        process = context.Process(target=child)
+        process.start()
+        process.join()
+        self.assertEqual(queue.get(), (None, 2))
+        with self.lock.held(exclusive=False):
+            self.assertEqual(self.lock.read(), 2)
+        self.assertEqual(self.lock.generation, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/mapped_storage.py and
+models/engine/snapshot_index.py.'''
+
+import io
+import os
+import json
+import models
+import tempfile
+import unittest
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.engine.file_storage import FileStorage
+from models.engine.mapped_storage import MappedStorage
+from models.engine import snapshot_index
+
+
+class TestMappedStorage(unittest.TestCase):
+    '''Unittests for the MappedStorage class.'''
+
+    def setUp(self):
+        '''Save a few objects with FileStorage in a temporary directory.'''
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        models.storage = FileStorage(path=self.path)
+        FileStorage.index = True
+        self.states = [State() for i in range(3)]
+        self.states[0].name = 'Lagos'
+        self.city = City()
+        self.city.state_id = self.states[0].id
+        models.storage.save()
+        self.mapped = MappedStorage(self.path)
+        self.mapped.reload()
+
+    def tearDown(self):
+        self.mapped.close()
+        FileStorage.index = False
+        FileStorage.journal = False
+        models.storage = FileStorage(path='file.json')
+        self.tmp.cleanup()
+
+    def reopen(self):
+        '''Close the engine and map the snapshot again.'''
+        self.mapped.close()
+        self.mapped = MappedStorage(self.path)
+        self.mapped.reload()
+        return self.mapped
+
+    def test_read_only(self):
+        '''Test that the engine refuses every change.'''
+        self.assertTrue(self.mapped.read_only)
+        self.assertFalse(models.storage.read_only)
+        for call in (lambda: self.mapped.new(self.city),
+                     lambda: self.mapped.delete(self.city),
+                     self.mapped.save):
+            with self.assertRaises(io.UnsupportedOperation):
+                call()
+
+    def test_get(self):
+        '''Test that get() decodes the stored record.'''
+        state = self.mapped.get(State, self.states[0].id)
+        self.assertIsNot(state, self.states[0])
+        self.assertEqual(state.to_dict(), self.states[0].to_dict())
+        self.assertIs(self.mapped.get('State', self.states[0].id), state)
+        self.assertIsNone(self.mapped.get(City, self.states[0].id))
+        self.assertIsNone(self.mapped.get(State, 'missing'))
+
+    def test_all_and_count(self):
+        '''Test all() and count() with and without a class.'''
+        self.assertEqual(self.mapped.count(), 4)
+        self.assertEqual(self.mapped.count(State), 3)
+        self.assertEqual(self.mapped.count('City'), 1)
+        self.assertEqual(self.mapped.count(Place), 0)
+        self.assertEqual(sorted(self.mapped.all(State)),
+                         sorted('State.' + s.id for s in self.states))
+        self.assertEqual(sorted(self.mapped.all()),
+                         sorted(models.storage.all()))
+        self.assertEqual(self.mapped.all(Place), {})
+
+    def test_journal(self):
+        '''Test that journaled changes take precedence over the snapshot.'''
+        FileStorage.journal = True
+        place = Place()
+        self.states[1].name = 'Kano'
+        models.storage.delete(self.city)
+        models.storage.save()
+        mapped = self.reopen()
+        self.assertEqual(mapped.count(), 4)
+        self.assertEqual(mapped.count(City), 0)
+        self.assertEqual(mapped.count(Place), 1)
+        self.assertIsNone(mapped.get(City, self.city.id))
+        self.assertEqual(mapped.get(State, self.states[1].id).name, 'Kano')
+        self.assertEqual(mapped.get(Place, place.id).to_dict(),
+                         place.to_dict())
+        self.assertEqual(sorted(mapped.all()), sorted(models.storage.all()))
+
+    def test_journal_torn_record(self):
+        '''Test that the records after a torn one are still read.'''
+        FileStorage.journal = True
+        self.states[0].name = 'Kano'
+        models.storage.save()
+        with open(self.path + '.journal', 'ab') as f:
+            f.write(b'{"key": "State.torn", "val')
+        self.states[1].name = 'Oyo'
+        models.storage.save()
+        mapped = self.reopen()
+        self.assertEqual(mapped.get(State, self.states[0].id).name, 'Kano')
+        self.assertEqual(mapped.get(State, self.states[1].id).name, 'Oyo')
+        self.assertIsNone(mapped.get(State, 'torn'))
+
+    def test_missing_index(self):
+        '''Test that a missing or stale index is rebuilt and saved.'''
+        FileStorage.index = False
+        self.states[2].name = 'Oyo'
+        models.storage.save()
+        mapped = self.reopen()
+        self.assertEqual(mapped.get(State, self.states[2].id).name, 'Oyo')
+        os.remove(snapshot_index.index_path(self.path))
+        mapped = self.reopen()
+        self.assertEqual(mapped.count(State), 3)
+        self.assertTrue(os.path.exists(snapshot_index.index_path(self.path)))
+
+    def test_no_snapshot(self):
+        '''Test that a missing snapshot is an empty store.'''
+        mapped = MappedStorage(os.path.join(self.tmp.name, 'none.json'))
+        mapped.reload()
+        self.assertEqual(mapped.count(), 0)
+        self.assertEqual(mapped.all(), {})
+        self.assertIsNone(mapped.get(State, self.states[0].id))
+        mapped.close()
+
+    def test_unmappable(self):
+        '''Test that a sharded, compressed or binary store is refused.'''
+        for option, value, reset in (('compression', 'gzip', ''),
+                                     ('format', 'binary', 'json'),
+                                     ('shards', 2, 0)):
+            setattr(FileStorage, option, value)
+            try:
+                models.storage.save()
+            finally:
+                setattr(FileStorage, option, reset)
+            with self.assertRaisesRegex(ValueError, 'Cannot map'):
+                self.reopen()
+            self.assertEqual(self.mapped.count(), 0)
+
+
+class TestSnapshotIndex(unittest.TestCase):
+    '''Unittests for the snapshot index functions.'''
+
+    def test_entries_of_matches_scan(self):
+        '''Test that the offsets computed while writing match a scan.'''
+        items = [('Place.2', json.dumps({'a': 'é"'})),
+                 ('State.1', json.dumps([1, {'b': None}])),
+                 ('City.é', json.dumps(3))]
+        text = '{' + ', '.join(json.dumps(key) + ': ' + value
+                               for key, value in items) + '}'
+        self.assertEqual(list(snapshot_index.entries_of(items)),
+                         snapshot_index.scan(text.encode('ascii')))
+
+    def test_scan_whitespace(self):
+        '''Test that a snapshot written by json.dump(indent=2) is indexed.'''
+        data = {'State.1': {'id': '1'}, 'City.1': {'id': '1', 'x': [1]}}
+        text = json.dumps(data, indent=2).encode('ascii')
+        stat = os.stat(__file__)
+        index = snapshot_index.SnapshotIndex(
+                text, snapshot_index.pack(snapshot_index.scan(text), stat))
+        self.assertEqual([index.key(i) for i in range(len(index))],
+                         ['City.1', 'State.1'])
+        self.assertEqual(index.value(index.find('City.1')), data['City.1'])
+        self.assertIsNone(index.find('City.2'))
+        self.assertEqual(index.prefix_range('State.'), range(1, 2))
+
+    def test_scan_not_an_object(self):
+        '''Test that scanning a file that is not an object raises.'''
+        with self.assertRaises(ValueError):
+            snapshot_index.scan(b'[1, 2]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/reload_cache.py.'''
+
+import os
+import marshal
+import tempfile
+import unittest
+import models
+from datetime import datetime
+from models.base_model import BaseModel, compact_class
+from models.place import Place
+from models.state import State
+from models.engine import reload_cache
+from models.engine import file_state
+
+
+def roundtrip(objects, state=None):
+    '''Return the state and {key: object} read back from the cache.'''
+    state, items = reload_cache.loads(
+            reload_cache.dumps(objects.items(), state or {}))
+    return state, dict(items)
+
+
+class TestReloadCache(unittest.TestCase):
+    '''Unittests for dumps() and loads().'''
+
+    def test_instances(self):
+        '''Test that instances are rebuilt with the same attributes.'''
+        place = Place()
+        place.name = 'Loft'
+        place.amenity_ids = ['a', 'b']
+        state = State()
+        objects = {'Place.' + place.id: place, 'State.' + state.id: state}
+        read = roundtrip(objects)[1]
+        self.assertEqual(list(read), list(objects))
+        for key, obj in read.items():
+            self.assertIsNot(obj, objects[key])
+            self.assertIs(type(obj), type(objects[key]))
+            self.assertEqual(obj._attributes(), objects[key]._attributes())
+        self.assertIsInstance(read['Place.' + place.id].created_at, datetime)
+
+    def test_compact_instances(self):
+        '''Test that instances are rebuilt compact in compact mode.'''
+        place = Place()
+        place.nickname = 'home'
+        BaseModel.compact = True
+        try:
+            read = roundtrip({'Place.' + place.id: place})[1]
+        finally:
+            BaseModel.compact = False
+        obj = read['Place.' + place.id]
+        self.assertIs(type(obj), compact_class(Place))
+        self.assertEqual(obj.to_dict(), place.to_dict())
+
+    def test_raw_records_and_state(self):
+        '''Test that raw records and the state are read back as is.'''
+        record = State().to_dict()
+        state = {'files': {'file.json': (1, 2, 3)}, 'pending': {('a', 0)}}
+        self.assertEqual(roundtrip({'State.1': record}, state),
+                         (state, {'State.1': record}))
+
+    def test_other_datetimes_are_refused(self):
+        '''Test that objects marshal cannot write raise ValueError.'''
+        place = Place()
+        self.addCleanup(models.storage.delete, place)
+        place.seen_at = datetime.now()
+        with self.assertRaises(ValueError):
+            reload_cache.dumps([('Place.' + place.id, place)], {})
+
+    def test_invalid(self):
+        '''Test that other data and other versions raise ValueError.'''
+        for data in (b'', b'{}', marshal.dumps((('hbnb-cache', 0), {}, []))):
+            with self.assertRaises(ValueError):
+                reload_cache.loads(data)
+
+
+class TestReloadCache_files(unittest.TestCase):
+    '''Unittests for write() and read().'''
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'file.json')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{}')
+        self.files = file_state.scan([self.path])
+        self.record = State().to_dict()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, checksums=None):
+        '''Write the cache of the record for the files as they are.'''
+        reload_cache.write(self.path, [('State.1', self.record)], {
+                'files': self.files,
+                'checksums': checksums or {},
+                'shards': 0})
+
+    def test_read(self):
+        '''Test that the cache is read back for the same files and shards
+        only.'''
+        self.write()
+        state, objects = reload_cache.read(self.path, self.files, 0)
+        self.assertEqual(dict(objects), {'State.1': self.record})
+        self.assertEqual(state['checksums'], {})
+        self.assertIsNone(reload_cache.read(self.path, self.files, 2))
+        self.assertIsNone(reload_cache.read(self.path, {}, 0))
+
+    def test_checksums(self):
+        '''Test that a cache whose checksums no longer match is ignored.'''
+        checksums = file_state.recent_checksums(self.files, self.files)
+        self.write(checksums)
+        state = reload_cache.read(self.path, self.files, 0)[0]
+        self.assertEqual(state['checksums'], checksums)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('[]')
+        self.assertIsNone(reload_cache.read(self.path, self.files, 0))
+
+    def test_missing_or_invalid(self):
+        '''Test that a missing or invalid cache is ignored.'''
+        self.assertIsNone(reload_cache.read(self.path, self.files, 0))
+        with open(reload_cache.cache_path(self.path), 'wb') as f:
+            f.write(b'not a cache')
+        self.assertIsNone(reload_cache.read(self.path, self.files, 0))
+
+    def test_write_failure_is_ignored(self):
+        '''Test that objects the cache cannot hold leave no file.'''
+        self.record['seen_at'] = datetime.now()
+        self.write()
+        self.assertEqual(os.listdir(self.tmp.name), ['file.json'])
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/sqlite_storage.py.'''
+
+import os
+import gc
+import sqlite3
+import models
+import tempfile
+import unittest
+from models.base_model import BaseModel
+from models.state import State
+from models.city import City
+from models.review import Review
+from models.engine.sqlite_storage import SQLiteStorage
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    '''Unittests for the SQLiteStorage class.'''
+
+    def setUp(self):
+        '''Point models.storage at an engine using a temporary database.'''
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'hbnb.db')
+        self.file_storage = models.storage
+        models.storage = SQLiteStorage(self.path)
+        models.storage.reload()
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage = self.file_storage
+        self.tmp.cleanup()
+
+    def reopen(self):
+        '''Close the engine and open a new one on the same database.'''
+        models.storage.close()
+        models.storage = SQLiteStorage(self.path)
+        models.storage.reload()
+        return models.storage
+
+    def test_new_and_all(self):
+        '''Test that new objects are listed by all() before a save.'''
+        state = State()
+        self.assertIs(models.storage.all()['State.' + state.id], state)
+        self.assertEqual(models.storage.all(City), {})
+
+    def test_save_and_reopen(self):
+        '''Test that saved objects are read back from the database.'''
+        state = State()
+        state.name = 'Lagos'
+        city = City()
+        city.state_id = state.id
+        city.save()
+        storage = self.reopen()
+        states = storage.all(State)
+        self.assertEqual(list(states), ['State.' + state.id])
+        loaded = states['State.' + state.id]
+        self.assertIsNot(loaded, state)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+        self.assertEqual(storage.all('City')['City.' + city.id].state_id,
+                         state.id)
+
+    def test_same_instance_per_row(self):
+        '''Test that a row is represented by a single loaded instance.'''
+        state = State()
+        state.save()
+        storage = self.reopen()
+        first = storage.all()['State.' + state.id]
+        self.assertIs(storage.all(State)['State.' + state.id], first)
+
+    def test_update_is_saved(self):
+        '''Test that setting an attribute writes the row on save().'''
+        state = State()
+        state.save()
+        storage = self.reopen()
+        loaded = storage.all()['State.' + state.id]
+        loaded.name = 'Abuja'
+        storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.all()['State.' + state.id].name, 'Abuja')
+
+    def test_unchanged_rows_are_not_written(self):
+        '''Test that loading a row does not mark it as changed.'''
+        state = State()
+        state.save()
+        storage = self.reopen()
+        storage.all()
+        self.assertEqual(storage._SQLiteStorage__dirty, {})
+
+    def test_delete(self):
+        '''Test that delete() removes the row on save().'''
+        state = State()
+        city = City()
+        models.storage.save()
+        models.storage.delete(city)
+        self.assertNotIn('City.' + city.id, models.storage.all())
+        self.assertEqual(models.storage.count(City), 0)
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(list(storage.all()), ['State.' + state.id])
+        storage.delete(None)
+
+    def test_count(self):
+        '''Test count() with saved and unsaved objects.'''
+        State()
+        State().save()
+        Review()
+        self.assertEqual(models.storage.count(), 3)
+        self.assertEqual(models.storage.count(State), 2)
+        self.assertEqual(models.storage.count('Review'), 1)
+        self.assertEqual(self.reopen().count(), 2)
+
+    def test_loaded_instances_are_not_kept(self):
+        '''Test that instances nobody uses any more are released.'''
+        for i in range(5):
+            BaseModel()
+        models.storage.save()
+        storage = self.reopen()
+        storage.all()
+        gc.collect()
+        self.assertEqual(len(storage._SQLiteStorage__objects), 0)
+
+    def indexes(self):
+        '''Return the names of the indexes of the objects table.'''
+        with sqlite3.connect(self.path) as conn:
+            return sorted(name for name, in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' "
+                    "AND tbl_name = 'objects' AND sql IS NOT NULL"))
+
+    def test_indexes_declared_attributes_only(self):
+        '''Test that queries only index the attributes models declare.'''
+        city = City()
+        city.state_id = '1'
+        city.save()
+        models.storage.related(City, 'state_id', '1')
+        models.storage.between(State, 'created_at', low='2000')
+        models.storage.related(City, 'nickname', 'x')
+        models.storage.between(City, 'save', low=1)
+        self.assertEqual(self.indexes(), ['objects_attr_created_at',
+                                          'objects_attr_state_id',
+                                          'objects_class'])
+
+    def test_class_attribute_query(self):
+        '''Test that querying an attribute named class works and leaves
+        the class index alone.'''
+        state = State()
+        state.__dict__['class'] = 'A'
+        state.save()
+        self.assertEqual(list(models.storage.related(State, 'class', 'A')),
+                         ['State.' + state.id])
+        self.assertEqual(self.indexes(), ['objects_class'])
+
+    def test_batch_is_one_transaction(self):
+        '''Test that the saves in a batch() are committed at its end.'''
+        other = sqlite3.connect(self.path)
+        self.addCleanup(other.close)
+        with models.storage.batch():
+            State().save()
+            with models.storage.batch():
+                State().save()
+            State().save()
+            self.assertEqual(
+                    other.execute('SELECT COUNT(*) FROM objects').fetchone(),
+                    (0,))
+        self.assertEqual(
+                other.execute('SELECT COUNT(*) FROM objects').fetchone(),
+                (3,))
+
+    def test_batch_rollback(self):
+        '''Test that a batch() that raises writes nothing and puts the
+        objects back.'''
+        state = State()
+        state.save()
+        with self.assertRaises(RuntimeError):
+            with models.storage.batch():
+                state.name = 'Lagos'
+                state.save()
+                City().save()
+                models.storage.delete(state)
+                raise RuntimeError
+        self.assertNotIn('name', state.to_dict())
+        self.assertEqual(models.storage.count(), 1)
+        self.assertIs(models.storage.get(State, state.id), state)
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 1)
+        self.assertNotIn('name', storage.get(State, state.id).to_dict())
+
+    def test_nested_batch_rollback(self):
+        '''Test that an inner batch() that raises only undoes its own
+        changes.'''
+        with models.storage.batch():
+            state = State()
+            state.save()
+            try:
+                with models.storage.batch():
+                    state.name = 'Lagos'
+                    City().save()
+                    models.storage.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertNotIn('name', state.to_dict())
+            review = Review()
+            review.save()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.count(City), 0)
+        self.assertIsNotNone(storage.get(Review, review.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
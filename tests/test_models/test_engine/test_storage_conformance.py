@@ -0,0 +1,457 @@
+#!/usr/bin/python3
+'''Defines the tests every storage engine in models/engine must pass.
+
+StorageConformance holds the tests; each engine gets a TestCase that mixes
+it in and knows how to open that engine on a temporary directory.
+'''
+
+import os
+import models
+import tempfile
+import unittest
+from unittest import mock
+from models.base_model import BaseModel
+from models.state import State
+from models.city import City
+from models.place import Place
+from models.engine.base_storage import BaseStorage
+from models.engine.file_storage import FileStorage
+from models.engine.memory_storage import MemoryStorage
+from models.engine.sqlite_storage import SQLiteStorage
+
+
+class StorageConformance:
+    '''Tests of the BaseStorage contract, run against every engine.
+
+    Attributes:
+        persistent (bool): False for engines that keep nothing on reopen.
+    '''
+
+    persistent = True
+
+    def open_storage(self):
+        '''Return a new engine storing its data in self.tmp.'''
+        raise NotImplementedError
+
+    def close_storage(self):
+        '''Undo any global change made by open_storage().'''
+
+    def setUp(self):
+        '''Point models.storage at a fresh engine.'''
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_storage = models.storage
+        models.storage = self.open_storage()
+
+    def tearDown(self):
+        models.storage.close()
+        self.close_storage()
+        models.storage = self.saved_storage
+        self.tmp.cleanup()
+
+    def reopen(self):
+        '''Close the engine and open a new one on the same data.'''
+        models.storage.close()
+        models.storage = self.open_storage()
+        return models.storage
+
+    def test_is_a_storage(self):
+        '''Test that the engine implements BaseStorage.'''
+        self.assertIsInstance(models.storage, BaseStorage)
+
+    def test_new_all_get(self):
+        '''Test that a new object can be listed and looked up.'''
+        state = State()
+        key = 'State.' + state.id
+        self.assertIs(models.storage.all()[key], state)
+        self.assertIs(models.storage.all(State)[key], state)
+        self.assertIs(models.storage.get(State, state.id), state)
+        self.assertIs(models.storage.get('State', state.id), state)
+        self.assertIsNone(models.storage.get(State, 'missing'))
+        self.assertIsNone(models.storage.get(City, state.id))
+
+    def test_all_by_class(self):
+        '''Test that all(cls) only returns objects of that class.'''
+        state = State()
+        city = City()
+        self.assertEqual(list(models.storage.all(City)), ['City.' + city.id])
+        self.assertEqual(list(models.storage.all('State')),
+                         ['State.' + state.id])
+        self.assertEqual(models.storage.all(Place), {})
+
+    def test_count(self):
+        '''Test count() with and without a class.'''
+        State()
+        State()
+        City()
+        self.assertEqual(models.storage.count(), 3)
+        self.assertEqual(models.storage.count(State), 2)
+        self.assertEqual(models.storage.count('City'), 1)
+        self.assertEqual(models.storage.count(Place), 0)
+
+    def test_delete(self):
+        '''Test that a deleted object is gone from every lookup.'''
+        state = State()
+        city = City()
+        models.storage.delete(city)
+        models.storage.delete(None)
+        self.assertIsNone(models.storage.get(City, city.id))
+        self.assertNotIn('City.' + city.id, models.storage.all())
+        self.assertEqual(models.storage.count(City), 0)
+        self.assertIs(models.storage.get(State, state.id), state)
+
+    def test_unstored_object_is_not_saved(self):
+        '''Test that an object built from keyword arguments, and never
+        stored, is ignored by save().'''
+        state = State()
+        BaseModel(name='x')
+        State(**state.to_dict()).name = 'Copy'
+        models.storage.save()
+        self.assertEqual(models.storage.count(), 1)
+        self.assertIs(models.storage.get(State, state.id), state)
+        if not self.persistent:
+            return
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 1)
+        self.assertNotIn('name', storage.get(State, state.id).to_dict())
+
+    def test_related(self):
+        '''Test that related() follows creates, updates and deletes.'''
+        state = State()
+        other = State()
+        cities = [City(), City()]
+        for city in cities:
+            city.state_id = state.id
+        self.assertEqual(set(models.storage.related(City, 'state_id',
+                                                    state.id)),
+                         {'City.' + city.id for city in cities})
+        cities[0].state_id = other.id
+        self.assertEqual(models.storage.related('City', 'state_id', state.id),
+                         {'City.' + cities[1].id: cities[1]})
+        self.assertEqual(other.cities, [cities[0]])
+        models.storage.delete(cities[1])
+        self.assertEqual(state.cities, [])
+        city = City()
+        city.state_id = state.id
+        self.assertEqual(state.cities, [city])
+        self.assertEqual(models.storage.related(Place, 'city_id', city.id),
+                         {})
+        if not self.persistent:
+            return
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(list(storage.related(City, 'state_id', other.id)),
+                         ['City.' + cities[0].id])
+        self.assertEqual(storage.get(State, state.id).cities,
+                         [storage.get(City, city.id)])
+
+    def test_between(self):
+        '''Test that between() follows creates, updates and deletes.'''
+        places = [Place() for i in range(5)]
+        for place, price in zip(places, (120, 50, 80, 200, 80)):
+            place.price_by_night = price
+        places[4].price_by_night = 'free'
+        found = models.storage.between(Place, 'price_by_night', 60, 150)
+        self.assertEqual([obj.price_by_night for obj in found.values()],
+                         [80, 120])
+        self.assertEqual(list(models.storage.between(Place, 'price_by_night',
+                                                     high=80)),
+                         ['Place.' + places[1].id, 'Place.' + places[2].id])
+        places[3].price_by_night = 100.5
+        models.storage.delete(places[0])
+        self.assertEqual(list(models.storage.between('Place',
+                                                     'price_by_night', 60)),
+                         ['Place.' + places[2].id, 'Place.' + places[3].id])
+        self.assertEqual(models.storage.between(Place, 'max_guest', 1), {})
+        if not self.persistent:
+            return
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(list(storage.between(Place, 'price_by_night')),
+                         ['Place.' + places[i].id for i in (1, 2, 3)])
+
+    def test_containing(self):
+        '''Test that containing() follows creates, updates and deletes.'''
+        places = [Place() for i in range(4)]
+        places[0].amenity_ids = ['wifi', 'pets']
+        places[1].amenity_ids = ['pets', 'wifi', 'pool']
+        places[2].amenity_ids = ['wifi']
+        self.assertEqual(set(models.storage.containing(
+                Place, 'amenity_ids', ['wifi', 'pets'])),
+                         {'Place.' + places[0].id, 'Place.' + places[1].id})
+        self.assertEqual(len(models.storage.containing(Place, 'amenity_ids',
+                                                       [])), 4)
+        places[0].amenity_ids = ['pets']
+        places[3].amenity_ids = ['pets', 'wifi', 'wifi']
+        models.storage.delete(places[1])
+        self.assertEqual(list(models.storage.containing(
+                'Place', 'amenity_ids', ['pets', 'wifi'])),
+                         ['Place.' + places[3].id])
+        self.assertEqual(models.storage.containing(Place, 'amenity_ids',
+                                                   ['gym']), {})
+        if not self.persistent:
+            return
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(set(storage.containing(Place, 'amenity_ids',
+                                                ['wifi'])),
+                         {'Place.' + places[2].id, 'Place.' + places[3].id})
+
+    def test_location(self):
+        '''Test in_bbox() and within_radius() as places move.'''
+        places = [Place() for i in range(4)]
+        for place, (lat, lon) in zip(places, ((6.45, 3.39), (6.5, 3.35),
+                                              (9.07, 7.49), (0, 179.9))):
+            place.latitude = lat
+            place.longitude = lon
+        self.assertEqual(set(models.storage.in_bbox(6, 3, 7, 4)),
+                         {'Place.' + places[0].id, 'Place.' + places[1].id})
+        self.assertEqual(list(models.storage.in_bbox(-1, 179, 1, -179)),
+                         ['Place.' + places[3].id])
+        self.assertEqual(list(models.storage.within_radius(6.49, 3.36, 10)),
+                         ['Place.' + places[1].id, 'Place.' + places[0].id])
+        places[2].latitude = 6.46
+        places[2].longitude = 3.38
+        models.storage.delete(places[1])
+        self.assertEqual(list(models.storage.within_radius(6.45, 3.39, 10)),
+                         ['Place.' + places[0].id, 'Place.' + places[2].id])
+        self.assertEqual(models.storage.in_bbox(6, 3, 7, 4, cls=State), {})
+        if not self.persistent:
+            return
+        models.storage.save()
+        storage = self.reopen()
+        self.assertEqual(list(storage.within_radius(0, -179.9, 50)),
+                         ['Place.' + places[3].id])
+
+    def test_save_and_reopen(self):
+        '''Test that saved objects are the same after reopening.'''
+        if not self.persistent:
+            self.skipTest('engine does not persist')
+        state = State()
+        state.name = 'Lagos'
+        bm = BaseModel()
+        bm.number = 3
+        bm.save()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.get(State, state.id).to_dict(),
+                         state.to_dict())
+        self.assertEqual(storage.get(BaseModel, bm.id).to_dict(),
+                         bm.to_dict())
+
+    def test_update_is_persisted(self):
+        '''Test that a saved attribute change survives a reopen.'''
+        if not self.persistent:
+            self.skipTest('engine does not persist')
+        state = State()
+        state.save()
+        loaded = self.reopen().get(State, state.id)
+        loaded.name = 'Abuja'
+        loaded.save()
+        self.assertEqual(self.reopen().get(State, state.id).name, 'Abuja')
+
+    def test_delete_is_persisted(self):
+        '''Test that a saved delete survives a reopen.'''
+        if not self.persistent:
+            self.skipTest('engine does not persist')
+        state = State()
+        city = City()
+        models.storage.save()
+        storage = self.reopen()
+        storage.delete(storage.get(City, city.id))
+        storage.save()
+        storage = self.reopen()
+        self.assertIsNone(storage.get(City, city.id))
+        self.assertIsNotNone(storage.get(State, state.id))
+
+    def test_batch(self):
+        '''Test that the saves made in a batch() block are kept.'''
+        with models.storage.batch() as storage:
+            self.assertIs(storage, models.storage)
+            state = State()
+            state.save()
+            city = City()
+            city.state_id = state.id
+            city.save()
+        self.assertEqual(models.storage.count(), 2)
+        if not self.persistent:
+            return
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 2)
+        self.assertEqual(storage.get(City, city.id).state_id, state.id)
+
+    def test_unsaved_changes_are_not_persisted(self):
+        '''Test that reopening without a save drops the changes.'''
+        if not self.persistent:
+            self.skipTest('engine does not persist')
+        state = State()
+        state.save()
+        City()
+        storage = self.reopen()
+        self.assertEqual(storage.count(), 1)
+
+
+class TestFileStorage_conformance(StorageConformance, unittest.TestCase):
+    '''Runs the conformance tests against FileStorage.'''
+
+    def open_storage(self):
+        storage = FileStorage(path=os.path.join(self.tmp.name, 'file.json'))
+        storage.reload()
+        return storage
+
+    def close_storage(self):
+        FileStorage(path='file.json')
+
+
+class TestFileStorage_journal_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage in journal mode.'''
+
+    def setUp(self):
+        FileStorage.journal = True
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.journal = False
+
+
+class TestFileStorage_lazy_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage in lazy mode.'''
+
+    def setUp(self):
+        FileStorage.lazy = True
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.lazy = False
+
+
+class TestFileStorage_shards_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage with shard files
+    read in parallel.'''
+
+    def setUp(self):
+        FileStorage.shards = 2
+        self.workers = FileStorage.reload_workers
+        FileStorage.reload_workers = 2
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.shards = 0
+        FileStorage.reload_workers = self.workers
+
+
+class TestFileStorage_parallel_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage reading its
+    snapshot in parallel parts.'''
+
+    def setUp(self):
+        self.workers = FileStorage.reload_workers
+        FileStorage.reload_workers = 2
+        FileStorage.reload_mode = 'split'
+        patcher = mock.patch('models.engine.file_storage._MIN_PART', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.reload_workers = self.workers
+        FileStorage.reload_mode = 'shards'
+
+
+class TestFileStorage_binary_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage in binary format.'''
+
+    def setUp(self):
+        FileStorage.format = 'binary'
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.format = 'json'
+
+
+class TestFileStorage_gzip_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage with compressed
+    snapshots.'''
+
+    def setUp(self):
+        FileStorage.compression = 'gzip'
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.compression = ''
+
+
+class TestFileStorage_write_behind_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage writing in the
+    background.'''
+
+    def setUp(self):
+        FileStorage.write_behind = True
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.write_behind = False
+
+    def test_unsaved_changes_are_not_persisted(self):
+        '''Changes made before the writer runs are written with it.'''
+        self.skipTest('the writer writes the objects as they are then')
+
+
+class TestFileStorage_shared_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage shared between
+    processes, in journal mode.'''
+
+    def setUp(self):
+        FileStorage.shared = True
+        FileStorage.journal = True
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.shared = False
+        FileStorage.journal = False
+
+
+class TestFileStorage_reload_cache_conformance(TestFileStorage_conformance):
+    '''Runs the conformance tests against FileStorage reloading from its
+    sidecar cache, skipping unchanged files, in journal mode.'''
+
+    def setUp(self):
+        FileStorage.reload_cache = True
+        FileStorage.skip_unchanged = True
+        FileStorage.journal = True
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        FileStorage.reload_cache = False
+        FileStorage.skip_unchanged = False
+        FileStorage.journal = False
+
+
+class TestSQLiteStorage_conformance(StorageConformance, unittest.TestCase):
+    '''Runs the conformance tests against SQLiteStorage.'''
+
+    def open_storage(self):
+        storage = SQLiteStorage(os.path.join(self.tmp.name, 'hbnb.db'))
+        storage.reload()
+        return storage
+
+
+class TestMemoryStorage_conformance(StorageConformance, unittest.TestCase):
+    '''Runs the conformance tests against MemoryStorage.'''
+
+    persistent = False
+
+    def open_storage(self):
+        return MemoryStorage()
+
+
+if __name__ == '__main__':
+    unittest.main()
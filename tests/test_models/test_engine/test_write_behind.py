@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+'''Defines the unittests for models/engine/write_behind.py.'''
+
+import time
+import unittest
+from models.engine.write_behind import WriteBehind
+
+
+class TestWriteBehind(unittest.TestCase):
+    '''Unittests for the background writer.'''
+
+    def setUp(self):
+        self.writes = []
+        self.errors = []
+        self.ready = True
+        self.writer = WriteBehind(self.write, lambda: self.ready)
+
+    def tearDown(self):
+        self.ready = True
+        self.writer.close()
+
+    def write(self):
+        '''Record a write, or raise the next error if there is one.'''
+        if self.errors:
+            raise self.errors.pop()
+        self.writes.append(time.monotonic())
+
+    def test_requests_are_coalesced(self):
+        '''Test that requests made before the first is due are written
+        once, by flush().'''
+        for i in range(10):
+            self.writer.request(60)
+        self.assertEqual(self.writes, [])
+        self.writer.flush()
+        self.assertEqual(len(self.writes), 1)
+        self.writer.flush()
+        self.assertEqual(len(self.writes), 1)
+
+    def test_written_when_due(self):
+        '''Test that a request is written once max_staleness is over, and
+        that a shorter one brings the write forward.'''
+        start = time.monotonic()
+        self.writer.request(60)
+        self.writer.request(0.05)
+        deadline = start + 5
+        while not self.writes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.writes), 1)
+        self.assertGreaterEqual(self.writes[0] - start, 0.05)
+
+    def test_waits_until_ready(self):
+        '''Test that nothing is written until ready() and wake().'''
+        self.ready = False
+        self.writer.request(0)
+        time.sleep(0.05)
+        self.assertEqual(self.writes, [])
+        self.ready = True
+        self.writer.wake()
+        self.writer.flush()
+        self.assertEqual(len(self.writes), 1)
+
+    def test_error_is_raised_once(self):
+        '''Test that the error of a write is raised by the next flush()
+        or request(), once.'''
+        self.errors.append(OSError('disk full'))
+        self.writer.request(0)
+        with self.assertRaises(OSError):
+            self.writer.flush()
+        self.writer.flush()
+        self.errors.append(OSError('disk full'))
+        self.writer.request(0)
+        time.sleep(0.05)
+        with self.assertRaises(OSError):
+            self.writer.request(60)
+        self.writer.request(60)
+        self.writer.flush()
+        self.assertEqual(len(self.writes), 1)
+
+    def test_close_writes_the_requests(self):
+        '''Test that close() writes what is left and stops the thread.'''
+        self.writer.request(60)
+        self.writer.close()
+        self.assertEqual(len(self.writes), 1)
+        self.assertFalse(self.writer._WriteBehind__thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
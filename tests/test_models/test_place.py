@@ -7,6 +7,8 @@ import unittest
 from time import sleep
 from datetime import datetime
 from models.place import Place
+from models.review import Review
+from models.amenity import Amenity
 from models.base_model import BaseModel
 
 
@@ -98,6 +100,15 @@ class TestPlace_init(unittest.TestCase):
         '''Test that ``amenity_ids`` is a list - public class attribute.'''
         self.assertEqual(type(Place().amenity_ids), list)
 
+    def test_amenity_ids_are_not_shared(self):
+        '''Test that appending to amenity_ids only changes that place.'''
+        first = Place()
+        second = Place()
+        first.amenity_ids.append('a')
+        self.assertEqual(first.amenity_ids, ['a'])
+        self.assertEqual(second.amenity_ids, [])
+        self.assertEqual(Place.amenity_ids, [])
+
     def test_init_with_kwargs(self):
         '''Create an instance of Place with **kwargs.'''
         dt = datetime.now()
@@ -311,5 +322,31 @@ class TestPlace_to_dict(unittest.TestCase):
             a.to_dict(None)
 
 
+class TestPlace_reviews(unittest.TestCase):
+    '''Unittests for the reviews property of the Place class.'''
+
+    def test_reviews(self):
+        '''Test that reviews lists the reviews of the place only.'''
+        place = Place()
+        reviews = [Review() for i in range(3)]
+        for review in reviews[:2]:
+            review.place_id = place.id
+        self.assertEqual(sorted(r.id for r in place.reviews),
+                         sorted(r.id for r in reviews[:2]))
+        self.assertEqual(Place().reviews, [])
+
+
+class TestPlace_amenities(unittest.TestCase):
+    '''Unittests for the amenities property of the Place class.'''
+
+    def test_amenities(self):
+        '''Test that amenities lists the stored amenities of the ids.'''
+        place = Place()
+        wifi = Amenity()
+        place.amenity_ids = [wifi.id, 'missing']
+        self.assertEqual(place.amenities, [wifi])
+        self.assertEqual(Place().amenities, [])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,6 +7,7 @@ import unittest
 from time import sleep
 from datetime import datetime
 from models.state import State
+from models.city import City
 from models.base_model import BaseModel
 
 
@@ -281,5 +282,23 @@ class TestState_to_dict(unittest.TestCase):
             state.to_dict(None)
 
 
+class TestState_cities(unittest.TestCase):
+    '''Unittests for the cities property of the State class.'''
+
+    def test_cities(self):
+        '''Test that cities lists the cities of the state only.'''
+        state = State()
+        city = City()
+        City().state_id = State().id
+        self.assertEqual(state.cities, [])
+        city.state_id = state.id
+        self.assertEqual(state.cities, [city])
+
+    def test_cities_is_read_only(self):
+        '''Test that cities cannot be set.'''
+        with self.assertRaises(AttributeError):
+            State().cities = []
+
+
 if __name__ == '__main__':
     unittest.main()
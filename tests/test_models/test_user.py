@@ -7,6 +7,8 @@ import unittest
 from time import sleep
 from datetime import datetime
 from models.user import User
+from models.place import Place
+from models.review import Review
 from models.base_model import BaseModel
 
 
@@ -287,5 +289,20 @@ class TestUser_to_dict(unittest.TestCase):
             user.to_dict(None)
 
 
+class TestUser_relations(unittest.TestCase):
+    '''Unittests for the places and reviews properties of User.'''
+
+    def test_places_and_reviews(self):
+        '''Test that places and reviews list what the user owns.'''
+        user = User()
+        place = Place()
+        review = Review()
+        place.user_id = user.id
+        review.user_id = user.id
+        self.assertEqual(user.places, [place])
+        self.assertEqual(user.reviews, [review])
+        self.assertEqual(User().places, [])
+
+
 if __name__ == "__main__":
     unittest.main()